@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+# ========================================================================
+# Benchmark of the stage1 pipeline on synthetic corpora. A corpus of N   ||
+# documents is made by recombining sentences of set_I and set_J, so the  ||
+# documents look like real storylines and keep their marked names, and   ||
+# is written SHARD_SIZE documents to a directory. Each corpus size runs  ||
+# in a fresh process, from an empty feature store and POS cache of its   ||
+# own, and measures, in this order:                                      ||
+#   tagging      POS tagging of every document (cold cache)              ||
+#   featurize    feature generation of every document (warm POS cache)   ||
+#   classifiers  train time of every classifier, and the time it takes   ||
+#                to predict on unmarked documents through predict_doc,   ||
+#                as the predict command does (warm POS cache)            ||
+# and the peak RSS of its process and of its workers, which are those of ||
+# this size alone. Results are written as JSON, and "compare" prints two ||
+# of them side by side.                                                  ||
+# ========================================================================
+
+import os
+import sys
+import glob
+import json
+import time
+import random
+import shutil
+import timeit
+import platform
+import resource
+import argparse
+import multiprocessing
+
+import gen_feature_cv_eval as pipeline
+
+BENCHMARK_DIR = '../benchmark/'
+SOURCE_DIRS = ['set_I', 'set_J']
+SHARD_SIZE = 1000 # documents of a synthetic corpus per directory
+
+def split_sentences(text):
+    """Split a document into sentences, never inside a marked name"""
+    sentences, sentence, depth = list(), list(), 0
+    for word in text.split():
+        sentence.append(word)
+        depth += word.count('{') - word.count('}')
+        if depth <= 0 and word.endswith('.'):
+            sentences.append(' '.join(sentence))
+            sentence, depth = list(), 0
+    if sentence:
+        sentences.append(' '.join(sentence))
+    return sentences
+
+def list_corpus_docs(corpus_dir):
+    return sorted(glob.glob(os.path.join(corpus_dir, '*', '*.txt')))
+
+def gen_corpus(corpus_dir, num_docs, seed):
+    """Write num_docs synthetic documents into the shards of corpus_dir, unless it already holds them"""
+    if os.path.isdir(corpus_dir) and len(list_corpus_docs(corpus_dir)) == num_docs:
+        return
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    os.makedirs(corpus_dir)
+
+    source_docs = [split_sentences(pipeline.read_doc_text(doc_path))
+                   for source_dir in SOURCE_DIRS for doc_path in sorted(pipeline.list_docs(source_dir))]
+    rng = random.Random(seed)
+    for doc_id in range(num_docs):
+        shard_dir = os.path.join(corpus_dir, '{:04d}'.format(doc_id // SHARD_SIZE))
+        if doc_id % SHARD_SIZE == 0:
+            os.makedirs(shard_dir)
+        # as many sentences as a real document, each from a random real document
+        num_sentences = len(rng.choice(source_docs))
+        sentences = [rng.choice(rng.choice(source_docs)) for _ in range(num_sentences)]
+        with open(os.path.join(shard_dir, '{:07d}.txt'.format(doc_id)), 'w') as doc:
+            doc.write('# Synthetic storyline {}\n\n'.format(doc_id))
+            doc.write(' '.join(sentences))
+
+def tag_doc_batch(doc_paths):
+    from pos_tagger import tag_texts
+    return sum(len(word_tags) for word_tags in tag_texts([pipeline.read_doc_text(doc_path) for doc_path in doc_paths]))
+
+def tag_text_batch(texts):
+    from pos_tagger import tag_texts
+    tag_texts(texts)
+
+def unmark(text):
+    """Returns a marked document as the predict command gets it, without its marks"""
+    return text.replace('{', '').replace('}', '')
+
+def get_peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    peak_rss = resource.getrusage(who).ru_maxrss
+    return peak_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def run_benchmark(num_docs, args):
+    import numpy as np
+    import feature_store
+    import pos_tagger
+    from feature_engine import FEATURE_SET_VERSION
+
+    corpus_dir = os.path.join(BENCHMARK_DIR, 'corpus_{}_{}'.format(num_docs, args.seed), '')
+    run_dir = os.path.join(BENCHMARK_DIR, 'run_{}'.format(os.getpid()), '')
+    gen_corpus(corpus_dir, num_docs, args.seed)
+    doc_list = list_corpus_docs(corpus_dir)
+
+    # cold feature store and POS cache, set before the pool forks so the workers use them too
+    shutil.rmtree(run_dir, ignore_errors=True)
+    feature_store.FEATURE_STORE_DIR = os.path.join(run_dir, 'features/')
+    pos_tagger.POS_CACHE_PATH = os.path.join(run_dir, 'pos_tags.sqlite3')
+    pos_tagger.POS_CACHE_MAX_BYTES = float('inf')
+    result = {'num_docs': num_docs, 'seed': args.seed, 'workers': args.workers,
+              'max_example_len': pipeline.MAX_EXAMPLE_LEN, 'feature_set_version': FEATURE_SET_VERSION}
+
+    # train on the first two thirds of (at most --max-train-docs) documents, predict on the rest
+    num_used = min(num_docs, args.max_train_docs * 3 // 2)
+    num_train = num_used * 2 // 3
+    predict_texts = [unmark(pipeline.read_doc_text(doc_path)) for doc_path in doc_list[num_train:num_used]]
+
+    pipeline.pool = multiprocessing.Pool(processes=args.workers)
+    try:
+        batches = [doc_list[start:start+pipeline.TAG_BATCH_SIZE] for start in range(0, len(doc_list), pipeline.TAG_BATCH_SIZE)]
+        tagging_start = timeit.default_timer()
+        num_tokens = sum(pipeline.pool.map(tag_doc_batch, batches, chunksize=1))
+        tagging_time = timeit.default_timer() - tagging_start
+        result['tagging'] = {'seconds': tagging_time, 'tokens': num_tokens,
+                             'docs_per_s': num_docs / tagging_time, 'tokens_per_s': num_tokens / tagging_time}
+
+        featurize_start = timeit.default_timer()
+        doc_keys = pipeline.featurize_doc_list(doc_list)
+        featurize_time = timeit.default_timer() - featurize_start
+
+        # every classifier predicts from the same warm POS cache
+        pipeline.pool.map(tag_text_batch, [predict_texts[start:start+pipeline.TAG_BATCH_SIZE]
+                                           for start in range(0, len(predict_texts), pipeline.TAG_BATCH_SIZE)], chunksize=1)
+    finally:
+        pipeline.pool.close()
+        pipeline.pool.join()
+
+    store_dir = feature_store.get_store_dir(pipeline.MAX_EXAMPLE_LEN)
+    num_windows = sum(len(feature_store.load_doc(store_dir, doc_key)[2]) for doc_key in doc_keys)
+    result['featurize'] = {'seconds': featurize_time, 'windows': num_windows,
+                           'docs_per_s': num_docs / featurize_time, 'windows_per_s': num_windows / featurize_time}
+
+    _, X_train, y_train = feature_store.gather(store_dir, doc_keys[:num_train])
+    result['classifiers'] = dict()
+    for Clf in pipeline.load_classifiers():
+        clf = Clf()
+        train_start = timeit.default_timer()
+        clf.fit(X_train, y_train)
+        train_time = timeit.default_timer() - train_start
+        model = {'clf': clf, 'max_example_len': pipeline.MAX_EXAMPLE_LEN}
+        predict_start = timeit.default_timer()
+        for text in predict_texts:
+            pipeline.predict_doc(model, text)
+        predict_time = timeit.default_timer() - predict_start
+        result['classifiers'][Clf.__name__] = {'train_seconds': train_time, 'train_rows': len(y_train),
+                                               'predict_seconds': predict_time, 'predict_docs': len(predict_texts)}
+        print('{:<10d}{:<30s}train {:.2f}s  predict {:.2f}s'.format(num_docs, Clf.__name__, train_time, predict_time), file=sys.stderr)
+
+    result['peak_rss_mb'] = {'main': get_peak_rss_mb(resource.RUSAGE_SELF),
+                             'workers': get_peak_rss_mb(resource.RUSAGE_CHILDREN)}
+
+    shutil.rmtree(run_dir, ignore_errors=True)
+    return result
+
+def run_benchmark_process(num_docs, args, result_path):
+    result = run_benchmark(num_docs, args)
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
+
+def run_benchmark_isolated(num_docs, args):
+    """Run the benchmark of one corpus size in a process of its own, as ru_maxrss only ever grows within a process.
+    The process is forked, not spawned: the peak RSS of a process carries over an exec, and so into a spawned one."""
+    result_path = os.path.join(BENCHMARK_DIR, 'result_{}.json'.format(os.getpid()))
+    process = multiprocessing.get_context('fork').Process(target=run_benchmark_process, args=(num_docs, args, result_path))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        sys.exit('The benchmark of {} documents failed'.format(num_docs))
+    with open(result_path, 'r') as f:
+        result = json.load(f)
+    os.remove(result_path)
+    return result
+
+def run(args):
+    results = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+               'platform': platform.platform(), 'cpu_count': multiprocessing.cpu_count(), 'runs': list()}
+    for num_docs in args.sizes:
+        result = run_benchmark_isolated(num_docs, args)
+        results['runs'].append(result)
+        print('{:<10d}tagging {:.1f} docs/s, featurize {:.1f} docs/s {:.0f} windows/s, peak RSS {:.0f}MB/{:.0f}MB'.format(
+            num_docs, result['tagging']['docs_per_s'], result['featurize']['docs_per_s'], result['featurize']['windows_per_s'],
+            result['peak_rss_mb']['main'], result['peak_rss_mb']['workers']), file=sys.stderr)
+
+    output_path = args.output or os.path.join(BENCHMARK_DIR, 'results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('Results saved to {}'.format(output_path))
+
+def flatten_run(result):
+    metrics = {'tagging docs/s': result['tagging']['docs_per_s'],
+               'featurize docs/s': result['featurize']['docs_per_s'],
+               'featurize windows/s': result['featurize']['windows_per_s'],
+               'peak RSS main (MB)': result['peak_rss_mb']['main'],
+               'peak RSS workers (MB)': result['peak_rss_mb']['workers']}
+    for clf_name, clf_result in result['classifiers'].items():
+        metrics[clf_name + ' train (s)'] = clf_result['train_seconds']
+        metrics[clf_name + ' predict docs/s'] = clf_result['predict_docs'] / clf_result['predict_seconds']
+    return metrics
+
+def compare(args):
+    old_results, new_results = [json.load(open(path, 'r')) for path in (args.old, args.new)]
+    old_runs = dict((result['num_docs'], result) for result in old_results['runs'])
+    print("{:<45s}{:>15s}{:>15s}{:>10s}".format("Metric", "Old", "New", "New/Old"))
+    for new_run in new_results['runs']:
+        num_docs = new_run['num_docs']
+        if num_docs not in old_runs:
+            continue
+        print('---------------------------{} documents---------------------------'.format(num_docs))
+        old_metrics = flatten_run(old_runs[num_docs])
+        for metric, new_value in flatten_run(new_run).items():
+            old_value = old_metrics.get(metric)
+            if old_value is None:
+                continue
+            ratio = new_value / old_value if old_value else float('nan')
+            print('{:<45s}{:>15.2f}{:>15.2f}{:>10.2f}'.format(metric, old_value, new_value, ratio))
+
+
+parser = argparse.ArgumentParser(description='Benchmark the stage1 extraction pipeline on synthetic corpora.')
+subparsers = parser.add_subparsers(dest='mode', metavar='mode')
+subparsers.required = True
+
+run_parser = subparsers.add_parser('run', help='Run the benchmark and save the results as JSON.')
+run_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Corpus sizes in documents (default: 1000 10000).')
+run_parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus generator (default: 0).')
+run_parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Number of worker processes (default: number of cores).')
+run_parser.add_argument('--max-train-docs', type=int, default=2000, help='At most this many documents are used to train classifiers (default: 2000).')
+run_parser.add_argument('--output', help='Where to save the results (default: ../benchmark/results/<time>.json).')
+run_parser.set_defaults(func=run)
+
+compare_parser = subparsers.add_parser('compare', help='Compare two saved results.')
+compare_parser.add_argument('old', help='Results of the baseline run.')
+compare_parser.add_argument('new', help='Results of the new run.')
+compare_parser.set_defaults(func=compare)
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    args.func(args)
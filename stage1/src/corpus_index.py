@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import io
+import os
+import re
+import json
+import shutil
+import hashlib
+import numpy as np
+
+MARKED_DOC_DIR = '../documents/marked_documents/'
+CORPUS_INDEX_DIR = '../documents/index/'
+SPLIT_MANIFEST_PATH = '../documents/splits.json'
+
+DOC_DTYPE = np.dtype([('doc_num', np.int32), ('size', np.int64), ('mtime_ns', np.int64), ('sha1', 'S40'),
+                      ('title_start', np.int64), ('title_end', np.int64), ('text_start', np.int64), ('text_end', np.int64),
+                      ('num_mentions', np.int32)])
+
+# ========================================================================
+# The corpus index holds every document of MARKED_DOC_DIR, read once,    ||
+# in two files loaded memory-mapped:                                     ||
+#   docs.npy      one DOC_DTYPE row per document, sorted by doc_num      ||
+#   text.bin      titles and texts (as read by read_doc_text), utf-8     ||
+# A document is re-read only when its size or mtime changed, so adding   ||
+# documents to the corpus only reads the new ones. Tokens are not        ||
+# stored: splitting the text is cheaper than rebuilding them.            ||
+# Splits are lists of doc_num in SPLIT_MANIFEST_PATH, not file copies.   ||
+# ========================================================================
+
+index = None
+
+def get_doc_num(doc_name):
+    return int(doc_name.split('.')[0])
+
+def get_index_paths(index_dir):
+    return [os.path.join(index_dir, name) for name in ('docs.npy', 'text.bin')]
+
+def split_doc(content):
+    """Given the content of a marked document, returns its title and its text, the lines after the title and empty line"""
+    lines = io.StringIO(content, newline=None).readlines() # same lines as reading the file in text mode
+    return (lines[0].strip() if lines else ''), ' '.join(lines[2:])
+
+def index_doc(doc_path):
+    """Read a document, returns (stat, sha1, title, text, mention count)"""
+    stat = os.stat(doc_path)
+    with open(doc_path, 'rb') as f:
+        raw = f.read()
+    title, text = split_doc(raw.decode('utf-8'))
+    # mentions are counted the way split_docs.py always has, per line of the text
+    num_mentions = sum(len(re.findall('{.*?}', line)) for line in text.split('\n'))
+    return stat, hashlib.sha1(raw).hexdigest(), title, text, num_mentions
+
+def load_index(index_dir=CORPUS_INDEX_DIR):
+    """Returns the corpus index as a dict of its memory-mapped arrays, and "rows", doc_num -> row of docs,
+    or None if there is no index"""
+    docs_path, text_path = get_index_paths(index_dir)
+    if not os.path.exists(docs_path):
+        return None
+    docs = np.load(docs_path, mmap_mode='r')
+    return {'docs': docs,
+            'text': np.memmap(text_path, dtype=np.uint8, mode='r') if os.path.getsize(text_path) else np.zeros(0, dtype=np.uint8),
+            'rows': dict((doc_num, row) for row, doc_num in enumerate(docs['doc_num'].tolist()))}
+
+def get_index():
+    global index
+    if index is None:
+        index = load_index()
+    return index
+
+def read_entry(index, row):
+    """Returns the title and text of a document of the index"""
+    doc = index['docs'][row]
+    title = index['text'][doc['title_start']:doc['title_end']].tobytes().decode('utf-8')
+    text = index['text'][doc['text_start']:doc['text_end']].tobytes().decode('utf-8')
+    return title, text
+
+def build_index(doc_dir=MARKED_DOC_DIR, index_dir=CORPUS_INDEX_DIR):
+    """Index every document of doc_dir, re-reading only new and changed documents.
+    Returns the new index and the number of documents read."""
+    old_index = load_index(index_dir)
+    doc_names = sorted((doc_name for doc_name in os.listdir(doc_dir) if doc_name.endswith('.txt')), key=get_doc_num)
+
+    docs = np.zeros(len(doc_names), dtype=DOC_DTYPE)
+    text_chunks = list()
+    text_pos = 0
+    num_read = 0
+    for row, doc_name in enumerate(doc_names):
+        doc_num = get_doc_num(doc_name)
+        stat = os.stat(os.path.join(doc_dir, doc_name))
+        old_row = old_index['rows'].get(doc_num) if old_index is not None else None
+        if (old_row is not None and old_index['docs'][old_row]['size'] == stat.st_size and
+                old_index['docs'][old_row]['mtime_ns'] == stat.st_mtime_ns):
+            old_doc = old_index['docs'][old_row]
+            sha1, num_mentions = old_doc['sha1'].decode('ascii'), old_doc['num_mentions']
+            title, text = read_entry(old_index, old_row)
+        else:
+            stat, sha1, title, text, num_mentions = index_doc(os.path.join(doc_dir, doc_name))
+            num_read += 1
+
+        title_bytes, text_bytes = title.encode('utf-8'), text.encode('utf-8')
+        docs[row] = (doc_num, stat.st_size, stat.st_mtime_ns, sha1.encode('ascii'),
+                     text_pos, text_pos + len(title_bytes), text_pos + len(title_bytes), text_pos + len(title_bytes) + len(text_bytes),
+                     num_mentions)
+        text_chunks.extend([title_bytes, text_bytes])
+        text_pos += len(title_bytes) + len(text_bytes)
+
+    # written next to the index and swapped in, so readers never see a partial index
+    tmp_dir = index_dir.rstrip('/') + '.{}.tmp'.format(os.getpid())
+    os.makedirs(tmp_dir)
+    docs_path, text_path = get_index_paths(tmp_dir)
+    with open(text_path, 'wb') as f:
+        for chunk in text_chunks:
+            f.write(chunk)
+    np.save(docs_path, docs)
+    old_dir = index_dir.rstrip('/') + '.{}.old'.format(os.getpid())
+    if os.path.exists(index_dir):
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    global index
+    index = load_index(index_dir)
+    return index, num_read
+
+def lookup(doc_path):
+    """Returns the row of a document in the corpus index, or None if it is not indexed or changed since"""
+    index = get_index()
+    if index is None or os.path.normpath(os.path.dirname(doc_path)) != os.path.normpath(MARKED_DOC_DIR):
+        return None
+    row = index['rows'].get(get_doc_num(os.path.basename(doc_path)))
+    if row is None:
+        return None
+    stat = os.stat(doc_path)
+    doc = index['docs'][row]
+    if doc['size'] != stat.st_size or doc['mtime_ns'] != stat.st_mtime_ns:
+        return None
+    return row
+
+def read_indexed_text(doc_path):
+    """Returns the text of a document from the corpus index, or None if it is not indexed"""
+    row = lookup(doc_path)
+    return None if row is None else read_entry(get_index(), row)[1]
+
+def get_indexed_key(doc_path):
+    """Returns the content hash of a document from the corpus index, or None if it is not indexed"""
+    row = lookup(doc_path)
+    return None if row is None else get_index()['docs'][row]['sha1'].decode('ascii')
+
+def load_manifest():
+    """Returns the split manifest, {"doc_dir": ..., "splits": {split name: [doc_num]}}, or None"""
+    if not os.path.exists(SPLIT_MANIFEST_PATH):
+        return None
+    with open(SPLIT_MANIFEST_PATH, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    tmp_path = SPLIT_MANIFEST_PATH + '.{}.tmp'.format(os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, SPLIT_MANIFEST_PATH)
+
+def get_split_docs(split_name):
+    """Returns the paths of the documents of a split in the manifest, or None if there is no such split"""
+    manifest = load_manifest()
+    if manifest is None or split_name not in manifest['splits']:
+        return None
+    return [os.path.join(manifest['doc_dir'], '{}.txt'.format(doc_num)) for doc_num in manifest['splits'][split_name]]
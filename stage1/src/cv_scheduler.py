@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import multiprocessing
+import numpy as np
+
+from shared_arrays import get_shared_spec, attach_shared_array
+
+# ========================================================================
+# Every (fold, classifier) pair is an independent task. The feature      ||
+# matrix, label vector and row-to-document index of the whole training   ||
+# set live in shared memory, and each worker attaches to them once, when ||
+# it starts, so a task only carries the document indices of its fold,   ||
+# the positives pruned from its validation documents, and for feature    ||
+# ablation the columns to use.                                           ||
+# ========================================================================
+
+worker_features, worker_labels, worker_doc_index = None, None, None
+
+def init_worker(specs):
+    global worker_features, worker_labels, worker_doc_index
+    worker_features, worker_labels, worker_doc_index = [attach_shared_array(spec) for spec in specs]
+
+def count_predictions(y_true, y_predict):
+    """Returns the true positive, false positive and false negative counts of predictions"""
+    true_positive = int(np.sum((y_predict == 1) & (y_true == 1)))
+    false_positive = int(np.sum((y_predict == 1) & (y_true == 0)))
+    false_negative = int(np.sum((y_predict == 0) & (y_true == 1)))
+    return true_positive, false_positive, false_negative
+
+def score_counts(true_positive, false_positive, false_negative, num_pruned=0):
+    """Returns the precision, recall and F1 score of prediction counts, counting the positives dropped by the
+    pruning rules, which no classifier ever sees, as false negatives. Scores with a zero denominator are 0."""
+    false_negative += num_pruned
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 0.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+def score_predictions(y_true, y_predict, num_pruned=0):
+    """Returns the precision, recall and F1 score of predictions, num_pruned pruned positives counted as false negatives"""
+    return score_counts(*count_predictions(y_true, y_predict), num_pruned=num_pruned)
+
+def run_task(task):
+    """Given a task (Clf, train document indices, valid document indices, positives pruned from the
+    validation documents, columns), fit Clf on the training documents and returns its precision, recall
+    and F1 score on the validation documents. Only the given feature columns are used, or all of them
+    if columns is None."""
+    Clf, train_doc_indices, valid_doc_indices, num_pruned, columns = task
+    train_rows = np.isin(worker_doc_index, train_doc_indices)
+    valid_rows = np.isin(worker_doc_index, valid_doc_indices)
+    features = worker_features if columns is None else worker_features[:, columns]
+
+    clf = Clf()
+    clf.fit(features[train_rows], worker_labels[train_rows])
+    y_predict = clf.predict(features[valid_rows])
+
+    return score_predictions(worker_labels[valid_rows], y_predict, num_pruned)
+
+def run_tasks(features, labels, doc_index, tasks, workers):
+    # arrays not gathered into shared memory already are copied there once
+    specs = [get_shared_spec(array) for array in (features, labels, doc_index)]
+    pool = multiprocessing.Pool(processes=workers, initializer=init_worker, initargs=(specs,))
+    try:
+        # one task per chunk, fits of different classifiers vary a lot in time
+        return pool.map(run_task, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+def get_num_pruned(pruned_positives, doc_indices):
+    return int(np.sum(np.asarray(pruned_positives)[doc_indices])) if pruned_positives is not None else 0
+
+def run_cv(features, labels, doc_index, list_of_clf, folds, workers, pruned_positives=None):
+    """Given the rows of all training documents, the classifiers and a list of folds, each a pair of
+    (train document indices, valid document indices), run the whole grid on a pool of workers.
+    pruned_positives is the number of positives the pruning rules dropped from each document, scored
+    as false negatives of the fold validating on it.
+    Returns [[(precision, recall, f1) for each classifier] for each fold], in the order given."""
+    tasks = [(Clf, train_doc_indices, valid_doc_indices, get_num_pruned(pruned_positives, valid_doc_indices), None)
+             for train_doc_indices, valid_doc_indices in folds for Clf in list_of_clf]
+    scores = run_tasks(features, labels, doc_index, tasks, workers)
+
+    num_clf = len(list_of_clf)
+    return [scores[fold*num_clf:(fold+1)*num_clf] for fold in range(len(folds))]
+
+def run_ablation(features, labels, doc_index, list_of_clf, folds, workers, pruned_positives=None):
+    """Same as run_cv, once with all feature columns and once without each of them, in one pool.
+    Returns the mean F1 score over the folds of every classifier, first with all columns and
+    then without each column: [[f1 for each classifier] for all columns and each dropped column]"""
+    num_features = features.shape[1]
+    column_sets = [None] + [[col for col in range(num_features) if col != dropped] for dropped in range(num_features)]
+    tasks = [(Clf, train_doc_indices, valid_doc_indices, get_num_pruned(pruned_positives, valid_doc_indices), columns)
+             for columns in column_sets for train_doc_indices, valid_doc_indices in folds for Clf in list_of_clf]
+    scores = run_tasks(features, labels, doc_index, tasks, workers)
+
+    f1_scores = np.array([f1 for _, _, f1 in scores]).reshape(len(column_sets), len(folds), len(list_of_clf))
+    return f1_scores.mean(axis=1).tolist()
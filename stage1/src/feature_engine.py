@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import re
+import timeit
+import hashlib
+import numpy as np
+
+from collections import OrderedDict
+from lexicons import get_lexicons, remove_extras
+
+# bump whenever the definition of any feature changes, so that stored features get regenerated
+FEATURE_SET_VERSION = 2
+
+# features are stored and handed to the classifiers as one float32 matrix, which holds every flag, count and
+# rate exactly or to float32 precision, labels as int8
+FEATURE_MATRIX_DTYPE = np.float32
+LABEL_DTYPE = np.int8
+
+# ========================================================================
+# Features are registered functions. A token attribute is an array over  ||
+# the tokens of a padded document (or over the characters of its text),  ||
+# computed at most once per document and shared by the windows of every  ||
+# length. A feature maps all windows of one length to one column of the  ||
+# feature matrix. Both declare the token attributes they depend on, so   ||
+# only what enabled features need is computed, and the time spent in     ||
+# each of them is recorded in attr_stats and feature_stats.              ||
+# The columns are the enabled features in registration order.            ||
+# ========================================================================
+
+TOKEN_ATTRS = OrderedDict()
+FEATURES = OrderedDict()
+PRUNE_RULES = OrderedDict()
+
+# name -> [number of calls, seconds], in this process since the last reset_stats()
+attr_stats, feature_stats = dict(), dict()
+
+def register_token_attr(name, depends=()):
+    def register(func):
+        TOKEN_ATTRS[name] = {'func': func, 'depends': list(depends)}
+        return func
+    return register
+
+def register_feature(name, depends=(), dtype='int8', enabled=True):
+    def register(func):
+        FEATURES[name] = {'func': func, 'depends': list(depends), 'dtype': dtype, 'enabled': enabled}
+        return func
+    return register
+
+def get_feature_names():
+    """Returns the names of all enabled features, i.e. the columns of the feature matrix"""
+    return [name for name, feature in FEATURES.items() if feature['enabled']]
+
+def get_feature_dtypes():
+    """Returns the narrowest dtype of every enabled feature, for per-feature columns"""
+    return OrderedDict((name, FEATURES[name]['dtype']) for name in get_feature_names())
+
+def set_enabled_features(feature_names):
+    """Enable exactly the given features, which must all be registered"""
+    unknown_names = set(feature_names) - set(FEATURES)
+    if unknown_names:
+        raise ValueError('Unknown features: {}'.format(', '.join(sorted(unknown_names))))
+    for name, feature in FEATURES.items():
+        feature['enabled'] = name in feature_names
+
+def disable_features(feature_names):
+    """Disable the given features, which must all be registered"""
+    unknown_names = set(feature_names) - set(FEATURES)
+    if unknown_names:
+        raise ValueError('Unknown features: {}'.format(', '.join(sorted(unknown_names))))
+    set_enabled_features([name for name in get_feature_names() if name not in feature_names])
+
+def register_prune_rule(name, depends=(), enabled=True):
+    def register(func):
+        PRUNE_RULES[name] = {'func': func, 'depends': list(depends), 'enabled': enabled}
+        return func
+    return register
+
+def get_prune_rule_names():
+    """Returns the names of all enabled pruning rules"""
+    return [name for name, rule in PRUNE_RULES.items() if rule['enabled']]
+
+def set_enabled_prune_rules(rule_names):
+    """Enable exactly the given pruning rules, which must all be registered"""
+    unknown_names = set(rule_names) - set(PRUNE_RULES)
+    if unknown_names:
+        raise ValueError('Unknown pruning rules: {}'.format(', '.join(sorted(unknown_names))))
+    for name, rule in PRUNE_RULES.items():
+        rule['enabled'] = name in rule_names
+
+def get_feature_set_hash():
+    """Returns a digest of the enabled features and pruning rules, part of the key of stored features"""
+    feature_set = ','.join(get_feature_names()) + ';' + ','.join(get_prune_rule_names())
+    return hashlib.sha1(feature_set.encode('utf-8')).hexdigest()
+
+def reset_stats():
+    attr_stats.clear()
+    feature_stats.clear()
+
+def record_time(stats, name, seconds):
+    stat = stats.setdefault(name, [0, 0.0])
+    stat[0] += 1
+    stat[1] += seconds
+
+def get_attr_closure(depends):
+    """Returns all token attributes the given ones depend on, themselves included"""
+    closure = set()
+    pending = list(depends)
+    while pending:
+        name = pending.pop()
+        if name not in closure:
+            closure.add(name)
+            pending.extend(TOKEN_ATTRS[name]['depends'])
+    return closure
+
+# Token Attributes
+
+def gen_token_table(parts, word_tag_dict):
+    """Given the tokens of a padded document and its word tags, returns its token table.
+    Token attributes are added to the table on first use by get_attr()."""
+    table = dict()
+    table['words'] = parts
+    table['text'] = ' '.join(parts)
+    table['word_offsets'] = np.cumsum([0] + [len(word)+1 for word in parts])
+    table['word_tag_dict'] = word_tag_dict
+    table['lexicons'] = get_lexicons()
+    return table
+
+def get_attr(token_table, name):
+    if name not in token_table:
+        attr = TOKEN_ATTRS[name]
+        for depend in attr['depends']:
+            get_attr(token_table, depend)
+        start = timeit.default_timer()
+        token_table[name] = attr['func'](token_table)
+        record_time(attr_stats, name, timeit.default_timer() - start)
+    return token_table[name]
+
+def word_flags(token_table, test):
+    return np.array([test(word) for word in token_table['words']], dtype=bool)
+
+def char_cumsum(text, pattern):
+    """Returns the prefix sums over the characters of text of whether a character matches pattern"""
+    cumsum = np.zeros(len(text)+1, dtype=int)
+    cumsum[[match.start()+1 for match in re.finditer(pattern, text)]] = 1
+    return np.cumsum(cumsum)
+
+def can_be_tagged(word, word_tag_dict, test):
+    if word not in word_tag_dict:
+        return False
+    for tag in word_tag_dict[word]:
+        if test(tag):
+            return True
+    return False
+
+@register_token_attr('cleaned')
+def cleaned(table):
+    return [remove_extras(word) for word in table['words']]
+
+@register_token_attr('cleaned_lower', depends=['cleaned'])
+def cleaned_lower(table):
+    return [word.lower() for word in table['cleaned']]
+
+@register_token_attr('num_letters')
+def num_letters(table):
+    return np.array([len(re.sub('[^a-zA-Z]', '', word)) for word in table['words']])
+
+@register_token_attr('end_with_prime_s')
+def end_with_prime_s(table):
+    return word_flags(table, lambda word: word[-2:] == '\'s')
+
+@register_token_attr('fullmatch_prime_s')
+def fullmatch_prime_s(table):
+    return word_flags(table, lambda word: re.fullmatch('.*\'s', word) is not None)
+
+@register_token_attr('is_empty')
+def is_empty(table):
+    return word_flags(table, lambda word: word == '')
+
+@register_token_attr('is_and')
+def is_and(table):
+    return word_flags(table, lambda word: word == 'and')
+
+@register_token_attr('has_upper')
+def has_upper(table):
+    return word_flags(table, lambda word: re.search('[A-Z]', word) is not None)
+
+@register_token_attr('has_lower')
+def has_lower(table):
+    return word_flags(table, lambda word: re.search('[a-z]', word) is not None)
+
+@register_token_attr('is_capital')
+def is_capital(table):
+    return word_flags(table, lambda word: re.fullmatch('[^a-zA-Z]*[A-Z].*', word) is not None)
+
+@register_token_attr('has_amazing_char')
+def has_amazing_char(table):
+    return word_flags(table, lambda word: re.search(r'[óéöäûâ]', word) is not None)
+
+@register_token_attr('has_lparen')
+def has_lparen(table):
+    return word_flags(table, lambda word: '(' in word)
+
+@register_token_attr('has_rparen')
+def has_rparen(table):
+    return word_flags(table, lambda word: ')' in word)
+
+@register_token_attr('has_lbrace')
+def has_lbrace(table):
+    return word_flags(table, lambda word: '{' in word)
+
+@register_token_attr('has_rbrace')
+def has_rbrace(table):
+    return word_flags(table, lambda word: '}' in word)
+
+@register_token_attr('end_with_comma')
+def end_with_comma(table):
+    return word_flags(table, lambda word: word[-1:] == ',')
+
+@register_token_attr('end_with_period')
+def end_with_period(table):
+    return word_flags(table, lambda word: word[-1:] == '.')
+
+@register_token_attr('in_prefix_white', depends=['cleaned'])
+def in_prefix_white(table):
+    return np.array([word in table['lexicons']['prefix_white'] for word in table['cleaned']], dtype=bool)
+
+@register_token_attr('in_prefix_black', depends=['cleaned_lower'])
+def in_prefix_black(table):
+    return np.array([word in table['lexicons']['prefix_black'] for word in table['cleaned_lower']], dtype=bool)
+
+@register_token_attr('in_suffix_white', depends=['cleaned'])
+def in_suffix_white(table):
+    return np.array([word in table['lexicons']['suffix_white'] for word in table['cleaned']], dtype=bool)
+
+@register_token_attr('in_suffix_black', depends=['cleaned_lower'])
+def in_suffix_black(table):
+    return np.array([word in table['lexicons']['suffix_black'] for word in table['cleaned_lower']], dtype=bool)
+
+@register_token_attr('in_black', depends=['cleaned_lower'])
+def in_black(table):
+    lexicons = table['lexicons']
+    return np.array([word in lexicons['black'] or word in lexicons['prefix_suffix'] for word in table['cleaned_lower']], dtype=bool)
+
+@register_token_attr('can_be_verb', depends=['cleaned'])
+def can_be_verb(table):
+    return np.array([can_be_tagged(word, table['word_tag_dict'], lambda tag: tag.startswith('V')) for word in table['cleaned']], dtype=bool)
+
+@register_token_attr('can_be_noun', depends=['cleaned'])
+def can_be_noun(table):
+    return np.array([can_be_tagged(word, table['word_tag_dict'], lambda tag: tag.startswith('N')) for word in table['cleaned']], dtype=bool)
+
+@register_token_attr('is_proper_noun', depends=['cleaned'])
+def is_proper_noun(table):
+    word_tag_dict = table['word_tag_dict']
+    return np.array([word in word_tag_dict and 'NNP' in word_tag_dict[word] for word in table['cleaned']], dtype=bool)
+
+# per-character attributes, for counting over the middle characters of examples
+
+@register_token_attr('extras_cumsum')
+def extras_cumsum(table):
+    return char_cumsum(table['text'], r'[^a-zA-Z\s]')
+
+@register_token_attr('period_cumsum')
+def period_cumsum(table):
+    return char_cumsum(table['text'], r'\.')
+
+@register_token_attr('comma_cumsum')
+def comma_cumsum(table):
+    return char_cumsum(table['text'], r',')
+
+@register_token_attr('paren_cumsum')
+def paren_cumsum(table):
+    return char_cumsum(table['text'], r'[()]')
+
+# ========================================================================
+# A window of length n starting at token s is padded the same way as the ||
+# old "example_padded" list, i.e. padded index k is token s-2+k:         ||
+# [pad_0, pad_1, word_1, ..., word_n,                 pad_-2, pad_-1]    ||
+#  0      1      2            n+1                     n+2     n+3        ||
+# Windows start at token 2, so the column of padded index k over all    ||
+# windows is simply the token slice [k, k + num_windows).               ||
+# ========================================================================
+
+def count_windows(token_table, example_len):
+    return max(len(token_table['words']) - example_len - 3, 0)
+
+class Windows(object):
+    """All windows of one length in a document, as seen by feature functions"""
+
+    def __init__(self, token_table, example_len):
+        self.token_table = token_table
+        self.example_len = example_len
+        self.num_windows = count_windows(token_table, example_len)
+
+        text, word_offsets = token_table['text'], token_table['word_offsets']
+        self.example_starts = word_offsets[2:2+self.num_windows]
+        self.example_ends = word_offsets[example_len+2:example_len+2+self.num_windows] - 1
+        self.examples = [text[start:end] for start, end in zip(self.example_starts.tolist(), self.example_ends.tolist())]
+
+    def at(self, attr, k):
+        """Returns the value of a token attribute at padded index k of every window"""
+        return get_attr(self.token_table, attr)[k:k+self.num_windows]
+
+    def sum(self, attr):
+        """Returns the sum of a token attribute over the words of every window, in constant time per window"""
+        cumsum_name = attr + '_cumsum'
+        if cumsum_name not in self.token_table:
+            self.token_table[cumsum_name] = np.concatenate(([0], np.cumsum(get_attr(self.token_table, attr))))
+        cumsum = self.token_table[cumsum_name]
+        return cumsum[2+self.example_len:2+self.example_len+self.num_windows] - cumsum[2:2+self.num_windows]
+
+    def middle_count(self, cumsum_attr):
+        """Given a per-character prefix sum, returns the count over every example without its first and last two characters"""
+        cumsum = get_attr(self.token_table, cumsum_attr)
+        middle_start = self.example_starts + 2
+        middle_end = np.maximum(self.example_ends - 2, middle_start)
+        return cumsum[middle_end] - cumsum[middle_start]
+
+def brackets_matching(windows, lbrace_attr, rbrace_attr):
+    """Vectorized version of the old per-window brackets_matching, over all windows of a length"""
+    example_len, num_windows = windows.example_len, windows.num_windows
+    padded_len = example_len + 4
+    left_brace_max_index = np.full(num_windows, -1)
+    for left_index in range(example_len-1, example_len+2):
+        left_brace_max_index[windows.at(lbrace_attr, left_index)] = left_index
+    right_brace_min_index = np.full(num_windows, padded_len)
+    for right_index in range(4, 1, -1):
+        right_brace_min_index[windows.at(rbrace_attr, right_index)] = right_index
+    label = ((left_brace_max_index > -1) & (left_brace_max_index <= 2) &
+             (right_brace_min_index < padded_len) & (right_brace_min_index >= example_len+1))
+    for left_index in range(example_len-1, example_len+1):
+        label &= ~(windows.at(rbrace_attr, left_index) & (left_index >= left_brace_max_index))
+    for right_index in range(4, 2, -1):
+        label &= ~(windows.at(lbrace_attr, right_index) & (right_index <= right_brace_min_index))
+    return label
+
+# Features
+
+@register_feature('avg_word_len', depends=['num_letters', 'end_with_prime_s'], dtype='float32')
+def avg_word_len(windows):
+    # the trailing 's of the joined example does not count
+    n = windows.example_len
+    avg_word_len = (windows.sum('num_letters') - windows.at('end_with_prime_s', n+1)) / n
+    lexicons = windows.token_table['lexicons']
+    for row, example_joined in enumerate(windows.examples):
+        if example_joined in lexicons['prefix_white'] or example_joined in lexicons['suffix_white']:
+            avg_word_len[row] = len(example_joined.replace(' ', '')) / n
+    return avg_word_len
+
+def not_empty(windows):
+    # an example joined by spaces is only empty when it is a single empty token
+    if windows.example_len == 1:
+        return ~windows.at('is_empty', 2)
+    return np.ones(windows.num_windows, dtype=bool)
+
+@register_feature('all_lowercase', depends=['has_upper', 'is_empty'])
+def all_lowercase(windows):
+    return (windows.sum('has_upper') == 0) & not_empty(windows)
+
+@register_feature('all_word_capital', depends=['is_capital'])
+def all_word_capital(windows):
+    return windows.sum('is_capital') == windows.example_len
+
+@register_feature('all_uppercase', depends=['has_lower', 'is_empty'])
+def all_uppercase(windows):
+    return (windows.sum('has_lower') == 0) & not_empty(windows)
+
+@register_feature('contains_amazing_char', depends=['has_amazing_char'])
+def contains_amazing_char(windows):
+    return windows.sum('has_amazing_char') > 0
+
+@register_feature('surrounded_by_paren', depends=['has_lparen', 'has_rparen'])
+def surrounded_by_paren(windows):
+    return brackets_matching(windows, 'has_lparen', 'has_rparen')
+
+# note that "right" refers to the last word of the example, not the word after it
+
+@register_feature('has_left_comma', depends=['end_with_comma'])
+def has_left_comma(windows):
+    return windows.at('end_with_comma', 1)
+
+@register_feature('has_right_comma', depends=['end_with_comma'])
+def has_right_comma(windows):
+    return windows.at('end_with_comma', windows.example_len+1)
+
+@register_feature('has_left_period', depends=['end_with_period'])
+def has_left_period(windows):
+    return windows.at('end_with_period', 1)
+
+@register_feature('has_right_period', depends=['end_with_period'])
+def has_right_period(windows):
+    return windows.at('end_with_period', windows.example_len+1)
+
+@register_feature('prefix_in_whitelist', depends=['in_prefix_white'])
+def prefix_in_whitelist(windows):
+    return windows.at('in_prefix_white', 1)
+
+@register_feature('prefix_in_blacklist', depends=['in_prefix_black'])
+def prefix_in_blacklist(windows):
+    return windows.at('in_prefix_black', 1)
+
+@register_feature('suffix_in_whitelist', depends=['in_suffix_white'])
+def suffix_in_whitelist(windows):
+    return windows.at('in_suffix_white', windows.example_len+2)
+
+@register_feature('suffix_in_blacklist', depends=['in_suffix_black'])
+def suffix_in_blacklist(windows):
+    return windows.at('in_suffix_black', windows.example_len+2)
+
+@register_feature('next_word_verb', depends=['can_be_verb'])
+def next_word_verb(windows):
+    return windows.at('can_be_verb', windows.example_len+2)
+
+@register_feature('all_noun', depends=['can_be_noun'])
+def all_noun(windows):
+    return windows.sum('can_be_noun') == windows.example_len
+
+@register_feature('proper_noun_rate', depends=['is_proper_noun'], dtype='float32')
+def proper_noun_rate(windows):
+    # at most one proper noun is counted per example
+    return (windows.sum('is_proper_noun') > 0) / windows.example_len
+
+@register_feature('num_of_extras', depends=['extras_cumsum'], dtype='int16')
+def num_of_extras(windows):
+    return windows.middle_count('extras_cumsum')
+
+@register_feature('black_word_rate', depends=['in_black'], dtype='float32')
+def black_word_rate(windows):
+    return windows.sum('in_black') / windows.example_len
+
+@register_feature('all_black_word', depends=['in_black'])
+def all_black_word(windows):
+    return windows.sum('in_black') == windows.example_len
+
+@register_feature('surrounding_black_word', depends=['in_black'])
+def surrounding_black_word(windows):
+    return windows.at('in_black', 1) | windows.at('in_black', windows.example_len+2)
+
+# features that did not help, kept registered but disabled
+
+@register_feature('end_with_prime_s', depends=['fullmatch_prime_s'], enabled=False)
+def end_with_prime_s_feature(windows):
+    return windows.at('fullmatch_prime_s', windows.example_len+1)
+
+@register_feature('surrounding_word_and', depends=['is_and'], enabled=False)
+def surrounding_word_and(windows):
+    return windows.at('is_and', 1) | windows.at('is_and', windows.example_len+2)
+
+@register_feature('contains_period_in_middle', depends=['period_cumsum'], enabled=False)
+def contains_period_in_middle(windows):
+    return windows.middle_count('period_cumsum') > 0
+
+@register_feature('contains_comma_in_middle', depends=['comma_cumsum'], enabled=False)
+def contains_comma_in_middle(windows):
+    return windows.middle_count('comma_cumsum') > 0
+
+@register_feature('contains_paren_in_middle', depends=['paren_cumsum'], enabled=False)
+def contains_paren_in_middle(windows):
+    return windows.middle_count('paren_cumsum') > 0
+
+@register_feature('surrounding_word_capital', depends=['is_capital'], enabled=False)
+def surrounding_word_capital(windows):
+    return windows.at('is_capital', 1) | windows.at('is_capital', windows.example_len+2)
+
+# the attributes labels are computed from, never charged to a feature
+LABEL_ATTRS = ['has_lbrace', 'has_rbrace']
+
+# ========================================================================
+# Pruning rules drop windows that can never be person names before they  ||
+# are featurized, so the feature store, the classifiers and predict only ||
+# see the surviving candidates. A rule maps all windows of one length to ||
+# a mask of the windows it drops. Rules are enabled by default only if   ||
+# they drop next to no positive of the marked documents, which is        ||
+# checked by "gen_feature_cv_eval.py prune-report".                      ||
+# ========================================================================
+
+@register_prune_rule('all_lowercase', depends=['has_upper', 'is_empty'], enabled=False)
+def prune_all_lowercase(windows):
+    return all_lowercase(windows)
+
+@register_prune_rule('no_letters', depends=['num_letters'])
+def prune_no_letters(windows):
+    return windows.sum('num_letters') == 0
+
+@register_prune_rule('all_black_word', depends=['in_black'], enabled=False)
+def prune_all_black_word(windows):
+    return all_black_word(windows)
+
+@register_prune_rule('starts_lowercase', depends=['is_capital'], enabled=False)
+def prune_starts_lowercase(windows):
+    return ~windows.at('is_capital', 2)
+
+def gen_prune_masks(windows, rule_names):
+    """Returns the mask of the windows dropped by each of the given pruning rules"""
+    masks = OrderedDict()
+    for name in rule_names:
+        for depend in PRUNE_RULES[name]['depends']:
+            get_attr(windows.token_table, depend)
+        masks[name] = PRUNE_RULES[name]['func'](windows)
+    return masks
+
+def get_keep_mask(windows):
+    """Returns the mask of the windows kept by all enabled pruning rules, computed once per example length"""
+    keep_name = 'keep_mask_{}'.format(windows.example_len)
+    if keep_name not in windows.token_table:
+        keep = np.ones(windows.num_windows, dtype=bool)
+        for drop in gen_prune_masks(windows, get_prune_rule_names()).values():
+            keep &= ~drop
+        windows.token_table[keep_name] = keep
+    return windows.token_table[keep_name]
+
+def gen_prune_stats(token_table, max_example_len):
+    """Given the token table of a marked document, returns the number of windows and of positive windows of
+    length 1 to max_example_len, in total ("all"), dropped by each registered pruning rule, and dropped by
+    all enabled rules together ("enabled"), as a dict of name -> [windows, positives]"""
+    stats = OrderedDict([('all', [0, 0])] + [(name, [0, 0]) for name in PRUNE_RULES] + [('enabled', [0, 0])])
+    for example_len in range(1, max_example_len+1):
+        windows = Windows(token_table, example_len)
+        labels = brackets_matching(windows, 'has_lbrace', 'has_rbrace')
+        masks = gen_prune_masks(windows, PRUNE_RULES)
+        masks['all'] = np.ones(windows.num_windows, dtype=bool)
+        masks['enabled'] = ~get_keep_mask(windows)
+        for name, mask in masks.items():
+            stats[name][0] += int(mask.sum())
+            stats[name][1] += int((mask & labels).sum())
+    return stats
+
+# Feature Matrix
+
+def gen_feature_matrix(token_table, example_len, features=None):
+    """Given a token table and an example length, returns the examples, the feature matrix and
+    the label vector of every window of that length kept by the pruning rules.
+    The features are written into the first rows of "features" if given."""
+    windows = Windows(token_table, example_len)
+    keep = get_keep_mask(windows)
+    num_kept = int(keep.sum())
+    feature_names = get_feature_names()
+    if features is None:
+        features = np.empty((num_kept, len(feature_names)), dtype=FEATURE_MATRIX_DTYPE)
+    features = features[:num_kept]
+
+    for col, name in enumerate(feature_names):
+        feature = FEATURES[name]
+        for depend in feature['depends']:
+            get_attr(token_table, depend)
+        start = timeit.default_timer()
+        features[:, col] = feature['func'](windows)[keep]
+        record_time(feature_stats, name, timeit.default_timer() - start)
+
+    labels = brackets_matching(windows, 'has_lbrace', 'has_rbrace')[keep].astype(LABEL_DTYPE)
+    examples = [example for example, kept in zip(windows.examples, keep.tolist()) if kept]
+
+    return examples, features, labels
+
+def gen_doc_feature_matrix(token_table, max_example_len):
+    """Given a token table, returns the examples, the feature matrix and the label vector of every window
+    of length 1 to max_example_len kept by the pruning rules, filled into one matrix preallocated for the
+    whole document"""
+    num_windows_list = [count_windows(token_table, example_len) for example_len in range(1, max_example_len+1)]
+    features = np.empty((sum(num_windows_list), len(get_feature_names())), dtype=FEATURE_MATRIX_DTYPE)
+    labels = np.empty(len(features), dtype=LABEL_DTYPE)
+    examples = list()
+    row = 0
+    for example_len, num_windows in zip(range(1, max_example_len+1), num_windows_list):
+        examples_len, _, labels_len = gen_feature_matrix(token_table, example_len, features[row:row+num_windows])
+        labels[row:row+len(labels_len)] = labels_len
+        examples.extend(examples_len)
+        row += len(labels_len)
+    return examples, features[:row], labels[:row]
+
+def gen_doc_window_spans(token_table, max_example_len):
+    """Given a token table, returns the start (offset of the first word in the unpadded document) and the
+    length of every window of length 1 to max_example_len kept by the pruning rules, in the row order of
+    gen_doc_feature_matrix"""
+    starts, lengths = list(), list()
+    for example_len in range(1, max_example_len+1):
+        windows = Windows(token_table, example_len)
+        keep = get_keep_mask(windows)
+        starts.append(np.arange(windows.num_windows)[keep])
+        lengths.append(np.full(int(keep.sum()), example_len))
+    return np.concatenate(starts), np.concatenate(lengths)
+
+def get_feature_costs():
+    """Returns the seconds spent on each enabled feature since the last reset_stats(): its own time plus the
+    time of the token attributes no other enabled feature (nor the labels or pruning) depends on, i.e. what disabling it saves"""
+    feature_names = get_feature_names()
+    attr_users = dict()
+    for name in feature_names:
+        for attr in get_attr_closure(FEATURES[name]['depends']):
+            attr_users.setdefault(attr, set()).add(name)
+    # attributes of the labels and of the pruning rules are needed whatever the features
+    shared_attrs = get_attr_closure(LABEL_ATTRS + [depend for name in get_prune_rule_names() for depend in PRUNE_RULES[name]['depends']])
+    costs = OrderedDict()
+    for name in feature_names:
+        cost = feature_stats.get(name, [0, 0.0])[1]
+        for attr in get_attr_closure(FEATURES[name]['depends']):
+            if attr_users[attr] == set([name]) and attr not in shared_attrs:
+                cost += attr_stats.get(attr, [0, 0.0])[1]
+        costs[name] = cost
+    return costs
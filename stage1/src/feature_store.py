@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import hashlib
+import numpy as np
+
+from feature_engine import FEATURE_SET_VERSION, FEATURE_MATRIX_DTYPE, LABEL_DTYPE, get_feature_set_hash
+from lexicons import get_lexicons
+from shared_arrays import create_shared_array, attach_shared_array
+from corpus_index import get_indexed_key
+
+FEATURE_STORE_DIR = '../features/'
+GATHER_BATCH_SIZE = 64 # documents copied together by a worker in gather_shared()
+# a window is its document, the offset of its first word in the unpadded document and its length in words
+WINDOW_DTYPE = np.dtype([('doc_id', np.int32), ('start', np.int32), ('length', np.int8)])
+
+# ========================================================================
+# Every document is stored under the hash of its content, in a directory ||
+# named after the feature set version, the max example length, the       ||
+# enabled features and the lexicons, so a changed document or a changed  ||
+# feature definition is simply a miss. Each entry is three files, all    ||
+# loaded memory-mapped:                                                  ||
+#   <key>.features.npy   float32 feature matrix                          ||
+#   <key>.labels.npy     int8 label vector                               ||
+#   <key>.windows.npy    window table (WINDOW_DTYPE), in the same order  ||
+# Example strings are not stored, they are cut from the document text    ||
+# by their window when needed.                                           ||
+# ========================================================================
+
+def get_store_dir(max_example_len):
+    return os.path.join(FEATURE_STORE_DIR, 'v{}_len{}_{}_{}'.format(
+        FEATURE_SET_VERSION, max_example_len, get_feature_set_hash()[:12], get_lexicons()['hash'][:12]))
+
+def get_doc_key(doc_path):
+    """Given a document, returns the hash of its content, from the corpus index if it is indexed"""
+    doc_key = get_indexed_key(doc_path)
+    if doc_key is not None:
+        return doc_key
+    with open(doc_path, 'rb') as doc:
+        return hashlib.sha1(doc.read()).hexdigest()
+
+def get_entry_paths(store_dir, doc_key):
+    prefix = os.path.join(store_dir, doc_key)
+    return prefix + '.features.npy', prefix + '.labels.npy', prefix + '.windows.npy'
+
+def has_doc(store_dir, doc_key):
+    return all(os.path.exists(path) for path in get_entry_paths(store_dir, doc_key))
+
+def gen_doc_windows(starts, lengths):
+    """Given the start and length of every window of a document, returns its window table"""
+    windows = np.zeros(len(starts), dtype=WINDOW_DTYPE)
+    windows['start'] = starts
+    windows['length'] = lengths
+    return windows
+
+def save_doc(store_dir, doc_key, windows, features, labels):
+    """Save the window table, feature matrix and label vector of a document into the store.
+    Each file is written to a temporary name first, so readers never see a partial entry."""
+    os.makedirs(store_dir, exist_ok=True)
+    features_path, labels_path, windows_path = get_entry_paths(store_dir, doc_key)
+    tmp_suffix = '.{}.tmp'.format(os.getpid())
+    # the window table is written last, since has_doc() checks all three
+    for path, array in [(features_path, features.astype(FEATURE_MATRIX_DTYPE, copy=False)),
+                        (labels_path, labels.astype(LABEL_DTYPE, copy=False)),
+                        (windows_path, windows)]:
+        with open(path + tmp_suffix, 'wb') as f:
+            np.save(f, array)
+        os.replace(path + tmp_suffix, path)
+
+def load_doc_arrays(store_dir, doc_key):
+    """Returns the feature matrix and label vector of a document in the store, memory-mapped"""
+    features_path, labels_path, _ = get_entry_paths(store_dir, doc_key)
+    return np.load(features_path, mmap_mode='r'), np.load(labels_path, mmap_mode='r')
+
+def load_doc(store_dir, doc_key):
+    """Returns the window table, feature matrix and label vector of a document in the store, memory-mapped"""
+    features, labels = load_doc_arrays(store_dir, doc_key)
+    return np.load(get_entry_paths(store_dir, doc_key)[2], mmap_mode='r'), features, labels
+
+def gather(store_dir, doc_keys):
+    """Given a list of document keys, returns the window table, feature matrix and label vector of all
+    their rows, gathered from the store in that order. The doc_id of a window is the index of its document."""
+    entries = [load_doc(store_dir, doc_key) for doc_key in doc_keys]
+    num_rows = sum(len(labels) for _, _, labels in entries)
+    num_features = entries[0][1].shape[1] if entries else 0
+    windows = np.empty(num_rows, dtype=WINDOW_DTYPE)
+    features = np.empty((num_rows, num_features), dtype=FEATURE_MATRIX_DTYPE)
+    labels = np.empty(num_rows, dtype=LABEL_DTYPE)
+    row = 0
+    for index, (windows_doc, features_doc, labels_doc) in enumerate(entries):
+        num_rows_doc = len(labels_doc)
+        windows[row:row+num_rows_doc] = windows_doc
+        windows['doc_id'][row:row+num_rows_doc] = index
+        features[row:row+num_rows_doc] = features_doc
+        labels[row:row+num_rows_doc] = labels_doc
+        row += num_rows_doc
+    return windows, features, labels
+
+def copy_docs_to_shared(task):
+    """Given a task (store directory, [(document key, first row, document index)], specs of the shared
+    window table, feature matrix and label vector), copy the documents into their rows"""
+    store_dir, entries, specs = task
+    windows, features, labels = [attach_shared_array(spec) for spec in specs]
+    for doc_key, row, index in entries:
+        windows_doc, features_doc, labels_doc = load_doc(store_dir, doc_key)
+        num_rows_doc = len(labels_doc)
+        windows[row:row+num_rows_doc] = windows_doc
+        windows['doc_id'][row:row+num_rows_doc] = index
+        features[row:row+num_rows_doc] = features_doc
+        labels[row:row+num_rows_doc] = labels_doc
+
+def gather_shared(store_dir, doc_keys, pool):
+    """Same as gather(), but the window table, feature matrix and label vector are allocated in shared memory
+    and filled by the workers of pool, each copying a batch of documents straight from the store into its rows"""
+    # only the headers of the .npy files are read here
+    num_rows_list = [len(load_doc_arrays(store_dir, doc_key)[1]) for doc_key in doc_keys]
+    num_features = load_doc_arrays(store_dir, doc_keys[0])[0].shape[1] if doc_keys else 0
+    num_rows = sum(num_rows_list)
+    windows, windows_spec = create_shared_array((num_rows,), WINDOW_DTYPE)
+    features, features_spec = create_shared_array((num_rows, num_features), FEATURE_MATRIX_DTYPE)
+    labels, labels_spec = create_shared_array((num_rows,), LABEL_DTYPE)
+    specs = (windows_spec, features_spec, labels_spec)
+
+    entries = list()
+    row = 0
+    for index, (doc_key, num_rows_doc) in enumerate(zip(doc_keys, num_rows_list)):
+        entries.append((doc_key, row, index))
+        row += num_rows_doc
+    tasks = [(store_dir, entries[start:start+GATHER_BATCH_SIZE], specs) for start in range(0, len(entries), GATHER_BATCH_SIZE)]
+    pool.map(copy_docs_to_shared, tasks, chunksize=1)
+    return windows, features, labels
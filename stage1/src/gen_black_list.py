@@ -1,37 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
 import os
-import pandas as pd
 import re
+import sys
+import json
+import argparse
+import multiprocessing
+
+from collections import Counter
+
+from lexicons import BLACK_WHITE_LIST_DIR
+
+BLACK_LIST_PATH = BLACK_WHITE_LIST_DIR + 'black_list.txt'
+CONTRIBUTIONS_PATH = '../lists/black_list.contributions.json'
+CONTRIBUTIONS_VERSION = 3 # bump when possible_black_counts() or the saved entries change, to recount every document
+CHUNK_SIZE = 8 # documents counted together by a worker
 
-FILTERED_DOC_DIR = '../filtered_documents/'
-MAX_EXAMPLE_LEN = 3
-doc_list = os.listdir(FILTERED_DOC_DIR)
+# ========================================================================
+# The black list is every capitalized word that is not part of a marked  ||
+# person name, nor next to one. The count of every candidate word in     ||
+# every document is kept in CONTRIBUTIONS_PATH under the hash of the     ||
+# document, so only new and changed documents are read and counted,      ||
+# by a pool of workers. Counts are kept, with the path of the document,  ||
+# for every document counted, so lists built from different splits share ||
+# them, and dropped once the document is deleted or changed. A word      ||
+# makes the list if it is seen at least --min-count times in at least    ||
+# --min-docs documents (by default, every word seen). The list is built  ||
+# from the training split only, as words of the test split would leak    ||
+# into eval.                                                             ||
+# ========================================================================
 
 def remove_extras(s):
-	if s[-2:] == '\'s':
-		s = s[:-2]
-	s = re.sub('[^a-zA-Z\.]', '', s)
-	return s
-
-def possible_black_generation(text):
-	parts = text.split(' ')
-	black_set = set()
-	for index in range(2, len(parts) - 2):
-		if ('{' in parts[index - 2]) or ('{' in parts[index - 1]) or ('{' in parts[index]):
-			continue
-		if ('}' in parts[index]) or ('}' in parts[index + 1]) or ('}' in parts[index + 2]):
-			continue
-		if re.fullmatch('[A-Z].*', parts[index]):
-			black_set.add(remove_extras(parts[index]))
-	return black_set
-
-
-
-black_set = set()
-for doc_name in doc_list:
-	doc = open(FILTERED_DOC_DIR+doc_name, 'r')
-	text = ' '.join(doc.readlines()[2:])
-	text = '. . ' + text + ' . .' # pad with '. .' at both ends
-	black_set = black_set | possible_black_generation(text)
-for s in black_set:
-	print(s)
-	
\ No newline at end of file
+    if s[-2:] == '\'s':
+        s = s[:-2]
+    s = re.sub('[^a-zA-Z\.]', '', s)
+    return s
+
+def possible_black_counts(parts):
+    """Given the padded tokens of a marked document, returns the count of every candidate black word"""
+    counts = Counter()
+    for index in range(2, len(parts) - 2):
+        if ('{' in parts[index - 2]) or ('{' in parts[index - 1]) or ('{' in parts[index]):
+            continue
+        if ('}' in parts[index]) or ('}' in parts[index + 1]) or ('}' in parts[index + 2]):
+            continue
+        if re.fullmatch('[A-Z].*', parts[index]):
+            word = remove_extras(parts[index])
+            if word:
+                counts[word] += 1
+    return counts
+
+def count_doc(doc):
+    from gen_feature_cv_eval import read_doc_text, gen_doc_tokens
+
+    doc_key, doc_path = doc
+    stat = os.stat(doc_path)
+    return doc_key, {'path': doc_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                     'counts': dict(possible_black_counts(gen_doc_tokens(read_doc_text(doc_path))))}
+
+def load_contributions():
+    """Returns the saved counts of every document,
+    {document key: {"path": document path, "size": ..., "mtime_ns": ..., "counts": {word: count}}}"""
+    try:
+        with open(CONTRIBUTIONS_PATH, 'r') as f:
+            contributions = json.load(f)
+        if contributions['version'] == CONTRIBUTIONS_VERSION:
+            return contributions['docs']
+    except (OSError, ValueError, KeyError):
+        pass
+    return dict()
+
+def save_contributions(doc_counts):
+    tmp_path = CONTRIBUTIONS_PATH + '.{}.tmp'.format(os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': CONTRIBUTIONS_VERSION, 'docs': doc_counts}, f, separators=(',', ':'))
+    os.replace(tmp_path, CONTRIBUTIONS_PATH)
+
+def is_current(doc_key, entry):
+    """Whether the document of a saved entry still has the content it was counted from.
+    It is hashed again only if its mtime changed, and not at all if its size did."""
+    from feature_store import get_doc_key
+
+    try:
+        stat = os.stat(entry['path'])
+    except OSError:
+        return False
+    if stat.st_size != entry['size']:
+        return False
+    return stat.st_mtime_ns == entry['mtime_ns'] or get_doc_key(entry['path']) == doc_key
+
+def update_contributions(doc_paths, workers):
+    """Returns the counts of every given document, counting only the documents not counted before,
+    the number of documents counted, and the number of saved documents dropped as deleted or changed"""
+    from feature_store import get_doc_key
+
+    saved = load_contributions()
+    doc_keys = [get_doc_key(doc_path) for doc_path in doc_paths]
+    stale = [doc_key for doc_key, entry in saved.items() if not is_current(doc_key, entry)]
+    for doc_key in stale:
+        del saved[doc_key]
+    missing = dict((doc_key, doc_path) for doc_key, doc_path in zip(doc_keys, doc_paths) if doc_key not in saved)
+    if missing:
+        with multiprocessing.Pool(processes=workers) as pool:
+            saved.update(pool.imap_unordered(count_doc, missing.items(), chunksize=CHUNK_SIZE))
+    if missing or stale:
+        save_contributions(saved)
+    return dict((doc_key, saved[doc_key]['counts']) for doc_key in doc_keys), len(missing), len(stale)
+
+def gen_black_list(doc_counts, min_count=1, min_docs=1):
+    """Returns the black list, the words seen at least min_count times in at least min_docs documents,
+    and the total count and document count of every word"""
+    word_counts, word_docs = Counter(), Counter()
+    for counts in doc_counts.values():
+        word_counts.update(counts)
+        word_docs.update(counts.keys())
+    black_list = sorted(word for word in word_counts if word_counts[word] >= min_count and word_docs[word] >= min_docs)
+    return black_list, word_counts, word_docs
+
+def save_black_list(black_list, list_path):
+    # the list is read by lexicons.py, one word per line
+    tmp_path = list_path + '.{}.tmp'.format(os.getpid())
+    with open(tmp_path, 'w') as f:
+        for word in black_list:
+            f.write(word + '\n')
+    os.replace(tmp_path, list_path)
+
+parser = argparse.ArgumentParser(description='Build the black list from marked documents.')
+parser.add_argument('doc_dirs', nargs='*', default=['set_I'], help='Splits or marked document directories, never the test split (default: set_I).')
+parser.add_argument('--min-count', type=int, default=1, help='Times a word must be seen to be black listed (default: 1).')
+parser.add_argument('--min-docs', type=int, default=1, help='Documents a word must be seen in to be black listed (default: 1).')
+parser.add_argument('--out', default='-', help='Where to write the black list, "-" for stdout (default: -). '
+                    'Pass --out {} to replace the list the features use.'.format(BLACK_LIST_PATH))
+parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Number of worker processes (default: number of cores).')
+
+if __name__ == '__main__':
+    from gen_feature_cv_eval import list_docs
+
+    args = parser.parse_args()
+    doc_paths = [doc_path for doc_dir in args.doc_dirs for doc_path in list_docs(doc_dir)]
+    doc_counts, num_counted, num_dropped = update_contributions(doc_paths, args.workers)
+    black_list, word_counts, word_docs = gen_black_list(doc_counts, args.min_count, args.min_docs)
+
+    if args.out == '-':
+        for word in black_list:
+            print(word)
+    else:
+        save_black_list(black_list, args.out)
+    print('{} documents ({} counted, {} deleted or changed dropped), {} candidate words, {} black listed'.format(
+        len(doc_counts), num_counted, num_dropped, len(word_counts), len(black_list)), file=sys.stderr)
@@ -6,110 +6,64 @@
 
 # ## Import and Setup # In[32]:
 
+# ========================================================================
+# Only light modules are imported here, so that "--help" and every       ||
+# spawned worker start fast. numpy, pandas, nltk, sklearn and the        ||
+# feature modules are imported inside the functions that need them.     ||
+# ========================================================================
+
 import os
 import sys
-import pandas as pd
-import numpy as np
-import re
 import timeit
-import random
-import nltk
+import importlib
 import multiprocessing
 import warnings
+
+from multiprocessing import resource_tracker
 import argparse
 
-from sklearn.model_selection import KFold
-from sklearn.linear_model import RidgeClassifier, LogisticRegression
-from sklearn.svm import LinearSVC
-from sklearn.naive_bayes import GaussianNB
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import precision_score, recall_score, f1_score
-
-pd.set_option('display.max_columns', None)  # or 1000
-pd.set_option('display.max_rows', None)  # or 1000
-pd.set_option('display.max_colwidth', -1)
 warnings.filterwarnings("ignore")
 
 DEBUG = False
 SET_I_DIR = '../documents/set_I/'
 SET_J_DIR = '../documents/set_J/'
+SPLIT_DIRS = {'set_I': SET_I_DIR, 'set_J': SET_J_DIR} # where the splits were copied before the split manifest
+MODEL_PATH = '../models/model.pkl'
 MAX_EXAMPLE_LEN = 3
-PREFIX_SUFFIX_LIST_DIR = '../lists/prefix_suffix_lists/'
-BLACK_WHITE_LIST_DIR = '../lists/black_white_lists/'
-LIST_OF_CLF = [RidgeClassifier, LogisticRegression, LinearSVC, GaussianNB, DecisionTreeClassifier, RandomForestClassifier]
-
-prefix_black_set, prefix_white_set = set(), set()
-suffix_black_set, suffix_white_set = set(), set()
-
-# intialize all black list and white list
-for black_prefix in open(PREFIX_SUFFIX_LIST_DIR + 'prefix_black.txt', 'r').readlines():
-    prefix_black_set.add(black_prefix.strip().lower())
-for white_prefix in open(PREFIX_SUFFIX_LIST_DIR + 'prefix_white.txt', 'r').readlines():
-    prefix_white_set.add(white_prefix.strip().lower())
-for black_suffix in open(PREFIX_SUFFIX_LIST_DIR + 'suffix_black.txt', 'r').readlines():
-    suffix_black_set.add(black_suffix.strip().lower())
-for white_suffix in open(PREFIX_SUFFIX_LIST_DIR + 'suffix_white.txt', 'r').readlines():
-    suffix_white_set.add(white_suffix.strip().lower())
-    
-prefix_suffix_set = set()
-prefix_suffix_set = prefix_black_set | prefix_white_set | suffix_black_set | suffix_white_set
-
-black_set = set()
-for black_word in open(BLACK_WHITE_LIST_DIR + 'black_list.txt', 'r').readlines():
-    black_set.add(black_word.strip().lower())
+EPOCHS = 5 # passes over the training documents in out-of-core mode
+TAG_BATCH_SIZE = 16 # documents POS tagged together by a worker
+FEATURE_REPORT_DOCS = 20 # documents featurized in-process to measure the cost of every feature
+LIST_OF_CLF = ['sklearn.linear_model.RidgeClassifier', 'sklearn.linear_model.LogisticRegression', 'sklearn.svm.LinearSVC',
+               'sklearn.naive_bayes.GaussianNB', 'sklearn.tree.DecisionTreeClassifier', 'sklearn.ensemble.RandomForestClassifier']
+
+pool = None # featurization pool, created by main
 
 # Unil Functions
 
-def brackets_matching(example_padded, lbrace, rbrace):
-    example_len = len(example_padded) - 4
-    label = 0
-    left_brace_max_index = -1
-    for left_index in range(example_len-1, example_len+2):
-        if lbrace in example_padded[left_index]:
-            left_brace_max_index = left_index
-    right_brace_min_index = len(example_padded)
-    for right_index in range(4, 1, -1):
-        if rbrace in example_padded[right_index]:
-            right_brace_min_index = right_index
-    if (left_brace_max_index > -1 and left_brace_max_index <= 2 and 
-        right_brace_min_index < len(example_padded) and right_brace_min_index >= example_len+1):
-        label = 1
-    for left_index in range(example_len-1, example_len+1):
-        if rbrace in example_padded[left_index] and left_index >= left_brace_max_index:
-            label = 0
-            break
-    for right_index in range(4, 2, -1):
-        if lbrace in example_padded[right_index] and right_index <= right_brace_min_index:
-            label = 0
-            break
-    return label
-
-def has_surrounded_symbol(example_padded, pos, symbol):
-    example_len = len(example_padded) - 4
-    if pos == 'left':
-        if example_padded[1][-1] == symbol:
-            return 1
-        else:
-            return 0
-    else:
-        if example_padded[example_len+1][-1] == symbol:
-            return 1
-        else:
-            return 0
+def load_classifiers(clf_paths=LIST_OF_CLF):
+    """Given a list of "module.ClassName" paths, returns the classifier classes"""
+    list_of_clf = list()
+    for clf_path in clf_paths:
+        module_name, class_name = clf_path.rsplit('.', 1)
+        list_of_clf.append(getattr(importlib.import_module(module_name), class_name))
+    return list_of_clf
+
+# Given a split of the manifest (see split_docs.py) or a document directory, returns the paths of its documents
+def list_docs(doc_dir):
+    from corpus_index import get_split_docs
+
+    doc_list = get_split_docs(doc_dir)
+    if doc_list is not None:
+        return doc_list
+    doc_dir = os.path.join(SPLIT_DIRS.get(doc_dir, doc_dir), '')
+    return [doc_dir+doc_name for doc_name in os.listdir(doc_dir) if doc_name.endswith('.txt')]
 
-def remove_extras(s):
-    if s in prefix_white_set or s in suffix_white_set:
-        return s
-    if s[-2:] == '\'s':
-        s = s[:-2]
-    s = re.sub('[^a-zA-Z]', '', s)
-    return s
+def gen_word_prop_dict(text, word_tags=None):
+    from pos_tagger import tag_texts
 
-def gen_word_prop_dict(text):
     word_tag_dict = dict()
-    words = nltk.word_tokenize(text)
-    word_tags = nltk.pos_tag(words)
+    if word_tags is None:
+        word_tags = tag_texts([text])[0]
     for word, tag in word_tags:
         if word not in word_tag_dict:
             word_tag_dict[word] = set(tag)
@@ -117,336 +71,567 @@ def gen_word_prop_dict(text):
             word_tag_dict[word].add(tag)
     return word_tag_dict
 
-label = brackets_matching(['father,', 'Dr.', '{Henry', 'Jones}.', 'The'], '{', '}')
-
 # Feature and Label Definition
 
-# Generate feature matrix and label vector for a document and a particular example length
-def gen_feature_label_example_len(doc_path, text, example_len, word_tag_dict):
-    doc_name = doc_path.split('/')[-1]
+# Wrap the examples, feature matrix and label vector into DataFrames, given the document name of every row.
+# Every feature column has the narrowest dtype of the feature.
+def gen_feature_label_frames(doc_names, examples, features, labels):
+    import pandas as pd
+    from feature_engine import get_feature_dtypes
 
-    feature_vectors = list()
-    labels = list()
-
-    parts = text.split(' ')
-    index = 2
-    while index+example_len+2 <= len(parts):
-        example_padded = parts[index-2:index+example_len+2]
-        example = example_padded[2:2 + example_len]
-        example_joined = ' '.join(example)
-        feature_dict = {'doc_name': doc_name, 'example': example_joined}
-        
-        # ========================================================================
-        # "example_padded" has the following form:                              ||
-        # [pad_0, pad_1, word_1, ..., word_n,                 pad_-2, pad_-1]   ||
-        #  0      1      2            len-3 (example_len+1)   len-2   len-1     ||
-        # ========================================================================
-
-        # generate "avg_word_len" feature
-        feature_dict['avg_word_len'] = len(remove_extras(example_joined).replace(' ', '')) / example_len
-        
-        # generate "all_lowercase" feature
-        feature_dict['all_lowercase'] = 1 if re.fullmatch(r'[^A-Z]+', example_joined) else 0
-        
-        # generate "first_last_word_capital" feature
-        feature_dict['all_word_capital'] = 1
-        for word in example:
-            if not re.fullmatch('[^a-zA-Z]*[A-Z].*', word):
-                feature_dict['all_word_capital'] = 0
-                break
-
-        # generate "all_uppercase" feature
-        feature_dict['all_uppercase'] = 1 if re.fullmatch(r'[^a-z]+', example_joined) else 0
-        
-        # generata "contains_amazing_char" feature
-        feature_dict['contains_amazing_char'] = 0 
-        if re.search(r'[óéöäûâ]', example_joined):
-            feature_dict['contains_amazing_char'] = 1
-        
-        # generate "surrounded_by_paren" feature
-        feature_dict['surrounded_by_paren'] = brackets_matching(example_padded, '(', ')')
-
-        # generate "has_left_comma" feature
-        feature_dict['has_left_comma'] = has_surrounded_symbol(example_padded, 'left', ',')
-        
-        # generate "has_right_comma" feature
-        feature_dict['has_right_comma'] = has_surrounded_symbol(example_padded, 'right', ',')
-        
-        # generate "has_left_period" feature
-        feature_dict['has_left_period'] = has_surrounded_symbol(example_padded, 'left', '.')
-        
-        # generate "has_right_period" feature
-        feature_dict['has_right_period'] = has_surrounded_symbol(example_padded, 'right', '.')
-        
-        # generate "prefix_in_whitelist" feature
-        feature_dict['prefix_in_whitelist'] = 1 if remove_extras(example_padded[1]) in prefix_white_set else 0
-        
-        # generate "prefix_in_blacklist" feature
-        feature_dict['prefix_in_blacklist'] = 1 if (remove_extras(example_padded[1])).lower() in prefix_black_set else 0
-        
-        # generate "suffix_in_whitelist" feature
-        feature_dict['suffix_in_whitelist'] = 1 if remove_extras(example_padded[2 + example_len]) in suffix_white_set else 0
-        
-        # generate "suffix_in_blacklist" feature
-        feature_dict['suffix_in_blacklist'] = 1 if (remove_extras(example_padded[2 + example_len])).lower() in suffix_black_set else 0
-        
-        # generate "next_word_verb" feautre, including be-verb
-        feature_dict['next_word_verb'] = 0
-        next_word = remove_extras(example_padded[2 + example_len])
-        if next_word in word_tag_dict:
-            for tag in word_tag_dict[next_word]:
-                if tag.startswith('V'):
-                    feature_dict['next_word_verb'] = 1
-                    break
-
-        # generate "all_noun" feautre
-        feature_dict['all_noun'] = 1
-        for word in example:
-            word = remove_extras(word)
-            if word not in word_tag_dict:
-                feature_dict['all_noun'] = 0
-                break
-            can_be_noun = False
-            for tag in word_tag_dict[word]:
-                if tag.startswith('N'):
-                    can_be_noun = True
-                    break
-            if not can_be_noun:
-                feature_dict['all_noun'] = 0
-                break
-
-        # generata "proper_noun_rate" feature
-        num_proper_noun = 0
-        for word in example:
-            word = remove_extras(word)
-            if word in word_tag_dict and 'NNP' in word_tag_dict[word]:
-                num_proper_noun += 1
-                break
-        feature_dict['proper_noun_rate'] = num_proper_noun / example_len
-
-        middle_chars = example_joined[2:-2]
-        
-        # generata "num_of_extras" feature
-        feature_dict['num_of_extras'] = len(re.findall(r'[^a-zA-Z\s]', middle_chars))
-
-        # generate "black_word_rate" feature
-        num_black_word = 0
-        for word in example:
-            word = (remove_extras(word)).lower()
-            if word in black_set or word in prefix_suffix_set:
-                num_black_word += 1
-        feature_dict['black_word_rate'] = num_black_word / example_len
-
-        # generate "all_black_word" feature
-        feature_dict['all_black_word'] = 1
-        for word in example:
-            word = (remove_extras(word)).lower()
-            if word not in black_set and word not in prefix_suffix_set:
-                feature_dict['all_black_word'] = 0
-                break
-        
-        # generate "surrounding_black_word" feature
-        feature_dict['surrounding_black_word'] = 0
-        for word in [example_padded[1], example_padded[-2]]:
-            word = (remove_extras(word)).lower()
-            if word in black_set or word in prefix_suffix_set:
-                feature_dict['surrounding_black_word'] = 1
-                break
-
-        # generate "end_with_prime_s" feature
-        # feature_dict['end_with_prime_s'] = 1 if (re.fullmatch('.*\'s', example_padded[1+example_len])) else 0
-        
-        # generata "surrounding_word_and" feature
-        # feature_dict['surrounding_word_and'] = 0
-        # if example_padded[1] == 'and' or example_padded[-2] == 'and':
-        #     feature_dict['surrounding_word_and'] = 1 
-        
-        # generata "contains_period_in_middle" feature
-        # feature_dict['contains_period_in_middle'] = 1 if '.' in middle_chars else 0
-        
-        # generata "contains_comma_in_middle" feature
-        # feature_dict['contains_comma_in_middle'] = 1 if ',' in middle_chars else 0
-
-        # generata "contains_paren_in_middle" feature
-        # feature_dict['contains_paren_in_middle'] = 1 if re.search(r'[()]', middle_chars) else 0
-
-        # generate "surrounding_word_capital" feature
-#         left_capital = re.fullmatch('[^a-zA-Z]*[A-Z].*', example_padded[1])
-#         right_capital = re.fullmatch('[^a-zA-Z]*[A-Z].*', example_padded[2+example_len])
-#         feature_dict['surrounding_word_capital'] = 1 if (left_capital or right_capital) else 0
-        
-        # generate "tf" feature
-        
-        # generate "idf" feature
-        
-        # generate "tf-idf" feature
-
-        
-        feature_vectors.append(pd.DataFrame([feature_dict]))
-
-        # generate label
-        label = brackets_matching(example_padded, '{', '}')
-        # y_len = y_len.append({'example': example_joined, 'is_person_name': label}, ignore_index = True)
-        labels.append(pd.DataFrame([{'doc_name': doc_name, 'example': example_joined, 'is_person_name': label}]))
-
-        index += 1
-
-    X_len = pd.concat(feature_vectors)
-    y_len = pd.concat(labels)
-
-    return X_len, y_len
+    X = pd.DataFrame({'doc_name': doc_names, 'example': examples})
+    for col, (feature_name, dtype) in enumerate(get_feature_dtypes().items()):
+        X[feature_name] = features[:, col].astype(dtype)
+    y = pd.DataFrame({'doc_name': doc_names, 'example': examples, 'is_person_name': labels})
 
-# Generate feature matrix and label vector for a document
-def gen_feature_label_doc(doc_path):
+    return X, y
+
+def read_doc_text(doc_path):
+    from corpus_index import read_indexed_text
 
+    text = read_indexed_text(doc_path)
+    if text is not None:
+        return text
     doc = open(doc_path, 'r')
-    text = ' '.join(doc.readlines()[2:]) # skip the title and empty line
-    word_tag_dict = gen_word_prop_dict(text)
-    
+    return ' '.join(doc.readlines()[2:]) # skip the title and empty line
+
+def gen_doc_tokens(text):
     text = '. . ' + text + ' . .' # pad with '. .' at both ends
+    return text.split(' ')
 
-    X_len_list, y_len_list = list(), list()
+# Generate the token table of a document, given its text and optionally its word tags
+def gen_doc_token_table(text, word_tags=None):
+    from feature_engine import gen_token_table
 
-    for example_len in range(1, MAX_EXAMPLE_LEN+1):
-        X_len, y_len = gen_feature_label_example_len(doc_path, text, example_len, word_tag_dict)
-        X_len_list.append(X_len)
-        y_len_list.append(y_len)
+    word_tag_dict = gen_word_prop_dict(text, word_tags)
 
-    X_doc = pd.concat(X_len_list)
-    y_doc = pd.concat(y_len_list)
+    # per-token attributes are computed once and shared by all example lengths
+    return gen_token_table(gen_doc_tokens(text), word_tag_dict)
 
-    return X_doc, y_doc
+# Generate examples, feature matrix and label vector for a document, given its text and optionally its word tags
+def gen_doc_features(text, word_tags=None):
+    from feature_engine import gen_doc_feature_matrix
+
+    return gen_doc_feature_matrix(gen_doc_token_table(text, word_tags), MAX_EXAMPLE_LEN)
+
+# Generate feature matrix and label vector for a document
+def gen_feature_label_doc(doc_path):
+    examples, features, labels = gen_doc_features(read_doc_text(doc_path))
+    doc_name = doc_path.split('/')[-1]
+    return gen_feature_label_frames([doc_name] * len(examples), examples, features, labels)
+
+# Make sure the features of a batch of documents are in the feature store, and return their keys.
+# Documents missing from the store are POS tagged together in one batch.
+def featurize_docs(doc_paths):
+    from feature_engine import gen_doc_feature_matrix, gen_doc_window_spans
+    from feature_store import get_store_dir, get_doc_key, has_doc, gen_doc_windows, save_doc
+    from pos_tagger import tag_texts
+
+    store_dir = get_store_dir(MAX_EXAMPLE_LEN)
+    doc_keys = [get_doc_key(doc_path) for doc_path in doc_paths]
+    missing = [(doc_key, read_doc_text(doc_path)) for doc_key, doc_path in zip(doc_keys, doc_paths)
+               if not has_doc(store_dir, doc_key)]
+    if missing:
+        word_tags_list = tag_texts([text for _, text in missing])
+        for (doc_key, text), word_tags in zip(missing, word_tags_list):
+            token_table = gen_doc_token_table(text, word_tags)
+            _, features, labels = gen_doc_feature_matrix(token_table, MAX_EXAMPLE_LEN)
+            windows = gen_doc_windows(*gen_doc_window_spans(token_table, MAX_EXAMPLE_LEN))
+            save_doc(store_dir, doc_key, windows, features, labels)
+    return doc_keys
+
+# Featurize a list of documents on the pool in batches, and return their keys in order
+def featurize_doc_list(doc_list):
+    batches = [doc_list[start:start+TAG_BATCH_SIZE] for start in range(0, len(doc_list), TAG_BATCH_SIZE)]
+    return [doc_key for doc_keys in pool.map(featurize_docs, batches, chunksize=1) for doc_key in doc_keys]
+
+# Gather window table, feature matrix and label vector of a list of documents from the feature store into
+# shared memory on the pool
+def load_feature_label(doc_keys):
+    from feature_store import get_store_dir, gather_shared
+
+    return gather_shared(get_store_dir(MAX_EXAMPLE_LEN), doc_keys, pool)
+
+# Cut the example of every given window from the text of its document in doc_list, reading each document once
+def gen_examples(doc_list, windows):
+    doc_tokens = dict()
+    examples = list()
+    for doc_id, start, length in windows.tolist():
+        if doc_id not in doc_tokens:
+            doc_tokens[doc_id] = gen_doc_tokens(read_doc_text(doc_list[doc_id]))
+        # the first word of the unpadded document is token 2
+        examples.append(' '.join(doc_tokens[doc_id][start+2:start+2+length]))
+    return examples
+
+# Wrap the given rows of a window table, feature matrix and label vector into DataFrames, with their examples
+def gen_feature_label_frames_rows(doc_list, windows, features, labels, rows):
+    import numpy as np
+
+    doc_names = [doc_list[doc_id].split('/')[-1] for doc_id in windows['doc_id'][rows].tolist()]
+    X, y = gen_feature_label_frames(doc_names, gen_examples(doc_list, windows[rows]), features[rows], labels[rows])
+    # keep the row numbers of the whole matrix
+    X.index = y.index = np.arange(len(labels))[rows]
+    return X, y
 
 # Generate train/test feature matrix and label vector, given a list of documents
 def gen_feature_label(doc_list):
-    # X = pd.DataFrame()
-    # y = pd.DataFrame(columns=['example', 'is_person_name'])
-    
-    feature_label_doc_list =  pool.map(gen_feature_label_doc, doc_list)
-    feature_matrices, label_vectors = zip(*feature_label_doc_list)
+    # only new or changed documents are featurized, the rest are read back from the feature store
+    doc_keys = featurize_doc_list(doc_list)
+    return load_feature_label(doc_keys)
+
+# Score every window of a document with a trained model, and return the person name mentions found,
+# as non-overlapping spans picked greedily by score
+def predict_doc(model, text):
+    import numpy as np
+    from feature_engine import gen_doc_feature_matrix, gen_doc_window_spans
+
+    token_table = gen_doc_token_table(text)
+    examples, features, _ = gen_doc_feature_matrix(token_table, model['max_example_len'])
+    starts, lengths = gen_doc_window_spans(token_table, model['max_example_len'])
+    if len(examples) == 0:
+        return []
+
+    clf = model['clf']
+    y_predict = clf.predict(features)
+    if hasattr(clf, 'predict_proba'):
+        scores = clf.predict_proba(features)[:, list(clf.classes_).index(1)]
+    elif hasattr(clf, 'decision_function'):
+        scores = clf.decision_function(features)
+    else:
+        scores = y_predict.astype(float)
+
+    mentions = list()
+    taken = np.zeros(len(token_table['words']), dtype=bool)
+    # highest score first, longer spans first on ties
+    for row in np.lexsort((-lengths, -scores)):
+        if y_predict[row] != 1:
+            continue
+        start, end = starts[row], starts[row] + lengths[row]
+        if taken[start:end].any():
+            continue
+        taken[start:end] = True
+        mentions.append({'start': int(start), 'end': int(end), 'text': examples[row], 'score': float(scores[row])})
+    mentions.sort(key=lambda mention: mention['start'])
+    return mentions
+
+# Yield (name, text) of the unmarked documents to predict on, one at a time. An input is either a
+# directory of documents in the same format as set_I, a document file, or "-" for stdin, where every
+# non-empty line is a document.
+def iter_docs(inputs):
+    for doc_input in inputs:
+        if doc_input == '-':
+            for line_no, line in enumerate(sys.stdin, 1):
+                if line.strip():
+                    yield 'stdin:{}'.format(line_no), line
+        elif os.path.isdir(doc_input):
+            for doc_path in sorted(list_docs(os.path.join(doc_input, ''))):
+                yield doc_path.split('/')[-1], read_doc_text(doc_path)
+        else:
+            yield doc_input.split('/')[-1], read_doc_text(doc_input)
+
+# Feature Report
+
+# Featurize a sample of documents in this process, and return the seconds per document spent on every enabled feature
+def profile_features(doc_list, num_docs=FEATURE_REPORT_DOCS):
+    from feature_engine import reset_stats, get_feature_costs
+
+    sample = sorted(doc_list)[:num_docs]
+    reset_stats()
+    for doc_path in sample:
+        gen_doc_features(read_doc_text(doc_path))
+    return dict((name, cost / len(sample)) for name, cost in get_feature_costs().items())
+
+# Print the cost of every enabled feature against the F1 score lost without it, most expensive first,
+# given the mean F1 scores from cv_scheduler.run_ablation()
+def print_feature_report(list_of_clf, f1_scores, costs):
+    import numpy as np
+    from feature_engine import get_feature_names
+
+    f1_scores = np.array(f1_scores)
+    f1_drops = f1_scores[0] - f1_scores[1:]
+    total_cost = sum(costs.values())
+
+    print('==================================================================')
+    print('Mean F1(%) with all features: ' + ', '.join('{} {:.2f}'.format(Clf.__name__, f1*100)
+                                                      for Clf, f1 in zip(list_of_clf, f1_scores[0])))
+    print("{:<30s}{:<15s}{:<15s}{:<15s}{:<15s}".format("Feature", "Cost(ms/doc)", "Cost(%)", "F1 drop(%)", "Max drop(%)"))
+    print('------------------------------------------------------------------')
+    feature_names = get_feature_names()
+    for col in sorted(range(len(feature_names)), key=lambda col: -costs[feature_names[col]]):
+        cost = costs[feature_names[col]]
+        print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}{:<15.2f}'.format(feature_names[col], cost*1000, cost/total_cost*100 if total_cost else 0,
+                                                                  f1_drops[col].mean()*100, f1_drops[col].max()*100))
+    print('==================================================================')
+
+# Add up the pruning statistics of documents, see feature_engine.gen_prune_stats()
+def add_prune_stats(stats, stats_more):
+    if stats is None:
+        return stats_more
+    for name, (num_windows, num_positives) in stats_more.items():
+        stats[name][0] += num_windows
+        stats[name][1] += num_positives
+    return stats
+
+# Sum the pruning statistics of a batch of marked documents. Pruning rules do not depend on POS tags,
+# so the documents are not tagged.
+def gen_prune_stats_docs(doc_paths):
+    from feature_engine import gen_prune_stats
+
+    stats = None
+    for doc_path in doc_paths:
+        stats = add_prune_stats(stats, gen_prune_stats(gen_doc_token_table(read_doc_text(doc_path), word_tags=[]), MAX_EXAMPLE_LEN))
+    return stats
+
+# Sum the pruning statistics of a list of marked documents on the pool
+def gen_prune_stats_doc_list(doc_list):
+    batches = [doc_list[start:start+TAG_BATCH_SIZE] for start in range(0, len(doc_list), TAG_BATCH_SIZE)]
+    stats = None
+    for stats_batch in pool.map(gen_prune_stats_docs, batches, chunksize=1):
+        stats = add_prune_stats(stats, stats_batch)
+    return stats
+
+# Return the number of positives the enabled pruning rules drop from each of a batch of marked documents
+def gen_pruned_positives_docs(doc_paths):
+    from feature_engine import gen_prune_stats
+
+    return [gen_prune_stats(gen_doc_token_table(read_doc_text(doc_path), word_tags=[]), MAX_EXAMPLE_LEN)['enabled'][1]
+            for doc_path in doc_paths]
+
+# Return the number of positives the enabled pruning rules drop from each of a list of marked documents, on the pool.
+# Pruned positives are never seen by the classifiers, so eval and cv count them as false negatives.
+def gen_pruned_positives_doc_list(doc_list):
+    batches = [doc_list[start:start+TAG_BATCH_SIZE] for start in range(0, len(doc_list), TAG_BATCH_SIZE)]
+    return [num_pruned for batch in pool.map(gen_pruned_positives_docs, batches, chunksize=1) for num_pruned in batch]
+
+def print_pruned_positives(num_pruned):
+    if num_pruned:
+        print("Pruning dropped {} positives of the test documents, they are counted as false negatives".format(num_pruned),
+              file=sys.stderr)
+
+# Subcommands
+
+def build_lexicons(args):
+    from lexicons import build_snapshot, LEXICON_SNAPSHOT_PATH
+
+    snapshot = build_snapshot()
+    print('Saved {} lists to {} (hash {})'.format(len(snapshot['lists']), LEXICON_SNAPSHOT_PATH, snapshot['hash']))
+
+def prune_report(args):
+    from feature_engine import get_prune_rule_names
+
+    doc_list = [doc_path for doc_dir in args.doc_dirs for doc_path in list_docs(doc_dir)]
+    stats = gen_prune_stats_doc_list(doc_list)
+
+    num_windows, num_positives = stats.pop('all')
+    enabled_rules = get_prune_rule_names()
+    print('==================================================================================')
+    print('{} documents, {} windows, {} positives'.format(len(doc_list), num_windows, num_positives))
+    print("{:<25s}{:<10s}{:<25s}{:<25s}".format("Rule", "Enabled", "Windows dropped(%)", "Positives dropped(%)"))
+    print('----------------------------------------------------------------------------------')
+    for name, (num_windows_dropped, num_positives_dropped) in stats.items():
+        if name == 'enabled':
+            print('----------------------------------------------------------------------------------')
+            name, enabled = 'all enabled rules', ''
+        else:
+            enabled = 'yes' if name in enabled_rules else 'no'
+        print('{:<25s}{:<10s}{:<25s}{:<25s}'.format(name, enabled,
+              '{} ({:.2f})'.format(num_windows_dropped, num_windows_dropped / max(num_windows, 1) * 100),
+              '{} ({:.2f})'.format(num_positives_dropped, num_positives_dropped / max(num_positives, 1) * 100)))
+    print('==================================================================================')
 
-    X = pd.concat(list(feature_matrices))
-    y = pd.concat(list(label_vectors))
+def featurize(args):
+    featurize_start = timeit.default_timer()
 
-    return X, y
+    doc_list = [doc_path for doc_dir in args.doc_dirs for doc_path in list_docs(doc_dir)]
+    featurize_doc_list(doc_list)
 
+    featurize_end = timeit.default_timer()
 
-parser = argparse.ArgumentParser(description='Generate feature matrix and label vector, do Cross Validation/model evaluation.')
-parser.add_argument('mode', choices=['cv', 'eval'], help='Execution mode, can be "cv" (Cross Validation) or "eval" (Model Evaluation).')
+    print("Featurized {} documents: {:.2f}s".format(len(doc_list), featurize_end - featurize_start), file=sys.stderr)
 
-if __name__ == '__main__':
-    
-    train_doc_list = [SET_I_DIR+doc_name for doc_name in os.listdir(SET_I_DIR) if doc_name.endswith('.txt')]
-    test_doc_list = [SET_J_DIR+doc_name for doc_name in os.listdir(SET_J_DIR) if doc_name.endswith('.txt')]
-    
-    pool = multiprocessing.Pool(processes=80)
+def train(args):
+    from feature_store import get_store_dir, gather_shared
+    from model_store import save_model
 
-    args = parser.parse_args()
+    Clf = load_classifiers([args.clf])[0]
+    train_doc_list = [doc_path for doc_dir in args.doc_dirs for doc_path in list_docs(doc_dir)]
 
-    if args.mode == 'cv': # Cross Validation mode
-        print('==================================================================')
-        print("{:<30s}{:<15s}{:<15s}{:<15s}".format("Metrics", "Precision(%)", "Recall(%)", "F1(%)"))
-        score_dict = dict((Clf, []) for Clf in LIST_OF_CLF)
-        train_doc_list = np.array(train_doc_list)
-        kf = KFold(n_splits=10)
-        fold = 0
-        for train_index, valid_index in kf.split(train_doc_list):
-            fold += 1
-            print('-----------------------------Fold {}-------------------------------'.format(fold))
-            train_list = train_doc_list[train_index]
-            valid_list = train_doc_list[valid_index]
-            X_train, y_train = gen_feature_label(train_list)
-            X_valid, y_valid = gen_feature_label(valid_list)
+    train_start = timeit.default_timer()
 
-            X_train_no_example = X_train.drop(['doc_name', 'example'], axis=1).astype('float')
-            X_valid_no_example = X_valid.drop(['doc_name', 'example'], axis=1).astype('float')
+    train_doc_keys = featurize_doc_list(train_doc_list)
+    if args.out_of_core:
+        from out_of_core import train_out_of_core
 
-            y_train_no_example = y_train['is_person_name'].astype('float')
-            y_valid_no_example = y_valid['is_person_name'].astype('float')
+        pool.close()
+        try:
+            clf = train_out_of_core(Clf, get_store_dir(MAX_EXAMPLE_LEN), train_doc_keys, args.epochs)
+        except ValueError as e:
+            sys.exit(str(e))
+    else:
+        _, features, labels = gather_shared(get_store_dir(MAX_EXAMPLE_LEN), train_doc_keys, pool)
+        pool.close()
+        clf = Clf()
+        clf.fit(features, labels)
+    try:
+        save_model(args.model, clf, args.clf, MAX_EXAMPLE_LEN)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    train_end = timeit.default_timer()
+
+    print("Trained {} on {} documents, saved to {}: {:.2f}s".format(
+        Clf.__name__, len(train_doc_list), args.model, train_end - train_start), file=sys.stderr)
+
+def predict(args):
+    import json
+    from model_store import load_model
+
+    try:
+        model = load_model(args.model)
+    except ValueError as e:
+        sys.exit(str(e))
+    for doc_name, text in iter_docs(args.inputs):
+        mentions = predict_doc(model, text)
+        print(json.dumps({'doc_name': doc_name, 'mentions': mentions}))
+        sys.stdout.flush()
+
+def cross_validate(args):
+    import numpy as np
+    from sklearn.model_selection import KFold
+    from feature_store import get_store_dir, gather_shared
+    from cv_scheduler import run_cv, run_ablation
+
+    list_of_clf = load_classifiers()
+    train_doc_list = list_docs('set_I')
+
+    # featurize every document once, the folds only select rows by document index
+    train_doc_keys = featurize_doc_list(train_doc_list)
+    windows, features, labels = gather_shared(get_store_dir(MAX_EXAMPLE_LEN), train_doc_keys, pool)
+    doc_index = windows['doc_id']
+    pruned_positives = gen_pruned_positives_doc_list(train_doc_list)
+    pool.close()
+
+    # all (fold, classifier) pairs are trained in parallel, scores come back in order
+    kf = KFold(n_splits=10)
+    folds = list(kf.split(train_doc_list))
+    fold_scores = run_cv(features, labels, doc_index, list_of_clf, folds, args.workers, pruned_positives)
+
+    print('==================================================================')
+    print("{:<30s}{:<15s}{:<15s}{:<15s}".format("Metrics", "Precision(%)", "Recall(%)", "F1(%)"))
+    score_dict = dict((Clf, []) for Clf in list_of_clf)
+    fold = 0
+    for clf_scores in fold_scores:
+        fold += 1
+        print('-----------------------------Fold {}-------------------------------'.format(fold))
+        for Clf, (precision, recall, f1) in zip(list_of_clf, clf_scores):
+            score_dict[Clf].append([precision, recall, f1])
 
-            for Clf in LIST_OF_CLF:
-                clf = Clf()
-                clf.fit(X_train_no_example, y_train_no_example)
-                y_predict = clf.predict(X_valid_no_example)
+            print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}'.format(Clf.__name__, precision*100, recall*100, f1*100))
+    print('---------------------------Mean Score------------------------------'.format(fold))
+    for Clf in list_of_clf:
+        scores_each_fold = np.array(score_dict[Clf])
+        scores_mean = np.mean(scores_each_fold, axis=0)
+        print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}'.format(Clf.__name__, scores_mean[0]*100, scores_mean[1]*100, scores_mean[2]*100))
+    print('===================================================================')
 
-                precision = precision_score(y_valid_no_example, y_predict)
-                recall = recall_score(y_valid_no_example, y_predict)
-                f1 = f1_score(y_valid_no_example, y_predict) 
-            
-                score_dict[Clf].append([precision, recall, f1])
-                
-                print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}'.format(Clf.__name__, precision*100, recall*100, f1*100))
-        print('---------------------------Mean Score------------------------------'.format(fold))
-        for Clf in LIST_OF_CLF:
-            scores_each_fold = np.array(score_dict[Clf])
-            scores_mean = np.mean(scores_each_fold, axis=0)
-            print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}'.format(Clf.__name__, scores_mean[0]*100, scores_mean[1]*100, scores_mean[2]*100))
-        print('===================================================================')
+    if args.feature_report:
+        f1_scores = run_ablation(features, labels, doc_index, list_of_clf, folds, args.workers, pruned_positives)
+        print_feature_report(list_of_clf, f1_scores, profile_features(train_doc_list))
 
-    elif args.mode == 'eval': # model evaluation mode
-        
-        # Feature and Label Generation
-        feature_label_gen_start = timeit.default_timer()
+# Model evaluation with incremental learners, streaming the documents from the feature store
+def evaluate_out_of_core(args):
+    from feature_store import get_store_dir
+    from out_of_core import LIST_OF_INCREMENTAL_CLF, train_out_of_core, score_out_of_core
 
-        X_train, y_train = gen_feature_label(train_doc_list)
-        X_test, y_test = gen_feature_label(test_doc_list)
+    list_of_clf = load_classifiers(LIST_OF_INCREMENTAL_CLF)
 
-        feature_label_gen_end = timeit.default_timer()
+    feature_label_gen_start = timeit.default_timer()
 
-        print("Feature/label generation time: {:.2f}s\n".format(feature_label_gen_end - feature_label_gen_start), file=sys.stderr)
+    train_doc_keys = featurize_doc_list(list_docs('set_I'))
+    test_doc_list = list_docs('set_J')
+    test_doc_keys = featurize_doc_list(test_doc_list)
+    num_pruned = sum(gen_pruned_positives_doc_list(test_doc_list))
+    print_pruned_positives(num_pruned)
+    pool.close()
 
+    feature_label_gen_end = timeit.default_timer()
 
-        train_test_start = timeit.default_timer()
-        X_train_no_example = X_train.drop(['doc_name', 'example'], axis=1).astype('float')
-        X_test_no_example = X_test.drop(['doc_name', 'example'], axis=1).astype('float')
+    print("Feature/label generation time: {:.2f}s\n".format(feature_label_gen_end - feature_label_gen_start), file=sys.stderr)
 
-        y_train_no_example = y_train['is_person_name'].astype('float')
-        y_test_no_example = y_test['is_person_name'].astype('float')
+    train_test_start = timeit.default_timer()
+    store_dir = get_store_dir(MAX_EXAMPLE_LEN)
 
+    print('===================================================================')
+    print("{:<30s}{:<15s}{:<15s}{:<15s}".format("Metrics", "Precision(%)", "Recall(%)", "F1(%)"))
+    print('-------------------------------------------------------------------')
 
-        print('===================================================================')
-        print("{:<30s}{:<15s}{:<15s}{:<15s}".format("Metrics", "Precision(%)", "Recall(%)", "F1(%)"))
-        print('-------------------------------------------------------------------')
+    for Clf in list_of_clf:
+        model = train_out_of_core(Clf, store_dir, train_doc_keys, args.epochs)
+        precision, recall, f1 = score_out_of_core(model, store_dir, test_doc_keys, num_pruned)
+        print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}'.format(Clf.__name__, precision*100, recall*100, f1*100))
 
-        for Clf in LIST_OF_CLF:
-            clf = Clf()
-            clf.fit(X_train_no_example, y_train_no_example)
+    print('===================================================================')
 
-            y_predict = clf.predict(X_test_no_example)
+    train_test_end = timeit.default_timer()
 
-            # post processing
-            # y_predict[X_test['black_word_rate'] > 0] = 0
+    print("\nTrain/evaluation time: {:.2f}s".format(train_test_end- train_test_start), file=sys.stderr)
+    print("Completed!", file=sys.stderr)
 
-            precision = precision_score(y_test_no_example, y_predict)
-            recall = recall_score(y_test_no_example, y_predict)
-            f1 = f1_score(y_test_no_example, y_predict)
+def evaluate(args):
+    if args.out_of_core:
+        return evaluate_out_of_core(args)
 
-            print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}'.format(Clf.__name__, precision*100, recall*100, f1*100))
-            
-            # for DEBUG
+    import numpy as np
+    import pandas as pd
+    from cv_scheduler import score_predictions
+    from feature_engine import get_feature_names
+
+    pd.set_option('display.max_columns', None)  # or 1000
+    pd.set_option('display.max_rows', None)  # or 1000
+    pd.set_option('display.max_colwidth', None)
+
+    list_of_clf = load_classifiers()
+    train_doc_list = list_docs('set_I')
+    test_doc_list = list_docs('set_J')
+
+    # Feature and Label Generation
+    feature_label_gen_start = timeit.default_timer()
+
+    _, X_train, y_train = gen_feature_label(train_doc_list)
+    windows_test, X_test, y_test = gen_feature_label(test_doc_list)
+    num_pruned = sum(gen_pruned_positives_doc_list(test_doc_list))
+    print_pruned_positives(num_pruned)
+
+    feature_label_gen_end = timeit.default_timer()
+
+    print("Feature/label generation time: {:.2f}s\n".format(feature_label_gen_end - feature_label_gen_start), file=sys.stderr)
+
+
+    train_test_start = timeit.default_timer()
+
+    print('===================================================================')
+    print("{:<30s}{:<15s}{:<15s}{:<15s}".format("Metrics", "Precision(%)", "Recall(%)", "F1(%)"))
+    print('-------------------------------------------------------------------')
+
+    for Clf in list_of_clf:
+        clf = Clf()
+        clf.fit(X_train, y_train)
+
+        y_predict = clf.predict(X_test)
+
+        # post processing
+        # y_predict[X_test['black_word_rate'] > 0] = 0
+
+        precision, recall, f1 = score_predictions(y_test, y_predict, num_pruned)
+
+        print('{:<30s}{:<15.2f}{:<15.2f}{:<15.2f}'.format(Clf.__name__, precision*100, recall*100, f1*100))
 
-            if DEBUG:
+        # for DEBUG
 
-                if isinstance(clf, LogisticRegression):
-                    coef_df = pd.DataFrame()
-                    coef_df['features'] = X_train_no_example.columns
-                    coef_df['coef'] = clf.coef_[0]
-                    print(coef_df)
+        if DEBUG:
 
-                y_false = y_test[np.not_equal(y_test_no_example, y_predict)]
-                X_false = X_test[np.not_equal(y_test_no_example, y_predict)]
-                
-                print('=============================================')
-                print('Test False Positive: ')
-                print(y_false[y_false['is_person_name'] == 0].reset_index())
+            if Clf.__name__ == 'LogisticRegression':
+                coef_df = pd.DataFrame()
+                coef_df['features'] = get_feature_names()
+                coef_df['coef'] = clf.coef_[0]
+                print(coef_df)
 
-                print('=============================================')
-                print('Test False Negative: ')
-                print(y_false[y_false['is_person_name'] == 1].reset_index())
+            # examples are only cut from the documents for the misclassified windows
+            X_false, y_false = gen_feature_label_frames_rows(test_doc_list, windows_test, X_test, y_test, np.not_equal(y_test, y_predict))
 
-        print('===================================================================')
+            print('=============================================')
+            print('Test False Positive: ')
+            print(y_false[y_false['is_person_name'] == 0].reset_index())
 
-        train_test_end = timeit.default_timer()
+            print('=============================================')
+            print('Test False Negative: ')
+            print(y_false[y_false['is_person_name'] == 1].reset_index())
+
+    print('===================================================================')
+
+    train_test_end = timeit.default_timer()
+
+    print("\nTrain/evaluation time: {:.2f}s".format(train_test_end- train_test_start), file=sys.stderr)
+
+    if args.feature_report:
+        from cv_scheduler import run_ablation
+
+        # set_J is the only fold: train on document 0 (set_I), validate on document 1 (set_J)
+        pool.close()
+        features = np.concatenate((X_train, X_test))
+        labels = np.concatenate((y_train, y_test))
+        doc_index = np.repeat([0, 1], [len(X_train), len(X_test)])
+        f1_scores = run_ablation(features, labels, doc_index, list_of_clf, [([0], [1])], args.workers, [0, num_pruned])
+        print_feature_report(list_of_clf, f1_scores, profile_features(train_doc_list + test_doc_list))
+
+    print("Completed!", file=sys.stderr)
+
+
+common_parser = argparse.ArgumentParser(add_help=False)
+common_parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Number of worker processes for featurization and training (default: number of cores).')
+common_parser.add_argument('--disable', default='', help='Comma-separated features to leave out (default: none).')
+common_parser.add_argument('--prune', help='Comma-separated pruning rules to drop candidate windows with, or "none" (default: the rules enabled in feature_engine.py).')
+
+parser = argparse.ArgumentParser(description='Generate feature matrix and label vector, do Cross Validation/model evaluation.')
+subparsers = parser.add_subparsers(dest='mode', metavar='mode', help='Execution mode.')
+subparsers.required = True
+
+featurize_parser = subparsers.add_parser('featurize', parents=[common_parser], help='Fill the feature store with the features of all documents.')
+featurize_parser.add_argument('doc_dirs', nargs='*', default=['set_I', 'set_J'], help='Splits or document directories (default: set_I and set_J).')
+featurize_parser.set_defaults(func=featurize)
+
+train_parser = subparsers.add_parser('train', parents=[common_parser], help='Train a classifier and save it for "predict".')
+train_parser.add_argument('doc_dirs', nargs='*', default=['set_I'], help='Splits or marked document directories to train on (default: set_I).')
+train_parser.add_argument('--clf', default='sklearn.ensemble.RandomForestClassifier', help='Classifier class to train (default: sklearn.ensemble.RandomForestClassifier).')
+train_parser.add_argument('--model', default=MODEL_PATH, help='Where to save the model (default: {}).'.format(MODEL_PATH))
+train_parser.add_argument('--out-of-core', action='store_true', help='Stream the documents into the classifier a chunk at a time, which must support partial_fit.')
+train_parser.add_argument('--epochs', type=int, default=EPOCHS, help='Passes over the documents in out-of-core mode (default: {}).'.format(EPOCHS))
+train_parser.set_defaults(func=train)
+
+predict_parser = subparsers.add_parser('predict', help='Detect person names in unmarked documents with a saved model, one JSON line per document.')
+predict_parser.add_argument('inputs', nargs='*', default=['-'], help='Document directories, document files or "-" for stdin with one document per line (default: stdin).')
+predict_parser.add_argument('--model', default=MODEL_PATH, help='Saved model to use (default: {}).'.format(MODEL_PATH))
+predict_parser.set_defaults(func=predict)
+
+cv_parser = subparsers.add_parser('cv', parents=[common_parser], help='Cross Validation on set_I.')
+cv_parser.add_argument('--feature-report', action='store_true', help='Also report the cost of every feature against the F1 score lost without it.')
+cv_parser.set_defaults(func=cross_validate)
+
+eval_parser = subparsers.add_parser('eval', parents=[common_parser], help='Model Evaluation, train on set_I and test on set_J.')
+eval_parser.add_argument('--feature-report', action='store_true', help='Also report the cost of every feature against the F1 score lost without it.')
+eval_parser.add_argument('--out-of-core', action='store_true', help='Evaluate incremental classifiers, streaming the documents a chunk at a time.')
+eval_parser.add_argument('--epochs', type=int, default=EPOCHS, help='Passes over the training documents in out-of-core mode (default: {}).'.format(EPOCHS))
+eval_parser.set_defaults(func=evaluate)
+
+prune_report_parser = subparsers.add_parser('prune-report', parents=[common_parser], help='Report how many windows and positives every pruning rule drops on marked documents.')
+prune_report_parser.add_argument('doc_dirs', nargs='*', default=['set_I'], help='Splits or marked document directories (default: set_I).')
+prune_report_parser.set_defaults(func=prune_report)
+
+build_lexicons_parser = subparsers.add_parser('build-lexicons', help='Rebuild the lexicon snapshot from lists/.')
+build_lexicons_parser.set_defaults(func=build_lexicons)
+
+if __name__ == '__main__':
+
+    args = parser.parse_args()
 
-        print("\nTrain/evaluation time: {:.2f}s".format(train_test_end- train_test_start), file=sys.stderr)
-        print("Completed!", file=sys.stderr)
+    # the enabled features and pruning rules are set before the pool forks, so the workers see them too
+    if getattr(args, 'disable', ''):
+        from feature_engine import disable_features
+        try:
+            disable_features(args.disable.split(','))
+        except ValueError as e:
+            parser.error(str(e))
+    if getattr(args, 'prune', None) is not None:
+        from feature_engine import set_enabled_prune_rules
+        try:
+            set_enabled_prune_rules([] if args.prune == 'none' else args.prune.split(','))
+        except ValueError as e:
+            parser.error(str(e))
+
+    if 'workers' in args:
+        # the workers inherit the resource tracker, so the shared arrays they attach to are not
+        # unlinked by a tracker of their own when they exit
+        resource_tracker.ensure_running()
+        pool = multiprocessing.Pool(processes=args.workers)
+
+    args.func(args)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import re
+import json
+import hashlib
+
+PREFIX_SUFFIX_LIST_DIR = '../lists/prefix_suffix_lists/'
+BLACK_WHITE_LIST_DIR = '../lists/black_white_lists/'
+LEXICON_SNAPSHOT_PATH = '../lists/lexicons.snapshot.json'
+LIST_PATHS = [('prefix_black', PREFIX_SUFFIX_LIST_DIR + 'prefix_black.txt'),
+              ('prefix_white', PREFIX_SUFFIX_LIST_DIR + 'prefix_white.txt'),
+              ('suffix_black', PREFIX_SUFFIX_LIST_DIR + 'suffix_black.txt'),
+              ('suffix_white', PREFIX_SUFFIX_LIST_DIR + 'suffix_white.txt'),
+              ('black', BLACK_WHITE_LIST_DIR + 'black_list.txt')]
+
+# ========================================================================
+# The lists are loaded on first use by get_lexicons(), from a snapshot   ||
+# of all of them in one file. The snapshot records the size and mtime of ||
+# every list it was built from, and is rebuilt from lists/ whenever one  ||
+# of them changes (or by "gen_feature_cv_eval.py build-lexicons").       ||
+# ========================================================================
+
+lexicons = None
+
+def get_list_stats():
+    stats = dict()
+    for name, list_path in LIST_PATHS:
+        stat = os.stat(list_path)
+        stats[name] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+def gen_lexicon_hash(word_lists):
+    """Returns a digest of all black lists and white lists, which changes whenever any list changes"""
+    digest = hashlib.sha1()
+    for name, _ in LIST_PATHS:
+        digest.update('\n'.join(word_lists[name]).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def build_snapshot():
+    """Read all black lists and white lists under lists/ and save them as the snapshot"""
+    stats = get_list_stats()
+    word_lists = dict()
+    # intialize all black list and white list
+    for name, list_path in LIST_PATHS:
+        word_set = set()
+        for word in open(list_path, 'r').readlines():
+            word_set.add(word.strip().lower())
+        word_lists[name] = sorted(word_set)
+    snapshot = {'stats': stats, 'hash': gen_lexicon_hash(word_lists), 'lists': word_lists}
+
+    tmp_path = LEXICON_SNAPSHOT_PATH + '.{}.tmp'.format(os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    os.replace(tmp_path, LEXICON_SNAPSHOT_PATH)
+    return snapshot
+
+def load_snapshot():
+    """Returns the snapshot, rebuilt first if it is missing or older than any list"""
+    try:
+        with open(LEXICON_SNAPSHOT_PATH, 'r') as f:
+            snapshot = json.load(f)
+        if snapshot['stats'] == get_list_stats():
+            return snapshot
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_snapshot()
+
+def get_lexicons():
+    """Returns a dict of all word sets ("prefix_black", "prefix_white", "suffix_black", "suffix_white",
+    "black" and their union of prefixes and suffixes "prefix_suffix") and their digest "hash" """
+    global lexicons
+    if lexicons is None:
+        snapshot = load_snapshot()
+        lexicons = dict((name, set(words)) for name, words in snapshot['lists'].items())
+        lexicons['prefix_suffix'] = (lexicons['prefix_black'] | lexicons['prefix_white'] |
+                                     lexicons['suffix_black'] | lexicons['suffix_white'])
+        lexicons['hash'] = snapshot['hash']
+    return lexicons
+
+def remove_extras(s):
+    lexicons = get_lexicons()
+    if s in lexicons['prefix_white'] or s in lexicons['suffix_white']:
+        return s
+    if s[-2:] == '\'s':
+        s = s[:-2]
+    s = re.sub('[^a-zA-Z]', '', s)
+    return s
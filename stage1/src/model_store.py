@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import pickle
+
+from feature_engine import FEATURE_SET_VERSION, get_feature_names, set_enabled_features, get_prune_rule_names, set_enabled_prune_rules
+from lexicons import get_lexicons
+
+def save_model(model_path, clf, clf_path, max_example_len):
+    """Save a fitted classifier, together with everything its features depend on"""
+    model = {'clf': clf,
+             'clf_path': clf_path,
+             'feature_set_version': FEATURE_SET_VERSION,
+             'feature_names': get_feature_names(),
+             'prune_rules': get_prune_rule_names(),
+             'lexicon_hash': get_lexicons()['hash'],
+             'max_example_len': max_example_len}
+    tmp_path = model_path + '.{}.tmp'.format(os.getpid())
+    try:
+        model_dir = os.path.dirname(model_path)
+        if model_dir:
+            os.makedirs(model_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(model, f)
+        os.replace(tmp_path, model_path)
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise ValueError('Cannot save the model to {}: {}'.format(model_path, e.strerror or e))
+    return model
+
+def load_model(model_path):
+    """Load a saved model, and enable exactly the features and pruning rules it was trained with"""
+    try:
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+    except OSError as e:
+        raise ValueError('Cannot read the model {}: {}'.format(model_path, e.strerror or e))
+    except (pickle.UnpicklingError, EOFError):
+        raise ValueError('{} is not a saved model, or it is truncated'.format(model_path))
+    if not isinstance(model, dict) or 'feature_set_version' not in model:
+        raise ValueError('{} is not a saved model'.format(model_path))
+    if model['feature_set_version'] != FEATURE_SET_VERSION:
+        raise ValueError('{} was trained on feature set version {}, the current version is {}, please retrain it'
+                         .format(model_path, model['feature_set_version'], FEATURE_SET_VERSION))
+    if model['lexicon_hash'] != get_lexicons()['hash']:
+        raise ValueError('{} was trained with different black lists and white lists, please retrain it'.format(model_path))
+    set_enabled_features(model['feature_names'])
+    # models saved before pruning was added were trained on every window
+    set_enabled_prune_rules(model.get('prune_rules', []))
+    return model
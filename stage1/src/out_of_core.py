@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import numpy as np
+
+from scipy import sparse
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MaxAbsScaler
+
+from feature_store import load_doc_arrays
+from cv_scheduler import count_predictions, score_counts
+
+CHUNK_DOCS = 256 # documents streamed into a learner at a time
+CLASSES = np.array([0, 1])
+LIST_OF_INCREMENTAL_CLF = ['sklearn.linear_model.SGDClassifier', 'sklearn.linear_model.Perceptron',
+                           'sklearn.linear_model.PassiveAggressiveClassifier', 'sklearn.naive_bayes.BernoulliNB']
+
+# ========================================================================
+# Training and evaluation that never hold more than CHUNK_DOCS documents ||
+# of the feature store in memory. Chunks are read from the memory-mapped ||
+# store entries and handed to the learners as sparse float32 matrices,   ||
+# most features being 0/1 flags that are 0 most of the time. A first     ||
+# pass fits a MaxAbsScaler, which keeps the matrices sparse and the 0/1  ||
+# flags unchanged; every epoch then streams the chunks in a new random   ||
+# order into partial_fit(). Test scores are accumulated from confusion   ||
+# counts, chunk by chunk.                                                ||
+# ========================================================================
+
+def iter_chunks(store_dir, doc_keys, chunk_docs=CHUNK_DOCS, chunk_order=None):
+    """Yields the feature matrix (sparse) and label vector of every chunk of chunk_docs documents,
+    in the given order of chunk indices or in document order"""
+    num_chunks = (len(doc_keys) + chunk_docs - 1) // chunk_docs
+    for chunk in (range(num_chunks) if chunk_order is None else chunk_order):
+        entries = [load_doc_arrays(store_dir, doc_key) for doc_key in doc_keys[chunk*chunk_docs:(chunk+1)*chunk_docs]]
+        features = np.concatenate([features_doc for features_doc, _ in entries]).astype(np.float32)
+        labels = np.concatenate([labels_doc for _, labels_doc in entries]).astype(np.int8)
+        yield sparse.csr_matrix(features), labels
+
+def fit_scaler(store_dir, doc_keys):
+    scaler = MaxAbsScaler()
+    for features, _ in iter_chunks(store_dir, doc_keys):
+        scaler.partial_fit(features)
+    return scaler
+
+def train_out_of_core(Clf, store_dir, doc_keys, epochs, seed=0):
+    """Fit a classifier that supports partial_fit() on the given documents of the feature store,
+    a chunk at a time. Returns a pipeline of the fitted scaler and classifier."""
+    if not hasattr(Clf, 'partial_fit'):
+        raise ValueError('{} cannot be trained out of core, it has no partial_fit()'.format(Clf.__name__))
+    scaler = fit_scaler(store_dir, doc_keys)
+    clf = Clf()
+    rng = np.random.RandomState(seed)
+    num_chunks = (len(doc_keys) + CHUNK_DOCS - 1) // CHUNK_DOCS
+    for _ in range(epochs):
+        for features, labels in iter_chunks(store_dir, doc_keys, chunk_order=rng.permutation(num_chunks)):
+            # rows of a chunk are grouped by document and example length, shuffle them too
+            rows = rng.permutation(len(labels))
+            clf.partial_fit(scaler.transform(features[rows]), labels[rows], classes=CLASSES)
+    return make_pipeline(scaler, clf)
+
+def score_out_of_core(model, store_dir, doc_keys, num_pruned=0):
+    """Returns the precision, recall and F1 score of a fitted model on the given documents of the feature store,
+    num_pruned positives dropped from them by the pruning rules counted as false negatives"""
+    counts = np.zeros(3, dtype=np.int64)
+    for features, labels in iter_chunks(store_dir, doc_keys):
+        counts += count_predictions(labels, model.predict(features))
+    return score_counts(*(int(count) for count in counts), num_pruned=num_pruned)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import nltk
+
+POS_CACHE_PATH = '../features/pos_tags.sqlite3'
+POS_CACHE_MAX_BYTES = 256 * 1024 * 1024 # least recently used documents are evicted beyond this size
+SQLITE_MAX_VARIABLES = 500
+
+# cached tags are only reused by the same tagger
+TAGGER_ID = 'nltk-{}-perceptron'.format(nltk.__version__)
+
+# one tagger and one cache connection per process, created on first use
+tagger = None
+cache_conn, cache_pid = None, None
+
+def get_tagger():
+    global tagger
+    if tagger is None:
+        from nltk.tag.perceptron import PerceptronTagger
+        tagger = PerceptronTagger()
+    return tagger
+
+def get_text_key(text):
+    return hashlib.sha1((TAGGER_ID + '\0' + text).encode('utf-8')).hexdigest()
+
+def open_cache():
+    """Returns the connection of this process to the cache, sqlite connections can not be shared across fork"""
+    global cache_conn, cache_pid
+    if cache_conn is None or cache_pid != os.getpid():
+        os.makedirs(os.path.dirname(POS_CACHE_PATH), exist_ok=True)
+        cache_conn = sqlite3.connect(POS_CACHE_PATH, timeout=60)
+        cache_conn.execute('PRAGMA journal_mode=WAL')
+        cache_conn.execute('CREATE TABLE IF NOT EXISTS pos_tags '
+                           '(key TEXT PRIMARY KEY, word_tags TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+        cache_conn.execute('CREATE INDEX IF NOT EXISTS pos_tags_last_used ON pos_tags (last_used)')
+        cache_pid = os.getpid()
+    return cache_conn
+
+def evict(conn):
+    """Delete least recently used entries until the cache is within POS_CACHE_MAX_BYTES"""
+    total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pos_tags').fetchone()[0]
+    if total_size <= POS_CACHE_MAX_BYTES:
+        return
+    stale_keys, freed_size = list(), 0
+    for key, size in conn.execute('SELECT key, size FROM pos_tags ORDER BY last_used'):
+        stale_keys.append((key,))
+        freed_size += size
+        if total_size - freed_size <= POS_CACHE_MAX_BYTES:
+            break
+    conn.executemany('DELETE FROM pos_tags WHERE key = ?', stale_keys)
+
+def tag_texts(texts):
+    """Given a batch of texts, returns the list of (word, tag) pairs of each text, same as
+    nltk.pos_tag(nltk.word_tokenize(text)). Only texts missing from the cache are tagged."""
+    keys = [get_text_key(text) for text in texts]
+    conn = open_cache()
+
+    word_tags_dict = dict()
+    for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+        key_batch = keys[start:start+SQLITE_MAX_VARIABLES]
+        rows = conn.execute('SELECT key, word_tags FROM pos_tags WHERE key IN ({})'
+                            .format(','.join('?' * len(key_batch))), key_batch)
+        for key, word_tags in rows:
+            word_tags_dict[key] = [tuple(word_tag) for word_tag in json.loads(word_tags)]
+    hit_keys = list(word_tags_dict)
+
+    missing_texts = dict((key, text) for key, text in zip(keys, texts) if key not in word_tags_dict)
+    new_rows = list()
+    now = time.time()
+    if missing_texts:
+        word_tags_list = get_tagger().tag_sents([nltk.word_tokenize(text) for text in missing_texts.values()])
+        for key, word_tags in zip(missing_texts, word_tags_list):
+            word_tags_dict[key] = word_tags
+            word_tags_json = json.dumps(word_tags)
+            new_rows.append((key, word_tags_json, len(word_tags_json), now))
+
+    with conn:
+        conn.executemany('UPDATE pos_tags SET last_used = ? WHERE key = ?', [(now, key) for key in hit_keys])
+        conn.executemany('INSERT OR REPLACE INTO pos_tags VALUES (?, ?, ?, ?)', new_rows)
+        if new_rows:
+            evict(conn)
+
+    return [word_tags_dict[key] for key in keys]
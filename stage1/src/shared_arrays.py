@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import atexit
+import numpy as np
+
+from multiprocessing import shared_memory, resource_tracker
+
+# ========================================================================
+# numpy arrays backed by multiprocessing.shared_memory, so that pool     ||
+# workers can write into or read from the arrays of the main process     ||
+# without pickling them. An array is described to a worker by its spec   ||
+# (block name, shape, dtype), and the worker attaches to the block by    ||
+# name. Blocks are unlinked when the process that created them exits,    ||
+# only by it.                                                            ||
+# ========================================================================
+
+created = dict() # id of an array created here -> (array, spec, block)
+attached = dict() # block name -> block attached to by this process
+
+def create_shared_array(shape, dtype):
+    """Returns a new array of the given shape and dtype in shared memory, and its spec"""
+    dtype = np.dtype(dtype)
+    # a block cannot be empty
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    spec = (block.name, tuple(shape), dtype)
+    created[id(array)] = (array, spec, block)
+    return array, spec
+
+def get_shared_spec(array):
+    """Returns the spec of an array, copied into shared memory first unless it was created there"""
+    if id(array) in created:
+        return created[id(array)][1]
+    shared, spec = create_shared_array(array.shape, array.dtype)
+    shared[...] = array
+    return spec
+
+def attach_shared_array(spec):
+    """Given the spec of an array in shared memory, returns the array"""
+    name, shape, dtype = spec
+    if name not in attached:
+        attached[name] = shared_memory.SharedMemory(name=name)
+        # the block is unlinked by the process that created it, not by the tracker of a worker when it exits
+        resource_tracker.unregister(attached[name]._name, 'shared_memory')
+    return np.ndarray(shape, dtype=dtype, buffer=attached[name].buf)
+
+@atexit.register
+def free_shared_arrays():
+    for _, _, block in created.values():
+        try:
+            block.close()
+        except BufferError:
+            # the array is still referenced, the memory is released at exit anyway
+            pass
+        block.unlink()
+    created.clear()
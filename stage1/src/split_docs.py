@@ -4,55 +4,64 @@
 # @Date    : 2019-03-04 15:50:01
 # @Author  : Bruce Bai (guangtong.bai@wisc.edu)
 
-import re
 import os
-import shutil
+
+from corpus_index import MARKED_DOC_DIR, build_index, load_manifest, save_manifest, get_doc_num
 
 # maybe can spare 393, 194
 BAD_DOC_NUM_SET = set([7, 9, 11, 13, 20, 21, 22, 27, 38, 42, 43, 50, 58, 60, 63, 71, 72, 92, 96, 104, 107, 108, 118, 145, 147, 148, 160, 173, 170, 174, 188, 189, 194, 199, 213, 214, 218, 222, 226, 252, 254, 260, 269, 271, 280, 305, 306, 307, 309, 322, 325, 327, 334, 338, 345, 353, 354, 362, 368, 369, 370, 371, 376, 379, 393])
 
-MARKED_DOC_DIR = '../documents/marked_documents/'
 SET_I_DIR = '../documents/set_I/'
 SET_J_DIR = '../documents/set_J/'
+SPLIT_SIZES = [('set_I', 200), ('set_J', 100)]
 
-def is_bad_doc(doc_path):
+def is_bad_doc(doc_num, num_mentions):
     """Judge whether a document is 'bad'.
     A document is 'bad' if it is in blacklist or
     it contains less than 2 mentions of person names."""
-    print(doc_path)
-    doc_num = int(doc_path.split('.')[0])
-    if doc_num in BAD_DOC_NUM_SET:
-        return True, 0
-    person_name_num = 0
-    doc = open(MARKED_DOC_DIR+doc_path, 'r')
-    for line in doc.readlines()[2:]:
-        person_names = re.findall('{.*?}', line)
-        # print(' '.join(person_names))
-        person_name_num +=  len(person_names)
-    # return person_name_num == 0, person_name_num
-    return False, person_name_num
+    # return num_mentions == 0
+    return doc_num in BAD_DOC_NUM_SET
+
+def bootstrap_manifest():
+    """Returns a manifest of the splits copied into set_I and set_J by earlier versions of this script, if any"""
+    splits = dict((split_name, list()) for split_name, _ in SPLIT_SIZES)
+    splits['filtered'] = list()
+    for split_name, split_dir in [('set_I', SET_I_DIR), ('set_J', SET_J_DIR)]:
+        if os.path.isdir(split_dir):
+            # in listing order, which the cross validation folds were drawn from
+            splits[split_name] = [get_doc_num(doc_name) for doc_name in os.listdir(split_dir) if doc_name.endswith('.txt')]
+    return {'doc_dir': MARKED_DOC_DIR, 'splits': splits}
 
 if __name__ == '__main__':
-    num_docs = 0
-    num_mentions = 0
+    index, num_read = build_index()
+    manifest = load_manifest() or bootstrap_manifest()
+    splits = manifest['splits']
 
-    for doc_name in os.listdir(MARKED_DOC_DIR): 
-        if not doc_name.endswith('.txt'):
+    # only documents in no split yet are assigned, the existing splits never change
+    assigned = set(doc_num for doc_nums in splits.values() for doc_num in doc_nums)
+    num_new, num_left = 0, 0
+    for doc in index['docs']:
+        doc_num = int(doc['doc_num'])
+        if doc_num in assigned:
             continue
-        bad_doc_flag, person_name_num = is_bad_doc(doc_name)
-
-        if bad_doc_flag:
-            print('Filtering out {}'.format(doc_name))
-        else:
-            num_docs += 1
-            if num_docs > 300:
+        if is_bad_doc(doc_num, int(doc['num_mentions'])):
+            splits['filtered'].append(doc_num)
+            num_new += 1
+            continue
+        for split_name, split_size in SPLIT_SIZES:
+            if len(splits[split_name]) < split_size:
+                splits[split_name].append(doc_num)
+                num_new += 1
                 break
-            num_mentions += person_name_num
-            dest_dir = SET_I_DIR if num_docs <= 200 else SET_J_DIR
-            shutil.copyfile(MARKED_DOC_DIR+doc_name, dest_dir+doc_name)
+        else:
+            num_left += 1 # every split is full
+    save_manifest(manifest)
 
-    
-    print('After filtering, there are {} docs, {} mentions'
-        .format(num_docs, num_mentions))
+    num_mentions = dict((int(doc['doc_num']), int(doc['num_mentions'])) for doc in index['docs'])
+    print('Indexed {} docs ({} read), assigned {} new docs, {} left out'.format(len(index['docs']), num_read, num_new, num_left))
+    for split_name, _ in SPLIT_SIZES:
+        print('{}: {} docs, {} mentions'.format(split_name, len(splits[split_name]),
+            sum(num_mentions.get(doc_num, 0) for doc_num in splits[split_name])))
+    print('Filtered out {} docs'.format(len(splits['filtered'])))
 
 # {[^}]*?\.[^}]*?}
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, SRC_DIR)
+
+@pytest.fixture(autouse=True)
+def in_src_dir(monkeypatch):
+    """The scripts read and write their files relative to src/, where they are run from"""
+    monkeypatch.chdir(SRC_DIR)
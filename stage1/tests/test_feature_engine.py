@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import re
+
+import numpy as np
+import pytest
+
+import feature_engine
+import gen_feature_cv_eval as pipeline
+from lexicons import get_lexicons
+
+NUM_DOCS = 20 # documents of set_I checked
+# the features of the per-window code, the default feature set
+WINDOW_FEATURES = ['avg_word_len', 'all_lowercase', 'all_word_capital', 'all_uppercase', 'contains_amazing_char',
+                   'surrounded_by_paren', 'has_left_comma', 'has_right_comma', 'has_left_period', 'has_right_period',
+                   'prefix_in_whitelist', 'prefix_in_blacklist', 'suffix_in_whitelist', 'suffix_in_blacklist',
+                   'next_word_verb', 'all_noun', 'proper_noun_rate', 'num_of_extras', 'black_word_rate',
+                   'all_black_word', 'surrounding_black_word']
+
+# ========================================================================
+# The feature engine against the per-window code it replaced, kept here  ||
+# as the reference: every window of every length, and the features of   ||
+# the default feature set and the label of each, must be the same. The   ||
+# words are given fixed tags, so the documents are not POS tagged.       ||
+# ========================================================================
+
+def tag_words(text):
+    """Returns made-up but varied POS tags of the words of a text"""
+    word_tags = list()
+    for index, word in enumerate(re.findall(r"[A-Za-z]+(?:'[a-z]+)?|[^\sA-Za-z]", text)):
+        if word[:1].isupper():
+            tag = 'NNP' if (len(word) + index) % 3 else 'NN'
+        elif word.endswith('ed') or word.endswith('s') and len(word) % 2:
+            tag = 'VBD'
+        elif not re.search('[A-Za-z]', word):
+            tag = '.'
+        else:
+            tag = 'NN' if len(word) % 2 else 'JJ'
+        word_tags.append((word, tag))
+    return word_tags
+
+def gen_word_prop_dict(word_tags):
+    word_tag_dict = dict()
+    for word, tag in word_tags:
+        if word not in word_tag_dict:
+            word_tag_dict[word] = set(tag)
+        else:
+            word_tag_dict[word].add(tag)
+    return word_tag_dict
+
+def brackets_matching(example_padded, lbrace, rbrace):
+    example_len = len(example_padded) - 4
+    label = 0
+    left_brace_max_index = -1
+    for left_index in range(example_len-1, example_len+2):
+        if lbrace in example_padded[left_index]:
+            left_brace_max_index = left_index
+    right_brace_min_index = len(example_padded)
+    for right_index in range(4, 1, -1):
+        if rbrace in example_padded[right_index]:
+            right_brace_min_index = right_index
+    if (left_brace_max_index > -1 and left_brace_max_index <= 2 and
+        right_brace_min_index < len(example_padded) and right_brace_min_index >= example_len+1):
+        label = 1
+    for left_index in range(example_len-1, example_len+1):
+        if rbrace in example_padded[left_index] and left_index >= left_brace_max_index:
+            label = 0
+            break
+    for right_index in range(4, 2, -1):
+        if lbrace in example_padded[right_index] and right_index <= right_brace_min_index:
+            label = 0
+            break
+    return label
+
+def gen_window_features(example_padded, example_len, word_tag_dict, lexicons):
+    """Returns the features of one window as the per-window code computed them"""
+    def remove_extras(s):
+        if s in lexicons['prefix_white'] or s in lexicons['suffix_white']:
+            return s
+        if s[-2:] == '\'s':
+            s = s[:-2]
+        return re.sub('[^a-zA-Z]', '', s)
+    def is_black(word):
+        word = remove_extras(word).lower()
+        return word in lexicons['black'] or word in lexicons['prefix_suffix']
+    def can_be(word, test):
+        return word in word_tag_dict and any(test(tag) for tag in word_tag_dict[word])
+
+    example = example_padded[2:2 + example_len]
+    example_joined = ' '.join(example)
+    next_word = example_padded[2 + example_len]
+    # the old proper_noun_rate stopped at the first proper noun
+    has_proper_noun = any(remove_extras(word) in word_tag_dict and 'NNP' in word_tag_dict[remove_extras(word)] for word in example)
+    return {'avg_word_len': len(remove_extras(example_joined).replace(' ', '')) / example_len,
+            'all_lowercase': 1 if re.fullmatch(r'[^A-Z]+', example_joined) else 0,
+            'all_word_capital': int(all(re.fullmatch('[^a-zA-Z]*[A-Z].*', word) for word in example)),
+            'all_uppercase': 1 if re.fullmatch(r'[^a-z]+', example_joined) else 0,
+            'contains_amazing_char': 1 if re.search(r'[óéöäûâ]', example_joined) else 0,
+            'surrounded_by_paren': brackets_matching(example_padded, '(', ')'),
+            'has_left_comma': int(example_padded[1][-1] == ','),
+            'has_right_comma': int(example_padded[example_len+1][-1] == ','),
+            'has_left_period': int(example_padded[1][-1] == '.'),
+            'has_right_period': int(example_padded[example_len+1][-1] == '.'),
+            'prefix_in_whitelist': int(remove_extras(example_padded[1]) in lexicons['prefix_white']),
+            'prefix_in_blacklist': int(remove_extras(example_padded[1]).lower() in lexicons['prefix_black']),
+            'suffix_in_whitelist': int(remove_extras(next_word) in lexicons['suffix_white']),
+            'suffix_in_blacklist': int(remove_extras(next_word).lower() in lexicons['suffix_black']),
+            'next_word_verb': int(can_be(remove_extras(next_word), lambda tag: tag.startswith('V'))),
+            'all_noun': int(all(can_be(remove_extras(word), lambda tag: tag.startswith('N')) for word in example)),
+            'proper_noun_rate': has_proper_noun / example_len,
+            'num_of_extras': len(re.findall(r'[^a-zA-Z\s]', example_joined[2:-2])),
+            'black_word_rate': sum(is_black(word) for word in example) / example_len,
+            'all_black_word': int(all(is_black(word) for word in example)),
+            'surrounding_black_word': int(is_black(example_padded[1]) or is_black(example_padded[-2]))}
+
+def gen_reference(text, word_tags, max_example_len):
+    """Returns the examples, feature dicts and labels of every window of a document, by length then position"""
+    word_tag_dict = gen_word_prop_dict(word_tags)
+    lexicons = get_lexicons()
+    parts = pipeline.gen_doc_tokens(text)
+    examples, features, labels = list(), list(), list()
+    for example_len in range(1, max_example_len+1):
+        index = 2
+        while index+example_len+2 <= len(parts):
+            example_padded = parts[index-2:index+example_len+2]
+            examples.append(' '.join(example_padded[2:2 + example_len]))
+            features.append(gen_window_features(example_padded, example_len, word_tag_dict, lexicons))
+            labels.append(brackets_matching(example_padded, '{', '}'))
+            index += 1
+    return examples, features, labels
+
+@pytest.fixture
+def every_window():
+    """Featurize every window, with the pruning rules disabled, into the features of the per-window code"""
+    prune_rules, feature_names = feature_engine.get_prune_rule_names(), feature_engine.get_feature_names()
+    feature_engine.set_enabled_prune_rules([])
+    feature_engine.set_enabled_features(WINDOW_FEATURES)
+    yield
+    feature_engine.set_enabled_prune_rules(prune_rules)
+    feature_engine.set_enabled_features(feature_names)
+
+@pytest.mark.parametrize('doc_index', range(NUM_DOCS))
+def test_features_match_per_window_code(every_window, doc_index):
+    text = pipeline.read_doc_text(pipeline.list_docs('set_I')[doc_index])
+    word_tags = tag_words(text)
+    examples, features, labels = pipeline.gen_doc_features(text, word_tags)
+    ref_examples, ref_features, ref_labels = gen_reference(text, word_tags, pipeline.MAX_EXAMPLE_LEN)
+
+    assert examples == ref_examples
+    assert labels.tolist() == ref_labels
+    assert sorted(feature_engine.get_feature_names()) == sorted(WINDOW_FEATURES)
+    for col, name in enumerate(feature_engine.get_feature_names()):
+        expected = np.array([window[name] for window in ref_features], dtype=features.dtype)
+        assert np.array_equal(features[:, col], expected), name
+
+def test_token_table_is_shared_by_all_lengths(every_window):
+    text = pipeline.read_doc_text(pipeline.list_docs('set_I')[0])
+    word_tags = tag_words(text)
+    _, features, labels = pipeline.gen_doc_features(text, word_tags)
+    token_table = pipeline.gen_doc_token_table(text, word_tags)
+    per_length = [feature_engine.gen_feature_matrix(pipeline.gen_doc_token_table(text, word_tags), example_len)
+                  for example_len in range(1, pipeline.MAX_EXAMPLE_LEN+1)]
+    assert np.array_equal(features, np.concatenate([matrix for _, matrix, _ in per_length]))
+    assert np.array_equal(labels, np.concatenate([labels_len for _, _, labels_len in per_length]))
+    # attributes are computed once per token and reused by every length
+    feature_engine.gen_doc_feature_matrix(token_table, pipeline.MAX_EXAMPLE_LEN)
+    attrs = dict((name, id(value)) for name, value in token_table.items())
+    feature_engine.gen_doc_feature_matrix(token_table, pipeline.MAX_EXAMPLE_LEN)
+    assert dict((name, id(value)) for name, value in token_table.items()) == attrs
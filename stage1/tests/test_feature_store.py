@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import shutil
+import hashlib
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import feature_engine
+import feature_store
+import gen_feature_cv_eval as pipeline
+from feature_store import get_store_dir, get_doc_key, has_doc, gen_doc_windows, save_doc, load_doc, gather, gather_shared
+
+NUM_DOCS = 5 # documents of set_I stored
+
+# ========================================================================
+# The keys of the feature store: a document is found under the hash of   ||
+# its content wherever it is read from, a changed document or a changed  ||
+# feature definition is a miss, and the documents gathered from the      ||
+# store, in memory or in shared memory, are the documents saved there.   ||
+# ========================================================================
+
+def make_entry(rng, num_features):
+    num_rows = rng.randint(1, 50)
+    windows = gen_doc_windows(rng.randint(0, 500, size=num_rows), rng.randint(1, pipeline.MAX_EXAMPLE_LEN+1, size=num_rows))
+    return windows, rng.rand(num_rows, num_features), rng.randint(0, 2, size=num_rows)
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_store, 'FEATURE_STORE_DIR', str(tmp_path / 'features'))
+    return get_store_dir(pipeline.MAX_EXAMPLE_LEN)
+
+def test_doc_key_is_content_hash(tmp_path):
+    doc_path = pipeline.list_docs('set_I')[0]
+    with open(doc_path, 'rb') as doc:
+        content = doc.read()
+    assert get_doc_key(doc_path) == hashlib.sha1(content).hexdigest()
+    # a copy of the document has its key, a changed copy has a key of its own
+    shutil.copy(doc_path, str(tmp_path / 'copy.txt'))
+    (tmp_path / 'changed.txt').write_bytes(content + b' ')
+    assert get_doc_key(str(tmp_path / 'copy.txt')) == get_doc_key(doc_path)
+    assert get_doc_key(str(tmp_path / 'changed.txt')) != get_doc_key(doc_path)
+
+def test_feature_definition_is_part_of_store_dir(store_dir, monkeypatch):
+    assert get_store_dir(pipeline.MAX_EXAMPLE_LEN) == store_dir
+    assert get_store_dir(pipeline.MAX_EXAMPLE_LEN - 1) != store_dir
+    feature_names = feature_engine.get_feature_names()
+    feature_engine.set_enabled_features(feature_names[:-1])
+    try:
+        assert get_store_dir(pipeline.MAX_EXAMPLE_LEN) != store_dir
+    finally:
+        feature_engine.set_enabled_features(feature_names)
+    lexicons = dict(feature_store.get_lexicons(), hash='0' * 40)
+    with monkeypatch.context() as patched:
+        patched.setattr(feature_store, 'get_lexicons', lambda: lexicons)
+        assert get_store_dir(pipeline.MAX_EXAMPLE_LEN) != store_dir
+    with monkeypatch.context() as patched:
+        patched.setattr(feature_store, 'FEATURE_SET_VERSION', feature_engine.FEATURE_SET_VERSION + 1)
+        assert get_store_dir(pipeline.MAX_EXAMPLE_LEN) != store_dir
+
+def test_gathered_docs_are_saved_docs(store_dir, monkeypatch):
+    monkeypatch.setattr(feature_store, 'GATHER_BATCH_SIZE', 2)
+    rng = np.random.RandomState(0)
+    doc_keys = [get_doc_key(doc_path) for doc_path in pipeline.list_docs('set_I')[:NUM_DOCS]]
+    entries = [make_entry(rng, 7) for _ in doc_keys]
+    assert not any(has_doc(store_dir, doc_key) for doc_key in doc_keys)
+    for doc_key, entry in zip(doc_keys, entries):
+        save_doc(store_dir, doc_key, *entry)
+    assert all(has_doc(store_dir, doc_key) for doc_key in doc_keys)
+
+    windows_doc, features_doc, labels_doc = load_doc(store_dir, doc_keys[0])
+    assert np.array_equal(windows_doc, entries[0][0])
+    assert np.array_equal(features_doc, entries[0][1].astype(np.float32)) and np.array_equal(labels_doc, entries[0][2])
+
+    # gathered in the order asked, a document twice included, with the index of each as the doc_id of its windows
+    order = [3, 0, 4, 0]
+    windows, features, labels = gather(store_dir, [doc_keys[index] for index in order])
+    assert np.array_equal(features, np.concatenate([entries[index][1] for index in order]).astype(np.float32))
+    assert np.array_equal(labels, np.concatenate([entries[index][2] for index in order]))
+    assert windows['doc_id'].tolist() == [position for position, index in enumerate(order) for _ in entries[index][2]]
+    assert np.array_equal(windows['start'], np.concatenate([entries[index][0]['start'] for index in order]))
+
+    with multiprocessing.Pool(2) as pool:
+        shared = gather_shared(store_dir, [doc_keys[index] for index in order], pool)
+    for array, shared_array in zip([windows, features, labels], shared):
+        assert np.array_equal(array, shared_array)
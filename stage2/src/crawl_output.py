@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import csv
+import json
+
+# ========================================================================
+# The rows of a crawl are written to the table as soon as their list     ||
+# page is done, in whatever order the pages finish, each row led by the  ||
+# id of its title, its position in the list crawled (see crawl_pipeline) ||
+# so the same title gets the same id in every crawl, resumed or not.     ||
+# After every page, the table is flushed to disk and the checkpoint      ||
+# <table>.checkpoint.json records the pages done, the ids written of the ||
+# pages some titles of which failed, and the size of the table. A        ||
+# resumed crawl cuts the table back to that size, dropping any rows      ||
+# written after the last checkpoint, skips the pages done and, of the    ||
+# other pages, the titles written, so it retries every list page and     ||
+# every title that failed.                                               ||
+# The pages that could not be fetched or parsed, the dead letters of the ||
+# fetch engine, are saved with every checkpoint to                       ||
+# <table>.dead_letters.json. As a resumed crawl retries them all, it     ||
+# starts a list of its own.                                              ||
+# ========================================================================
+
+def get_checkpoint_path(output_path):
+    return output_path + '.checkpoint.json'
+
+def get_dead_letters_path(output_path):
+    return output_path + '.dead_letters.json'
+
+def save_json(path, obj):
+    tmp_path = path + '.{}.tmp'.format(os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp_path, path)
+
+def save_checkpoint(output):
+    save_json(output['dead_letters_path'], output['dead_letters'])
+    save_json(output['checkpoint_path'], {'done': sorted(output['done']), 'partial': sorted(output['partial'].items()),
+                                          'size': output['file'].tell()})
+
+def open_output(output_path, header, resume=False):
+    """Returns the output of a crawl into a csv table, resumed from its checkpoint if resume and there is one.
+    The pages already done are in "done", the ids written of the pages some titles of which failed in
+    "partial" ({page: [id]}), the dead letters so far in "dead_letters"."""
+    checkpoint_path, dead_letters_path = get_checkpoint_path(output_path), get_dead_letters_path(output_path)
+    checkpoint = None
+    if resume and os.path.exists(checkpoint_path) and os.path.exists(output_path):
+        with open(checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+    if checkpoint is None:
+        output_file = open(output_path, 'w', newline='')
+        output = {'file': output_file, 'writer': csv.writer(output_file, delimiter=','), 'checkpoint_path': checkpoint_path,
+                  'dead_letters_path': dead_letters_path, 'done': set(), 'partial': dict(), 'dead_letters': list()}
+        output['writer'].writerow(header)
+    else:
+        output_file = open(output_path, 'r+', newline='')
+        output_file.seek(checkpoint['size'])
+        output_file.truncate()
+        output = {'file': output_file, 'writer': csv.writer(output_file, delimiter=','), 'checkpoint_path': checkpoint_path,
+                  'dead_letters_path': dead_letters_path, 'done': set(checkpoint['done']),
+                  'partial': dict((page, ids) for page, ids in checkpoint.get('partial', [])), 'dead_letters': list()}
+    output_file.flush()
+    save_checkpoint(output)
+    return output
+
+def write_page(output, page, rows, complete):
+    """Write the rows of a list page to the table, each led by its id, and checkpoint the page as done if
+    complete, else the ids written so far of the page, so that a resumed crawl retries only the others"""
+    for row in rows:
+        output['writer'].writerow(row)
+    output['file'].flush()
+    os.fsync(output['file'].fileno())
+    ids = output['partial'].pop(page, list()) + [row[0] for row in rows]
+    if complete:
+        output['done'].add(page)
+    else:
+        output['partial'][page] = ids
+    save_checkpoint(output)
+
+def close_output(output):
+    save_checkpoint(output)
+    output['file'].close()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import re
+import sys
+import time
+import asyncio
+
+from decimal import Decimal
+from urllib.parse import urljoin
+
+from crawl_output import write_page
+from crawl_stats import record_failure, record_miss, record_parse, record_rows, save_stats, save_stats_periodically
+from fetch_engine import FetchError, open_engine, fetch, record_dead_letter
+from html_extract import SelectorMiss
+
+LIST_WORKERS = 2 # list pages fetched at a time, each queues its titles for the workers below
+TITLE_QUEUE_SIZE = 100 # titles queued for each of the detail and credits stages, a list worker waits when it is full
+
+# ========================================================================
+# Both crawlers crawl the same way, in three stages that run at once,    ||
+# each a queue and its workers:                                          ||
+#   list     a list page is fetched and parsed into the urls of its      ||
+#            titles, each queued to both stages below                    ||
+#   detail   the page of a title is fetched and parsed into its title,   ||
+#            year, genres, language, runtime, budget and revenue         ||
+#   credits  the credits page of a title is fetched and parsed into its  ||
+#            directors, writers and actors                               ||
+# so the detail and credits pages of a title are fetched at the same     ||
+# time, and a slow page only holds back its own title. A list page is    ||
+# written to the output once all its titles are done, its rows in list   ||
+# order, the titles that failed left out and kept as dead letters, and   ||
+# checkpointed as done only if none failed: a resumed crawl fetches it   ||
+# again and retries its titles not written yet (see crawl_output.py).    ||
+# The id of a title is its position in the list crawled, page_index *    ||
+# per_page + its position on the page, from 1, whatever order the pages  ||
+# finish in. The title workers run for as long as the crawl, one that    ||
+# stops has failed to write the output or the stats, which ends the      ||
+# crawl with its error.                                                  ||
+# A site is a dict of the functions the stages call:                     ||
+#   list_url(page)         the url of a list page                        ||
+#   parse_list(content)    the (relative) urls of the titles of a page   ||
+#   credits_url(url)       the url of the credits page of a title        ||
+#   parse_detail(content)  the detail fields of a title                  ||
+#   parse_credits(content) the credits fields of a title                 ||
+#   describe(page)         how a list page is named in progress messages ||
+#   per_page               the most titles a list page holds             ||
+# and every title becomes a record of RECORD_FIELDS, whatever the site.  ||
+# With stats (crawl_stats.open_stats), the requests and parse time of    ||
+# every stage are counted there, and the pages lost, by cause.           ||
+# ========================================================================
+
+# the fields of a record and their types, a missing value is None, as is a number that cannot be parsed,
+# which crawl_stats counts as a "number miss <field>"
+DETAIL_FIELDS = [('title', str), ('year', int), ('genres', list), ('language', str), ('runtime', int), ('budget', int), ('revenue', int)]
+CREDITS_FIELDS = [('directors', list), ('writers', list), ('actors', list)]
+RECORD_FIELDS = DETAIL_FIELDS + CREDITS_FIELDS
+TABLE_HEADER = ['id'] + [name for name, _ in RECORD_FIELDS]
+# a number as pages write it: a currency symbol or code, the digits with their separators, a magnitude, a note
+NUMBER_PATTERN = re.compile(r'[^\d.,]*?(\d[\d.,\s]*?)\s*(k|m|bn|b|thousand|million|billion)?\.?\s*(\(.*\))?', re.IGNORECASE)
+MAGNITUDES = {'k': 10**3, 'thousand': 10**3, 'm': 10**6, 'million': 10**6, 'b': 10**9, 'bn': 10**9, 'billion': 10**9}
+
+def to_int(value):
+    """Returns a number scraped from a page as an int, None if there is none. Its currency ("$", "€", "USD")
+    and a note in parentheses are dropped, a magnitude is applied ("$1.5M", "2 billion"), and the last
+    separator is a decimal point if it is not followed by 3 digits ("1,500,000.00", "5.000.000")."""
+    match = NUMBER_PATTERN.fullmatch(str(value).strip())
+    if match is None:
+        return None
+    digits, magnitude = re.sub(r'\s', '', match.group(1)), match.group(2)
+    whole, fraction = digits, ''
+    last_separator = max(digits.rfind(','), digits.rfind('.'))
+    if last_separator >= 0 and (len(digits) - last_separator - 1 != 3 or magnitude):
+        whole, fraction = digits[:last_separator], digits[last_separator+1:]
+    whole = whole.replace(',', '').replace('.', '')
+    if not whole.isdigit() or not fraction.isdigit() and fraction:
+        return None
+    return int(Decimal(whole + '.' + (fraction or '0')) * (MAGNITUDES[magnitude.lower()] if magnitude else 1))
+
+def make_record(fields, schema, misses=None):
+    """Returns the fields parsed from a page as typed by schema, raises ValueError if one is missing.
+    The names of the fields that hold no number where schema wants one are added to misses."""
+    record = dict()
+    for name, field_type in schema:
+        if name not in fields:
+            raise ValueError('The page has no {}'.format(name))
+        value = fields[name]
+        if value is None or value == '':
+            record[name] = None
+        elif field_type is int:
+            record[name] = to_int(value)
+            if record[name] is None and misses is not None:
+                misses.append(name)
+        elif field_type is list:
+            record[name] = [item for item in (value.split(';') if isinstance(value, str) else value) if item]
+        else:
+            record[name] = field_type(value)
+    return record
+
+def format_row(record):
+    """Returns a record as a row of the table, lists joined by ';'"""
+    row = list()
+    for name, field_type in RECORD_FIELDS:
+        value = record[name]
+        if value is None:
+            row.append('')
+        elif field_type is list:
+            row.append(';'.join(value))
+        else:
+            row.append(str(value))
+    return row
+
+def finish_title(title_state):
+    """Mark one stage of a title done, and write its list page once all its titles are"""
+    title_state['pending'] -= 1
+    if title_state['pending']:
+        return
+    page_state = title_state['page']
+    page_state['pending'] -= 1
+    if not page_state['pending']:
+        write_list_page(page_state)
+
+def write_list_page(page_state):
+    titles = page_state['titles']
+    rows = [[title_state['id']] + format_row(title_state['record']) for title_state in titles if not title_state['failed']]
+    write_page(page_state['output'], page_state['page'], rows, len(rows) == len(titles))
+    record_rows(page_state['stats'], len(rows))
+    print('Crawled {} ({} failed)'.format(page_state['site']['describe'](page_state['page']), len(titles) - len(rows)))
+
+def get_parse_cause(error):
+    """Returns why a page could not be parsed, as counted by crawl_stats"""
+    if isinstance(error, SelectorMiss):
+        return 'selector miss {}'.format(error.selector)
+    return 'parse error {}'.format(type(error).__name__)
+
+async def fetch_and_parse(engine, stage, url, parse):
+    """Returns the parse of a page fetched for a stage, raises FetchError if it cannot be fetched, or the error of parse"""
+    content = await fetch(engine, url, stage)
+    started_at = time.perf_counter()
+    try:
+        return parse(content)
+    except Exception as e:
+        record_failure(engine['stats'], stage, get_parse_cause(e))
+        raise
+    finally:
+        record_parse(engine['stats'], stage, time.perf_counter() - started_at)
+
+async def list_worker(engine, site, list_queue, stage_queues, output, failed_pages):
+    while not list_queue.empty():
+        page_index, page = list_queue.get_nowait()
+        list_url = site['list_url'](page)
+        try:
+            title_urls = [urljoin(list_url, title_url) for title_url in await fetch_and_parse(engine, 'list', list_url, site['parse_list'])]
+            if len(title_urls) > site['per_page']:
+                # the ids of its titles would run into those of the next page
+                raise ValueError('The page lists {} titles, more than {}'.format(len(title_urls), site['per_page']))
+        except Exception as e:
+            # the page is not checkpointed, a resumed crawl tries it again
+            print('Failed {}: {!r}'.format(site['describe'](page), e), file=sys.stderr)
+            failed_pages.append(page)
+            continue
+        page_state = {'site': site, 'page': page, 'output': output, 'stats': engine['stats'], 'titles': list()}
+        first_id = page_index * site['per_page'] + 1
+        written_ids = set(output['partial'].get(page, ())) # by an earlier crawl of the page, some titles of which failed
+        for position, title_url in enumerate(title_urls):
+            if first_id + position not in written_ids:
+                page_state['titles'].append({'id': first_id + position, 'url': title_url, 'page': page_state, 'record': dict(),
+                                             'pending': len(stage_queues), 'failed': False})
+        page_state['pending'] = len(page_state['titles'])
+        if not page_state['titles']:
+            write_list_page(page_state)
+        for title_state in page_state['titles']:
+            for stage_queue in stage_queues:
+                await stage_queue.put(title_state)
+
+async def run_stages(engine, site, list_queue, stage_queues, output, failed_pages):
+    """Run the list workers, and wait until every title they queued is done"""
+    await asyncio.gather(*[list_worker(engine, site, list_queue, stage_queues, output, failed_pages) for _ in range(LIST_WORKERS)])
+    for stage_queue in stage_queues:
+        await stage_queue.join()
+
+async def title_worker(engine, site, stage, title_queue):
+    """Fetch and parse one page (stage 'detail' or 'credits') of the titles queued, for as long as the crawl runs"""
+    schema = DETAIL_FIELDS if stage == 'detail' else CREDITS_FIELDS
+    while True:
+        title_state = await title_queue.get()
+        url = title_state['url'] if stage == 'detail' else site['credits_url'](title_state['url'])
+        try:
+            misses = list()
+            title_state['record'].update(make_record(await fetch_and_parse(engine, stage, url, site['parse_' + stage]), schema, misses))
+            for name in misses:
+                record_miss(engine['stats'], stage, 'number miss {}'.format(name))
+        except FetchError:
+            title_state['failed'] = True # already a dead letter of the engine
+        except Exception as e:
+            record_dead_letter(engine, url, None, '{}: {!r}'.format(get_parse_cause(e), e))
+            title_state['failed'] = True
+        try:
+            finish_title(title_state)
+        finally:
+            title_queue.task_done()
+
+async def crawl(site, pages, concurrency, rate, cache, output, stats=None):
+    """Crawl the list pages of a site that are not done yet, writing each to the output when it is done,
+    and its stats to their file periodically and at the end. pages is the whole list, done or not, as the
+    ids of the titles follow from the position of their page in it. Returns the number of list pages that failed."""
+    list_queue = asyncio.Queue()
+    for page_index, page in enumerate(pages):
+        if page not in output['done']:
+            list_queue.put_nowait((page_index, page))
+    stage_queues = {stage: asyncio.Queue(maxsize=TITLE_QUEUE_SIZE) for stage in ['detail', 'credits']}
+    failed_pages = list()
+    async with open_engine(concurrency_per_host=concurrency, rate_per_host=rate, cache=cache, dead_letters=output['dead_letters'],
+                           stats=stats) as engine:
+        # as many workers per stage as requests can be in flight, the engine schedules their requests
+        workers = [asyncio.create_task(title_worker(engine, site, stage, stage_queue))
+                   for stage, stage_queue in stage_queues.items() for _ in range(concurrency)]
+        if stats is not None:
+            workers.append(asyncio.create_task(save_stats_periodically(stats)))
+        stages = asyncio.create_task(run_stages(engine, site, list_queue, list(stage_queues.values()), output, failed_pages))
+        try:
+            # a worker only stops on an error writing the output or the stats, which ends the crawl at once,
+            # rather than leave its titles undone and the stages waiting for them forever
+            done, _ = await asyncio.wait([stages] + workers, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stages:
+                    raise task.exception()
+            stages.result()
+        finally:
+            for task in [stages] + workers:
+                task.cancel()
+            await asyncio.gather(stages, *workers, return_exceptions=True)
+            if stats is not None:
+                save_stats(stats)
+    return len(failed_pages)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import time
+import bisect
+import asyncio
+
+from crawl_output import save_json
+
+STATS_INTERVAL = 10 # seconds between two summaries written during a crawl
+# upper bounds of the buckets of the histograms, in seconds, the last bucket holds the rest
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+PARSE_BOUND_SHARE = 0.5 # share of the wall time spent parsing over which a crawl is parse-bound
+
+# ========================================================================
+# What a crawl spends its time on, and what it loses, stage by stage     ||
+# (list, detail, credits, see crawl_pipeline.py):                        ||
+#   requests, cache hits and bytes fetched                               ||
+#   a histogram of the latency of the requests, from sending one to      ||
+#   having read its body, and the seconds requests waited for the rate   ||
+#   limit and the concurrency of their host                              ||
+#   a histogram of the time spent parsing pages                          ||
+#   errors, the attempts that failed, and failures, the pages given up,  ||
+#   counted by cause: "http <status>", "timeout", the aiohttp error of a ||
+#   lost connection, "selector miss <selector>" for a page lacking an    ||
+#   element its parser needs, "parse error <exception>", and misses,     ||
+#   the values of a page that could not be parsed and were stored as     ||
+#   missing, counted by cause: "number miss <field>"                     ||
+# Parsing runs on the event loop of the crawl, so while the loop parses  ||
+# no response is read: a crawl parsing most of its wall time is          ||
+# parse-bound, otherwise it is network-bound, waiting on its requests.   ||
+# A summary is written to <table>.stats.json every STATS_INTERVAL        ||
+# seconds and at the end of the crawl, which also prints a report.       ||
+# Every record_* function does nothing without stats, so the fetch       ||
+# engine and the pipeline can run with stats None.                       ||
+# ========================================================================
+
+def get_stats_path(output_path):
+    return output_path + '.stats.json'
+
+def open_stats(output_path, interval=STATS_INTERVAL):
+    """Returns the stats of a crawl into the table at output_path"""
+    return {'path': get_stats_path(output_path), 'interval': interval, 'started_at': time.monotonic(), 'rows': 0, 'stages': dict()}
+
+def new_histogram():
+    return {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * (len(BUCKETS) + 1)}
+
+def add_to_histogram(histogram, seconds):
+    histogram['count'] += 1
+    histogram['sum'] += seconds
+    histogram['max'] = max(histogram['max'], seconds)
+    histogram['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+def get_percentile(histogram, q):
+    """Returns the upper bound of the bucket holding the q-th quantile of a histogram, at most its max"""
+    rank, seen = q * histogram['count'], 0
+    for index, count in enumerate(histogram['buckets']):
+        seen += count
+        if count and seen >= rank:
+            return min(BUCKETS[index], histogram['max']) if index < len(BUCKETS) else histogram['max']
+    return 0.0
+
+def get_stage(stats, stage):
+    stage = stage or 'other'
+    if stage not in stats['stages']:
+        stats['stages'][stage] = {'requests': 0, 'cache_hits': 0, 'bytes': 0, 'wait_seconds': 0.0, 'latency': new_histogram(),
+                                  'parse': new_histogram(), 'errors': dict(), 'failures': dict(), 'misses': dict()}
+    return stats['stages'][stage]
+
+def record_request(stats, stage, latency, num_bytes):
+    if stats is not None:
+        stage_stats = get_stage(stats, stage)
+        stage_stats['requests'] += 1
+        stage_stats['bytes'] += num_bytes
+        add_to_histogram(stage_stats['latency'], latency)
+
+def record_cache_hit(stats, stage, num_bytes):
+    if stats is not None:
+        stage_stats = get_stage(stats, stage)
+        stage_stats['cache_hits'] += 1
+        stage_stats['bytes'] += num_bytes
+
+def record_wait(stats, stage, seconds):
+    if stats is not None:
+        get_stage(stats, stage)['wait_seconds'] += seconds
+
+def record_parse(stats, stage, seconds):
+    if stats is not None:
+        add_to_histogram(get_stage(stats, stage)['parse'], seconds)
+
+def record_error(stats, stage, cause):
+    """Count an attempt at a page that failed, retried or not"""
+    if stats is not None:
+        errors = get_stage(stats, stage)['errors']
+        errors[cause] = errors.get(cause, 0) + 1
+
+def record_failure(stats, stage, cause):
+    """Count a page given up on, its title or list page lost"""
+    if stats is not None:
+        failures = get_stage(stats, stage)['failures']
+        failures[cause] = failures.get(cause, 0) + 1
+
+def record_miss(stats, stage, cause):
+    """Count a value of a page that could not be parsed, stored as missing"""
+    if stats is not None:
+        misses = get_stage(stats, stage)['misses']
+        misses[cause] = misses.get(cause, 0) + 1
+
+def record_rows(stats, num_rows):
+    if stats is not None:
+        stats['rows'] += num_rows
+
+def summarize_histogram(histogram):
+    summary = {name: histogram[name] for name in ['count', 'sum', 'max']}
+    for q in [0.5, 0.9, 0.99]:
+        summary['p{}'.format(int(q * 100))] = get_percentile(histogram, q)
+    summary['buckets'] = {('le {}'.format(bound) if index < len(BUCKETS) else 'more'): count
+                          for index, (bound, count) in enumerate(zip(BUCKETS + [None], histogram['buckets'])) if count}
+    return summary
+
+def summarize(stats):
+    """Returns the summary of a crawl so far, as written to its stats file"""
+    elapsed = time.monotonic() - stats['started_at']
+    parse_seconds = sum(stage_stats['parse']['sum'] for stage_stats in stats['stages'].values())
+    summary = {'elapsed': elapsed, 'rows': stats['rows'], 'parse_share': parse_seconds / elapsed if elapsed else 0.0,
+               'requests_in_flight': sum(stage_stats['latency']['sum'] for stage_stats in stats['stages'].values()) / elapsed if elapsed else 0.0,
+               'stages': dict()}
+    summary['bound'] = 'parse' if summary['parse_share'] > PARSE_BOUND_SHARE else 'network'
+    for stage, stage_stats in sorted(stats['stages'].items()):
+        summary['stages'][stage] = dict(stage_stats, latency=summarize_histogram(stage_stats['latency']),
+                                        parse=summarize_histogram(stage_stats['parse']))
+    return summary
+
+def save_stats(stats):
+    save_json(stats['path'], summarize(stats))
+
+async def save_stats_periodically(stats):
+    """Write the summary of a crawl every interval of its stats, until cancelled"""
+    while True:
+        await asyncio.sleep(stats['interval'])
+        save_stats(stats)
+
+def print_report(stats):
+    summary = summarize(stats)
+    print('Crawled {} rows in {:.1f}s'.format(summary['rows'], summary['elapsed']))
+    print('===========================================================================================')
+    print("{:<10s}{:>10s}{:>12s}{:>12s}{:>10s}{:>10s}{:>10s}{:>10s}{:>10s}".format(
+        'Stage', 'Requests', 'Cache hits', 'MB', 'Wait s', 'p50 s', 'p90 s', 'p99 s', 'Parse ms'))
+    print('-------------------------------------------------------------------------------------------')
+    for stage, stage_summary in summary['stages'].items():
+        latency, parse = stage_summary['latency'], stage_summary['parse']
+        print('{:<10s}{:>10d}{:>12d}{:>12.2f}{:>10.1f}{:>10.3f}{:>10.3f}{:>10.3f}{:>10.2f}'.format(
+            stage, stage_summary['requests'], stage_summary['cache_hits'], stage_summary['bytes'] / 2**20,
+            stage_summary['wait_seconds'], latency['p50'], latency['p90'], latency['p99'],
+            parse['sum'] / parse['count'] * 1000 if parse['count'] else 0.0))
+    print('===========================================================================================')
+    for kind, name in [('errors', 'error'), ('failures', 'failure'), ('misses', 'miss')]:
+        for stage, stage_summary in summary['stages'].items():
+            for cause, count in sorted(stage_summary[kind].items(), key=lambda item: -item[1]):
+                print('{:<10s}{:<10s}{:>6d}  {}'.format(stage, name, count, cause))
+    print('Parsing took {:.0%} of the wall time, {:.1f} requests were in flight on average: the crawl is {}-bound'.format(
+        summary['parse_share'], summary['requests_in_flight'], summary['bound']))
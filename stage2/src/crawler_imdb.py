@@ -4,24 +4,35 @@
 # @Date    : 2019-04-08
 # @Author  : Bruce Bai (guangtong.bai@wisc.edu)
 
-import requests
-from bs4 import BeautifulSoup as BS
-from multiprocessing import Pool
-import csv
+import argparse
+import asyncio
+import sys
+
+from crawl_output import open_output, close_output
+from crawl_pipeline import TABLE_HEADER, crawl
+from crawl_stats import STATS_INTERVAL, open_stats, print_report
+from fetch_engine import CONCURRENCY_PER_HOST, RATE_PER_HOST
+import html_extract
+from html_extract import find_required, has_class, parse_page
+from response_cache import CACHE_DIR, CACHE_TTL, open_cache
 
 IMDB_BASE_URL = 'https://www.imdb.com'
-FILM_LIST_TEMPLATE = 'https://www.imdb.com/search/title?title_type=feature&sort=boxoffice_gross_us,desc&start={}&ref_=adv_nxt' # feature film list sorted by U.S. box office descending
+FILM_LIST_TEMPLATE = '/search/title?title_type=feature&sort=boxoffice_gross_us,desc&start={}&ref_=adv_nxt' # feature film list sorted by U.S. box office descending
 OUTPUT_FILE_PATH = '../data/imdb.csv'
 NUM_VIDEOS = 4000
-NUM_PROC = 8
-
-def get_persons_related_to_imdb_video(video_url):
-    """Given a url for a video on IMDb, returns persons (in particular, directors, writers and actors) related to the video"""
-    directors, writers, actors = '', '', ''
-    credits_url = video_url[:video_url.rfind('?')] + 'fullcredits'
-    webpage = requests.get(credits_url)
-    soup = BS(webpage.content, 'html.parser')
-    div_credits_content = soup.find('div', id='fullcredits_content')
+VIDEOS_PER_PAGE = 50
+# the elements every parser looks into, see html_extract.py
+CREDITS_XPATHS = ["//div[@id='fullcredits_content']"]
+VIDEO_XPATHS = ["//div[{}]".format(has_class('title_wrapper')), "//div[@id='titleStoryLine']", "//div[@id='titleDetails']"]
+LIST_XPATHS = ["//div[@class='lister-item mode-advanced']"]
+
+base_url = IMDB_BASE_URL # set by main, to crawl a stand-in server instead
+
+def parse_persons_related_to_imdb_video(content):
+    """Given the full credits page of a video, returns its directors, writers and actors"""
+    directors, writers, actors = [], [], []
+    soup = parse_page(content, CREDITS_XPATHS)
+    div_credits_content = find_required(soup, 'div', id='fullcredits_content')
     for h4 in div_credits_content.find_all('h4'):
         person_type = h4.contents[0].strip()
         if person_type not in ['Directed by', 'Writing Credits', 'Cast']:
@@ -34,38 +45,39 @@ def get_persons_related_to_imdb_video(video_url):
             if td_name == None:
                 continue
             persons.append(td_name.a.string.strip())
-        persons = ';'.join(persons)
         if person_type == 'Directed by':
             directors = persons
         elif person_type == 'Writing Credits':
             writers = persons
         elif person_type == 'Cast':
             actors = persons
-    return directors, writers, actors
+    return {'directors': directors, 'writers': writers, 'actors': actors}
+
+def get_credits_url(video_url):
+    """Given a url for a video on IMDb, returns the url of its full credits page"""
+    return video_url[:video_url.rfind('?')] + 'fullcredits'
 
-def get_info_about_imdb_video(video_url):
-    """Given a url for a video on IMDb, returns info about that video, including title, year, genres, language, runtime, budget, revenue, directors, writers and actors"""
-    webpage = requests.get(video_url)
-    soup = BS(webpage.content, 'html.parser')
+def parse_info_about_imdb_video(content):
+    """Given the page of a video, returns its title, year, genres, language, runtime, budget and revenue"""
+    soup = parse_page(content, VIDEO_XPATHS)
 
     # extract title and year
-    h1_title = soup.find('div', class_='title_wrapper').h1
+    h1_title = find_required(soup, 'div', class_='title_wrapper').h1
     title = h1_title.contents[0].strip()
     year = h1_title.span.a.get_text()
 
     # extract genres
     genres = list()
-    div_storyline = soup.find('div', id='titleStoryLine')
+    div_storyline = find_required(soup, 'div', id='titleStoryLine')
     for div in (div_storyline.find_all('div', class_='see-more inline canwrap')):
         if 'Genre' in div.h4.string:
             for a_genre in div.find_all('a'):
                 genres.append(a_genre.get_text().strip())
             break
-    genres = ';'.join(genres)
 
     # extract languagem runtime, budget and revenue
     language, runtime, budget, revenue = '', '', '', ''
-    div_details = soup.find('div', id='titleDetails')
+    div_details = find_required(soup, 'div', id='titleDetails')
     for div_txt_block in div_details.find_all('div', class_='txt-block'):
         try:
             attr_type = div_txt_block.h4.get_text()[:-1]
@@ -77,47 +89,71 @@ def get_info_about_imdb_video(video_url):
             language = div_txt_block.a.get_text()
         if attr_type == 'Budget':
             budget_str = div_txt_block.contents[2]
-            budget = budget_str[budget_str.find('$')+1:].strip().replace(',', '')
+            budget = budget_str.strip() # parsed with its currency by crawl_pipeline.to_int
         elif attr_type == 'Runtime':
             runtime = div_txt_block.time.string.split()[0]
         else:
             revenue_str = div_txt_block.contents[2]
-            revenue = revenue_str[revenue_str.find('$')+1:].strip().replace(',', '')
+            revenue = revenue_str.strip() # parsed with its currency by crawl_pipeline.to_int
 
-    # extract directors, writers and actors
-    directors, writers, actors = get_persons_related_to_imdb_video(video_url)
+    return {'title': title, 'year': year, 'genres': genres, 'language': language, 'runtime': runtime, 'budget': budget, 'revenue': revenue}
 
-    return title, year, genres, language, runtime, budget, revenue, directors, writers, actors
-
-def get_info_list_from_imdb_list(start_id):
-    """Given a start id, return a list of info tuple, one for each video with id in range [start_id, start_id+50)"""
-    info_list = []
-    list_url = FILM_LIST_TEMPLATE.format(start_id)
-    webpage = requests.get(list_url)
-    # print(list_url, webpage)
-    soup = BS(webpage.content, 'html.parser')
+def parse_imdb_list(content):
+    """Given a page of the film list, returns the relative urls of its videos"""
+    video_relative_urls = []
+    soup = parse_page(content, LIST_XPATHS)
     for div in (soup.find_all('div', class_='lister-item mode-advanced')):
         div_content = div.find('div', class_='lister-item-content')
-        video_relative_url = div_content.h3.a.get('href')
-        try:
-            info_list.append(get_info_about_imdb_video(IMDB_BASE_URL + video_relative_url))
-        except Exception:
-            continue
-    print("Crawled movie {} to {}".format(start_id, start_id+50-1))
-    return info_list
+        video_relative_urls.append(div_content.h3.a.get('href'))
+    return video_relative_urls
+
+def get_list_url(start_id):
+    """Given a start id, returns the url of the film list page of the videos with id in range [start_id, start_id+VIDEOS_PER_PAGE)"""
+    return base_url + FILM_LIST_TEMPLATE.format(start_id)
+
+def describe_list_page(start_id):
+    return 'movie {} to {}'.format(start_id, start_id+VIDEOS_PER_PAGE-1)
+
+# the site crawled by crawl_pipeline.crawl()
+SITE = {'list_url': get_list_url, 'parse_list': parse_imdb_list, 'credits_url': get_credits_url,
+        'parse_detail': parse_info_about_imdb_video, 'parse_credits': parse_persons_related_to_imdb_video,
+        'describe': describe_list_page, 'per_page': VIDEOS_PER_PAGE}
+
+parser = argparse.ArgumentParser(description='Crawl feature films from IMDb, by U.S. box office.')
+parser.add_argument('--num-videos', type=int, default=NUM_VIDEOS, help='Number of films to crawl (default: {}).'.format(NUM_VIDEOS))
+parser.add_argument('--concurrency', type=int, default=CONCURRENCY_PER_HOST, help='Most requests in flight at a time, the crawl adapts below it (default: {}).'.format(CONCURRENCY_PER_HOST))
+parser.add_argument('--rate', type=float, default=RATE_PER_HOST, help='Requests per second, on average (default: {}).'.format(RATE_PER_HOST))
+parser.add_argument('--base-url', default=IMDB_BASE_URL, help='Site to crawl, e.g. a fixture_server.py stand-in (default: {}).'.format(IMDB_BASE_URL))
+parser.add_argument('--cache-dir', default=CACHE_DIR, help='Where fetched pages are cached (default: {}).'.format(CACHE_DIR))
+parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL, help='Seconds a cached page is used before it is fetched again (default: {}).'.format(CACHE_TTL))
+parser.add_argument('--no-cache', action='store_true', help='Neither use nor fill the cache.')
+parser.add_argument('--offline', action='store_true', help='Replay the crawl from the cache only, whatever the age of the pages, without touching the network.')
+parser.add_argument('--parse-mode', choices=html_extract.MODES, default=html_extract.mode, help='How pages are parsed, see html_extract.py (default: {}).'.format(html_extract.mode))
+parser.add_argument('--output', default=OUTPUT_FILE_PATH, help='Where to write the table (default: {}).'.format(OUTPUT_FILE_PATH))
+parser.add_argument('--resume', action='store_true', help='Go on with the crawl of the table from its checkpoint, skipping the list pages done.')
+parser.add_argument('--stats-interval', type=float, default=STATS_INTERVAL, help='Seconds between two summaries of the crawl written to <output>.stats.json (default: {}).'.format(STATS_INTERVAL))
 
 if __name__ == '__main__':
-    pool = Pool(NUM_PROC)
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip('/')
+    html_extract.set_mode(args.parse_mode)
+    if args.offline and args.no_cache:
+        parser.error('--offline replays the cache, it cannot be used with --no-cache')
+    cache = None if args.no_cache else open_cache(args.cache_dir, args.cache_ttl, args.offline)
 
-    output_file = open(OUTPUT_FILE_PATH, 'w')
-    csv_writer = csv.writer(output_file, delimiter=',')
+    output = open_output(args.output, TABLE_HEADER, args.resume)
+    stats = open_stats(args.output, args.stats_interval)
 
     # start_ids = [1]
-    start_ids = [start_id for start_id in range(1, NUM_VIDEOS, 50)]
-
-    csv_writer.writerow(['id', 'title', 'year', 'genres', 'language', 'runtime', 'budget', 'revenue', 'directors', 'writers', 'actors'])
-    id = 1
-    for info_list in pool.map(get_info_list_from_imdb_list, start_ids):
-        for info in info_list:
-            csv_writer.writerow([id] + list(info))
-            id += 1
+    start_ids = [start_id for start_id in range(1, args.num_videos, VIDEOS_PER_PAGE)]
+
+    try:
+        num_failed = asyncio.run(crawl(SITE, start_ids, args.concurrency, args.rate, cache, output, stats))
+    finally:
+        close_output(output)
+    print_report(stats)
+    if output['dead_letters']:
+        print('{} pages could not be fetched or parsed, listed in {}, run again with --resume to retry them'.format(
+            len(output['dead_letters']), output['dead_letters_path']))
+    if num_failed:
+        sys.exit('{} list pages failed, run again with --resume to retry them'.format(num_failed))
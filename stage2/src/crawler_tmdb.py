@@ -1,26 +1,40 @@
 #!/usr/bin/python3
 
-import requests
-from bs4 import BeautifulSoup as BS
-from multiprocessing import Pool
-import csv
+import argparse
+import asyncio
+import sys
+from urllib.parse import urlsplit, urlunsplit
 
+from crawl_output import open_output, close_output
+from crawl_pipeline import TABLE_HEADER, crawl
+from crawl_stats import STATS_INTERVAL, open_stats, print_report
+from fetch_engine import CONCURRENCY_PER_HOST, RATE_PER_HOST
+import html_extract
+from html_extract import find_required, has_class, parse_page
+from response_cache import CACHE_DIR, CACHE_TTL, open_cache
 
-TMDB_MOVIE_LIST_URL = 'https://www.themoviedb.org/movie?page='
+
+TMDB_MOVIE_LIST_URL = '/movie?page='
 TMDB_BASE_URL = 'https://www.themoviedb.org'
 
 TOTAL_NUMBER = 4000 # TODO: change this to 4000
 MOVIES_PER_PAGE = 20
-NUM_PROC = 8 
 OUTPUT_FILE_PATH = '../data/tmdb.csv'
+# the elements every parser looks into, see html_extract.py
+# (the first h2 is the title, the facts are read from the grandparents of their bdi labels)
+HOME_XPATHS = ["(//h2)[1]", "//span[{}]".format(has_class('release_date')), "//bdi/../.."]
+CAST_CREW_XPATHS = ["//h4/.. | //div[{}]".format(has_class('split'))]
+MOVIE_LIST_XPATHS = ["//a[@class='title result']"]
+
+base_url = TMDB_BASE_URL # set by main, to crawl a stand-in server instead
 
 def get_crew_list(soup, type):
     list = []
-    crew = soup.find('h4', text=type).parent
+    crew = find_required(soup, 'h4', string=type).parent
     div_parts = crew.find_all('div', class_='info')
     for div in div_parts:
         list.append(div.find('a').get_text())
-    return ';'.join(list)
+    return list
 
 
 def get_actors(soup):
@@ -32,95 +46,139 @@ def get_actors(soup):
             for li in lis:
                 list.append(li.find('div', class_='info').find('a').get_text())
             break
-    return ';'.join(list)
+    return list
+
+
+def get_cast_crew_url(home_url):
+    """
+    Given a url for a page of a movie, return the url of its cast and crew page,
+    the path of the movie followed by /cast, without the query and fragment of the url
+    """
+    parts = urlsplit(home_url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip('/') + '/cast', '', ''))
 
 
-def get_movie_info(home_url):
+def parse_movie_info(home_content):
     """
-    Given a url for a page of a movie, return the movie info as a list
+    Given the page of a movie, return its title, year, genres, language,
+    runtime, budget and revenue
     """
-    info = []
-    home_page = requests.get(home_url)
-    home_soup = BS(home_page.content, 'html.parser')
-    cast_crew_url_suffix = home_soup.find('a', text='Full Cast & Crew').get('href')
-    cast_crew_page = requests.get(TMDB_BASE_URL + cast_crew_url_suffix)
-    cast_crew_soup = BS(cast_crew_page.content, 'html.parser')
+    info = {}
+    home_soup = parse_page(home_content, HOME_XPATHS)
     # title
-    title = home_soup.find('h2').get_text()
-    info.append(title)
+    title = find_required(home_soup, 'h2').get_text()
+    info['title'] = title
     # print("Name: " + title)
     # year
-    year = home_soup.find('span', class_='release_date').get_text()
+    year = find_required(home_soup, 'span', class_='release_date').get_text()
     year = year[1:-1]
-    info.append(year)
+    info['year'] = year
     # genres
     genres = []
-    genre_sec = home_soup.find('bdi', text='Genres').parent.parent.find('ul').find_all('li')
+    genre_sec = find_required(home_soup, 'bdi', string='Genres').parent.parent.find('ul').find_all('li')
     for g in genre_sec:
         genres.append(g.find('a').get_text())
-    info.append(';'.join(genres))
+    info['genres'] = genres
     # language
-    language_tag = home_soup.find('bdi', text='Original Language')
+    language_tag = find_required(home_soup, 'bdi', string='Original Language')
     raw_language = language_tag.parent.parent.get_text()
     language = raw_language.split(' ')[2]
-    info.append(language)
+    info['language'] = language
     # runtime
-    runtime_tag = home_soup.find('bdi', text='Runtime')
+    runtime_tag = find_required(home_soup, 'bdi', string='Runtime')
     raw_time = runtime_tag.parent.parent.get_text()
     split_time = raw_time.split()
     runtime = int(split_time[1][:-1]) * 60 + int(split_time[2][:-1])
-    info.append(str(runtime))
+    info['runtime'] = runtime
     # budget
-    budget_tag = home_soup.find('bdi', text='Budget')
-    raw_budget = budget_tag.parent.parent.get_text().split()[1]
-    budget = raw_budget[1:].split('.')[0].replace(',','')
-    info.append(budget)
+    budget_tag = find_required(home_soup, 'bdi', string='Budget')
+    raw_budget = budget_tag.parent.parent.get_text().split(None, 1)[1].strip()
+    # the amount as the page writes it, parsed with its currency by crawl_pipeline.to_int, "-" when unknown
+    info['budget'] = raw_budget if raw_budget != '-' else ''
     # revenue
-    revenue_tag = home_soup.find('bdi', text='Revenue')
-    raw_revenue = revenue_tag.parent.parent.get_text().split()[1]
-    revenue = raw_revenue[1:].split('.')[0].replace(',','')
-    info.append(revenue)
+    revenue_tag = find_required(home_soup, 'bdi', string='Revenue')
+    raw_revenue = revenue_tag.parent.parent.get_text().split(None, 1)[1].strip()
+    # the amount as the page writes it, parsed with its currency by crawl_pipeline.to_int, "-" when unknown
+    info['revenue'] = raw_revenue if raw_revenue != '-' else ''
+    return info
+
+
+def parse_movie_cast_crew(cast_crew_content):
+    """
+    Given the cast and crew page of a movie, return its directors, writers and actors
+    """
+    info = {}
+    cast_crew_soup = parse_page(cast_crew_content, CAST_CREW_XPATHS)
     # directors
     directors = get_crew_list(cast_crew_soup, "Directing")
-    info.append(directors)
+    info['directors'] = directors
     # writers
     writers = get_crew_list(cast_crew_soup, "Writing")
-    info.append(writers)
+    info['writers'] = writers
     # actors
     actors = get_actors(cast_crew_soup)
-    info.append(actors)
+    info['actors'] = actors
     return info
 
 
-def get_movies_in_page(movie_list_url):
+def parse_movies_in_page(content):
+    """
+    Given a page of the movie list, return the relative urls of its movies
+    """
+    soup = parse_page(content, MOVIE_LIST_XPATHS)
+    return [link.get('href') for link in soup.find_all('a', class_='title result')]
+
+
+def get_movie_list_url(page_no):
     """
-    Given a url for a page of the movie list in TMDb, returns the movie info
-    on that page as a list
+    Given a page number, return the url of that page of the movie list
     """
-    movies = []
-    movie_list = requests.get(movie_list_url)
-    soup = BS(movie_list.content, 'html.parser')
-    for link in soup.find_all('a', class_='title result'):
-        url = TMDB_BASE_URL + link.get('href')
-        try:
-            movies.append(get_movie_info(url))
-        except Exception:
-            continue
-    print("Crawled movie list on page {}".format(movie_list_url[movie_list_url.rfind('=')+1:]))
-    return movies
+    return base_url + TMDB_MOVIE_LIST_URL + str(page_no)
+
+
+def describe_list_page(page_no):
+    return 'movie list on page {}'.format(page_no)
+
+
+# the site crawled by crawl_pipeline.crawl()
+SITE = {'list_url': get_movie_list_url, 'parse_list': parse_movies_in_page, 'credits_url': get_cast_crew_url,
+        'parse_detail': parse_movie_info, 'parse_credits': parse_movie_cast_crew,
+        'describe': describe_list_page, 'per_page': MOVIES_PER_PAGE}
+
+parser = argparse.ArgumentParser(description='Crawl popular movies from TMDb.')
+parser.add_argument('--total-number', type=int, default=TOTAL_NUMBER, help='Number of movies to crawl (default: {}).'.format(TOTAL_NUMBER))
+parser.add_argument('--concurrency', type=int, default=CONCURRENCY_PER_HOST, help='Most requests in flight at a time, the crawl adapts below it (default: {}).'.format(CONCURRENCY_PER_HOST))
+parser.add_argument('--rate', type=float, default=RATE_PER_HOST, help='Requests per second, on average (default: {}).'.format(RATE_PER_HOST))
+parser.add_argument('--base-url', default=TMDB_BASE_URL, help='Site to crawl, e.g. a fixture_server.py stand-in (default: {}).'.format(TMDB_BASE_URL))
+parser.add_argument('--cache-dir', default=CACHE_DIR, help='Where fetched pages are cached (default: {}).'.format(CACHE_DIR))
+parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL, help='Seconds a cached page is used before it is fetched again (default: {}).'.format(CACHE_TTL))
+parser.add_argument('--no-cache', action='store_true', help='Neither use nor fill the cache.')
+parser.add_argument('--offline', action='store_true', help='Replay the crawl from the cache only, whatever the age of the pages, without touching the network.')
+parser.add_argument('--parse-mode', choices=html_extract.MODES, default=html_extract.mode, help='How pages are parsed, see html_extract.py (default: {}).'.format(html_extract.mode))
+parser.add_argument('--output', default=OUTPUT_FILE_PATH, help='Where to write the table (default: {}).'.format(OUTPUT_FILE_PATH))
+parser.add_argument('--resume', action='store_true', help='Go on with the crawl of the table from its checkpoint, skipping the list pages done.')
+parser.add_argument('--stats-interval', type=float, default=STATS_INTERVAL, help='Seconds between two summaries of the crawl written to <output>.stats.json (default: {}).'.format(STATS_INTERVAL))
 
 if __name__ == '__main__':
-    pool = Pool(NUM_PROC)
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip('/')
+    html_extract.set_mode(args.parse_mode)
+    if args.offline and args.no_cache:
+        parser.error('--offline replays the cache, it cannot be used with --no-cache')
+    cache = None if args.no_cache else open_cache(args.cache_dir, args.cache_ttl, args.offline)
 
-    output_file = open(OUTPUT_FILE_PATH, 'w')
-    csv_writer = csv.writer(output_file, delimiter=',')
+    output = open_output(args.output, TABLE_HEADER, args.resume)
+    stats = open_stats(args.output, args.stats_interval)
 
-    # start_ids = [1]
-    movie_list_urls = [TMDB_MOVIE_LIST_URL + str(page_no) for page_no in range(1, int(TOTAL_NUMBER / MOVIES_PER_PAGE)+1)]
+    page_nos = [page_no for page_no in range(1, int(args.total_number / MOVIES_PER_PAGE)+1)]
 
-    csv_writer.writerow(['id', 'title', 'year', 'genres', 'language', 'runtime', 'budget', 'revenue', 'directors', 'writers', 'actors'])
-    id = 1
-    for movies in (pool.map(get_movies_in_page, movie_list_urls)):
-        for movie in movies:
-            csv_writer.writerow([id] + list(movie))
-            id += 1
+    try:
+        num_failed = asyncio.run(crawl(SITE, page_nos, args.concurrency, args.rate, cache, output, stats))
+    finally:
+        close_output(output)
+    print_report(stats)
+    if output['dead_letters']:
+        print('{} pages could not be fetched or parsed, listed in {}, run again with --resume to retry them'.format(
+            len(output['dead_letters']), output['dead_letters_path']))
+    if num_failed:
+        sys.exit('{} list pages failed, run again with --resume to retry them'.format(num_failed))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import time
+import random
+import asyncio
+import aiohttp
+
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from crawl_stats import record_cache_hit, record_error, record_failure, record_request, record_wait
+from response_cache import get_cached, put_cached
+
+CONCURRENCY_PER_HOST = 16 # most requests in flight to one host at a time
+INITIAL_CONCURRENCY = 4 # requests in flight to a host at first, grown up to its most while it keeps up
+MIN_CONCURRENCY = 1
+RATE_PER_HOST = 20.0 # requests started per second to one host, on average
+BURST = 10 # requests that can be started at once to a host that has been idle
+LATENCY_TARGET = 5.0 # seconds, a slower response means the host is overloaded
+TIMEOUT = 30 # seconds for a whole request, connecting and reading the body included
+RETRIES = 4 # retries of a request that timed out, lost its connection or got a RETRY_STATUSES response
+BACKOFF = 0.5 # seconds before the first retry, doubled for every retry after it
+MAX_BACKOFF = 60
+RETRY_STATUSES = set([429, 500, 502, 503, 504])
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) movie-crawler'
+
+# ========================================================================
+# All pages of a crawl are fetched by one engine, an aiohttp session     ||
+# whose connections are kept alive and reused across requests, in one    ||
+# process. The crawlers start every request of a crawl at once and the   ||
+# engine schedules them, host by host:                                   ||
+#   - a token bucket spaces the requests to a host at rate_per_host,     ||
+#     with bursts of at most BURST requests                              ||
+#   - the requests in flight to a host are bounded by a limit that grows ||
+#     by one every round of requests that succeed in LATENCY_TARGET, and ||
+#     is halved (at most once per round trip) on a timeout, a lost       ||
+#     connection, a 429 or 5xx, or a slower response (AIMD, the way TCP  ||
+#     finds its window), between MIN_CONCURRENCY and the most allowed    ||
+#     (host_limits, or concurrency_per_host)                             ||
+#   - a request that failed that way waits out an exponential, jittered  ||
+#     backoff, or the Retry-After of a 429 (which also pauses the host), ||
+#     without holding a slot, then queues again for its host             ||
+# A request that runs out of retries, or gets any other error status, is ||
+# added to the dead letters of the engine and fails with FetchError.     ||
+# With a cache (response_cache.open_cache), pages are served from it     ||
+# when they can be, and every page fetched is added to it. With stats    ||
+# (crawl_stats.open_stats), every request is counted there, by stage.    ||
+# ========================================================================
+
+class FetchError(Exception):
+    """A page could not be fetched, status is the HTTP status of the last attempt or None if there was no response"""
+    def __init__(self, url, status, reason):
+        super().__init__('{} {}: {}'.format(url, status, reason))
+        self.url = url
+        self.status = status
+
+@asynccontextmanager
+async def open_engine(concurrency_per_host=CONCURRENCY_PER_HOST, host_limits=None, rate_per_host=RATE_PER_HOST,
+                      timeout=TIMEOUT, retries=RETRIES, cache=None, dead_letters=None, stats=None):
+    """Yields a fetch engine for fetch(), closing its connections on exit.
+    Pages that cannot be fetched are appended to dead_letters, a new list unless one is given."""
+    # the engine bounds the connections to every host, not the connector
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout),
+                                     headers={'User-Agent': USER_AGENT}) as session:
+        yield {'session': session, 'concurrency_per_host': concurrency_per_host, 'host_limits': host_limits or dict(),
+               'rate_per_host': rate_per_host, 'retries': retries, 'cache': cache, 'stats': stats, 'hosts': dict(),
+               'dead_letters': dead_letters if dead_letters is not None else list()}
+
+def get_host(engine, host):
+    """Returns the scheduling state of a host"""
+    if host not in engine['hosts']:
+        max_limit = engine['host_limits'].get(host, engine['concurrency_per_host'])
+        engine['hosts'][host] = {'limit': float(min(INITIAL_CONCURRENCY, max_limit)), 'max_limit': max_limit, 'in_flight': 0,
+                                 'slot_freed': asyncio.Condition(), 'tokens': float(BURST), 'refilled_at': time.monotonic(),
+                                 'paused_until': 0.0, 'decreased_at': 0.0}
+    return engine['hosts'][host]
+
+async def take_token(engine, host_state):
+    """Wait until the token bucket of a host allows one more request, and take the token"""
+    while True:
+        now = time.monotonic()
+        host_state['tokens'] = min(BURST, host_state['tokens'] + (now - host_state['refilled_at']) * engine['rate_per_host'])
+        host_state['refilled_at'] = now
+        if now < host_state['paused_until']:
+            await asyncio.sleep(host_state['paused_until'] - now)
+        elif host_state['tokens'] >= 1:
+            host_state['tokens'] -= 1
+            return
+        else:
+            await asyncio.sleep((1 - host_state['tokens']) / engine['rate_per_host'])
+
+async def acquire_slot(host_state):
+    async with host_state['slot_freed']:
+        await host_state['slot_freed'].wait_for(lambda: host_state['in_flight'] < int(host_state['limit']))
+        host_state['in_flight'] += 1
+
+async def release_slot(host_state, congested, latency):
+    """Free a slot of a host, and adjust its limit to how the request went"""
+    async with host_state['slot_freed']:
+        host_state['in_flight'] -= 1
+        now = time.monotonic()
+        if congested:
+            # the requests in flight when the host got overloaded all see it, the limit is halved once for them
+            if now - host_state['decreased_at'] > latency:
+                host_state['limit'] = max(MIN_CONCURRENCY, host_state['limit'] / 2)
+                host_state['decreased_at'] = now
+        else:
+            host_state['limit'] = min(host_state['max_limit'], host_state['limit'] + 1 / host_state['limit'])
+        host_state['slot_freed'].notify_all()
+
+def get_backoff(attempt, retry_after):
+    """Returns the seconds to wait before a retry, the Retry-After of the server if it sent one"""
+    if retry_after is not None:
+        return retry_after
+    backoff = min(MAX_BACKOFF, BACKOFF * 2 ** (attempt - 1))
+    return backoff / 2 + random.random() * backoff / 2
+
+def parse_retry_after(response):
+    try:
+        return min(MAX_BACKOFF, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+def record_dead_letter(engine, url, status, reason, attempts=0):
+    """Add a page that could not be fetched or parsed to the dead letters of the engine"""
+    engine['dead_letters'].append({'url': url, 'status': status, 'reason': reason, 'attempts': attempts, 'time': time.time()})
+
+def get_cause(status, error):
+    """Returns why a request failed, as counted by crawl_stats"""
+    if status is not None:
+        return 'http {}'.format(status)
+    return 'timeout' if isinstance(error, asyncio.TimeoutError) else type(error).__name__
+
+async def fetch(engine, url, stage=None):
+    """Returns the body of a page, raises FetchError if it cannot be fetched.
+    stage is the crawl stage the page is fetched for, as counted in the stats of the engine."""
+    cache, stats = engine['cache'], engine['stats']
+    if cache is not None:
+        body = get_cached(cache, url)
+        if body is not None:
+            record_cache_hit(stats, stage, len(body))
+            return body
+        if cache['offline']:
+            record_failure(stats, stage, 'offline cache miss')
+            raise FetchError(url, None, 'not in the cache, and the cache is offline')
+    host_state = get_host(engine, urlsplit(url).netloc)
+    retry_after = None
+    for attempt in range(engine['retries'] + 1):
+        if attempt:
+            await asyncio.sleep(get_backoff(attempt, retry_after))
+        waited_at = time.monotonic()
+        await acquire_slot(host_state)
+        congested, retry_after = False, None
+        started_at = time.monotonic()
+        try:
+            await take_token(engine, host_state)
+            started_at = time.monotonic()
+            record_wait(stats, stage, started_at - waited_at)
+            async with engine['session'].get(url) as response:
+                status, reason = response.status, response.reason
+                if status < 400:
+                    body = await response.read()
+                elif status == 429:
+                    retry_after = parse_retry_after(response)
+                    if retry_after is not None:
+                        host_state['paused_until'] = max(host_state['paused_until'], time.monotonic() + retry_after)
+            congested = status in RETRY_STATUSES or time.monotonic() - started_at > LATENCY_TARGET
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status, reason = None, repr(e)
+            congested = True
+            cause = get_cause(None, e)
+        finally:
+            latency = time.monotonic() - started_at
+            await release_slot(host_state, congested, latency)
+        if status is not None and status < 400:
+            record_request(stats, stage, latency, len(body))
+            if cache is not None:
+                put_cached(cache, url, status, response.headers.get('Content-Type'), body)
+            return body
+        if status is not None:
+            cause = get_cause(status, None)
+        record_error(stats, stage, cause)
+        if status is not None and status not in RETRY_STATUSES:
+            break
+    record_failure(stats, stage, cause)
+    record_dead_letter(engine, url, status, reason, attempt + 1)
+    raise FetchError(url, status, reason)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import time
+import random
+import asyncio
+import argparse
+
+from aiohttp import web
+from urllib.parse import quote, urlsplit
+
+FIXTURE_DIR = '../fixtures/'
+PORT = 8000
+
+# ========================================================================
+# A local stand-in for IMDb or TMDb, serving saved pages so the crawlers ||
+# can be run without the network, e.g.                                   ||
+#   python fixture_server.py ../fixtures/tmdb/ --port 8001 &             ||
+#   python crawler_tmdb.py --base-url http://localhost:8001 ...          ||
+# A page is saved as <fixture dir>/<quoted path and query>.html, any     ||
+# other request is a 404.                                                ||
+# To try the rate control of the fetch engine, the server can throttle   ||
+# like the real sites: --rate-limit answers 429 (with a Retry-After) to  ||
+# requests over a rate, --max-in-flight answers 503 to requests over a   ||
+# concurrency, --latency delays every response, more so the more         ||
+# requests are in flight, and --error-rate answers 500 at random.        ||
+# ========================================================================
+
+def get_fixture_path(fixture_dir, url):
+    """Given a url or its path and query, returns the file its page is saved to"""
+    parts = urlsplit(url)
+    path_qs = parts.path + ('?' + parts.query if parts.query else '')
+    return os.path.join(fixture_dir, quote(path_qs, safe='') + '.html')
+
+def save_fixture(fixture_dir, url, content):
+    os.makedirs(fixture_dir, exist_ok=True)
+    with open(get_fixture_path(fixture_dir, url), 'wb') as f:
+        f.write(content)
+
+def create_app(fixture_dir, rate_limit=None, max_in_flight=None, latency=0.0, error_rate=0.0):
+    """Returns the app serving the pages of fixture_dir, throttled as given, and counting its responses by status"""
+    state = {'tokens': float(rate_limit or 0), 'refilled_at': time.monotonic(), 'in_flight': 0, 'statuses': dict()}
+
+    def throttle():
+        """Returns the error response of a request that is throttled, or None"""
+        if rate_limit is not None:
+            now = time.monotonic()
+            state['tokens'] = min(rate_limit, state['tokens'] + (now - state['refilled_at']) * rate_limit)
+            state['refilled_at'] = now
+            if state['tokens'] < 1:
+                return web.Response(status=429, headers={'Retry-After': '1'}, text='Too Many Requests')
+            state['tokens'] -= 1
+        if max_in_flight is not None and state['in_flight'] > max_in_flight:
+            return web.Response(status=503, text='Service Unavailable')
+        if random.random() < error_rate:
+            return web.Response(status=500, text='Internal Server Error')
+        return None
+
+    async def serve_fixture(request):
+        state['in_flight'] += 1
+        try:
+            response = throttle()
+            if response is None:
+                if latency:
+                    await asyncio.sleep(latency * (1 + state['in_flight'] / 8))
+                fixture_path = get_fixture_path(fixture_dir, request.path_qs)
+                if os.path.isfile(fixture_path):
+                    with open(fixture_path, 'rb') as f:
+                        response = web.Response(body=f.read(), content_type='text/html')
+                else:
+                    response = web.Response(status=404, text='Not Found')
+        finally:
+            state['in_flight'] -= 1
+        state['statuses'][response.status] = state['statuses'].get(response.status, 0) + 1
+        return response
+
+    async def print_statuses(app):
+        print('Responses by status: {}'.format(dict(sorted(state['statuses'].items()))), flush=True)
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', serve_fixture)
+    app.on_shutdown.append(print_statuses)
+    return app
+
+parser = argparse.ArgumentParser(description='Serve saved pages as a stand-in for a crawled site.')
+parser.add_argument('fixture_dir', nargs='?', default=FIXTURE_DIR, help='Directory of saved pages (default: {}).'.format(FIXTURE_DIR))
+parser.add_argument('--port', type=int, default=PORT, help='Port to listen on (default: {}).'.format(PORT))
+parser.add_argument('--rate-limit', type=float, help='Requests per second served, 429 over it (default: no limit).')
+parser.add_argument('--max-in-flight', type=int, help='Requests served at a time, 503 over it (default: no limit).')
+parser.add_argument('--latency', type=float, default=0.0, help='Seconds every response is delayed, growing with the requests in flight (default: 0).')
+parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500 (default: 0).')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    web.run_app(create_app(args.fixture_dir, args.rate_limit, args.max_in_flight, args.latency, args.error_rate),
+                host='127.0.0.1', port=args.port, access_log=None)
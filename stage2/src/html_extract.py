@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+from bs4 import BeautifulSoup as BS, UnicodeDammit
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+MODES = ['html.parser', 'lxml', 'targeted']
+
+# ========================================================================
+# The parsers of the crawlers get their soups from parse_page(), which   ||
+# builds them one of three ways, the mode:                               ||
+#   html.parser  the whole page, with the pure-Python parser of bs4      ||
+#   lxml         the whole page, with the lxml parser of bs4             ||
+#   targeted     lxml parses the page into its own tree in C, and only   ||
+#                the elements picked by the xpaths of the parser (the    ||
+#                title header, the details block, the credits tables...) ||
+#                are turned into a soup                                  ||
+# A parser searches its soup the same way in every mode, so the xpaths   ||
+# of a parser must pick every element it looks into. parser_benchmark.py ||
+# checks that all modes give the same output on the saved fixture pages. ||
+# The parsers find the elements they cannot do without by find_required, ||
+# so that a page whose layout changed fails with the selector it lacks.  ||
+# ========================================================================
+
+mode = 'targeted' if lxml is not None else 'html.parser'
+
+class SelectorMiss(Exception):
+    """A page lacks an element its parser needs, selector describes the element, e.g. div.title_wrapper"""
+    def __init__(self, selector):
+        super().__init__('No {} in the page'.format(selector))
+        self.selector = selector
+
+def set_mode(new_mode):
+    global mode
+    if new_mode not in MODES:
+        raise ValueError('Unknown parsing mode {}, expected one of {}'.format(new_mode, ', '.join(MODES)))
+    if new_mode != 'html.parser' and lxml is None:
+        raise ValueError('Parsing mode {} needs lxml, which is not installed'.format(new_mode))
+    mode = new_mode
+
+def has_class(class_name):
+    """Returns an xpath condition matching the elements with class_name among their classes, like class_= of bs4"""
+    return "contains(concat(' ', normalize-space(@class), ' '), ' {} ')".format(class_name)
+
+def describe_selector(name, attrs):
+    selector = name
+    if 'id' in attrs:
+        selector += '#' + attrs['id']
+    if 'class_' in attrs:
+        selector += '.' + '.'.join(attrs['class_'].split())
+    if 'string' in attrs:
+        selector += "[string='{}']".format(attrs['string'])
+    return selector
+
+def find_required(soup, name, **attrs):
+    """Returns soup.find(name, **attrs), raises SelectorMiss if there is no such element"""
+    element = soup.find(name, **attrs)
+    if element is None:
+        raise SelectorMiss(describe_selector(name, attrs))
+    return element
+
+def parse_page(content, xpaths=None):
+    """Returns the soup of a page, in targeted mode the soup of the elements picked by xpaths, in that order"""
+    if mode == 'html.parser' or (mode == 'targeted' and xpaths is None):
+        return BS(content, 'html.parser')
+    if mode == 'lxml':
+        return BS(content, 'lxml')
+    # decoded the way bs4 does, lxml alone takes pages without a declared charset for latin-1
+    text = UnicodeDammit(content, is_html=True).unicode_markup if isinstance(content, bytes) else content
+    root = lxml.html.document_fromstring(text)
+    parts = list()
+    for xpath in xpaths:
+        for element in root.xpath(xpath):
+            parts.append(etree.tostring(element, encoding='unicode', method='html', with_tail=False))
+    return BS(''.join(parts), 'lxml')
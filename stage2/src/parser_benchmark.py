@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import re
+import sys
+import timeit
+import argparse
+
+from urllib.parse import unquote
+
+import html_extract
+import crawler_imdb
+import crawler_tmdb
+
+FIXTURE_DIR = '../fixtures/'
+REPEAT = 20
+
+# ========================================================================
+# Times every page parser of the crawlers on the saved fixture pages, in ||
+# every parsing mode of html_extract.py, and checks that every mode      ||
+# gives the same output as html.parser, the way the pages were always    ||
+# parsed. Exits with status 1 if any output differs.                     ||
+# ========================================================================
+
+def read_fixtures(fixture_dir):
+    """Returns {path and query: page} of the saved pages of a site"""
+    pages = dict()
+    for fixture_name in sorted(os.listdir(fixture_dir)):
+        if fixture_name.endswith('.html'):
+            with open(os.path.join(fixture_dir, fixture_name), 'rb') as f:
+                pages[unquote(fixture_name[:-len('.html')])] = f.read()
+    return pages
+
+def gen_cases(fixture_dir):
+    """Returns a list of (page type, parser, pages to parse) for every saved page"""
+    cases = list()
+    imdb_pages = read_fixtures(os.path.join(fixture_dir, 'imdb'))
+    for path, page in imdb_pages.items():
+        if path.startswith('/search/title'):
+            cases.append(('imdb list', crawler_imdb.parse_imdb_list, [page]))
+        elif path.endswith('/fullcredits'):
+            cases.append(('imdb credits', crawler_imdb.parse_persons_related_to_imdb_video, [page]))
+        elif path.startswith('/title/'):
+            cases.append(('imdb video', crawler_imdb.parse_info_about_imdb_video, [page]))
+    tmdb_pages = read_fixtures(os.path.join(fixture_dir, 'tmdb'))
+    for path, page in tmdb_pages.items():
+        if path.startswith('/movie?'):
+            cases.append(('tmdb list', crawler_tmdb.parse_movies_in_page, [page]))
+        elif re.fullmatch('/movie/[^/]+/cast', path):
+            cases.append(('tmdb cast', crawler_tmdb.parse_movie_cast_crew, [page]))
+        elif re.fullmatch('/movie/[^/]+', path):
+            cases.append(('tmdb movie', crawler_tmdb.parse_movie_info, [page]))
+    return cases
+
+def run_case(parse, pages):
+    try:
+        return parse(*pages)
+    except Exception as e:
+        return 'failed: {!r}'.format(e)
+
+parser = argparse.ArgumentParser(description='Benchmark the page parsers of the crawlers on saved pages.')
+parser.add_argument('fixture_dir', nargs='?', default=FIXTURE_DIR, help='Directory of saved pages, by site (default: {}).'.format(FIXTURE_DIR))
+parser.add_argument('--repeat', type=int, default=REPEAT, help='Times every page is parsed (default: {}).'.format(REPEAT))
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    cases = gen_cases(args.fixture_dir)
+    page_types = sorted(set(page_type for page_type, _, _ in cases))
+    modes = [mode for mode in html_extract.MODES if mode == 'html.parser' or html_extract.lxml is not None]
+
+    expected, seconds, mismatches = dict(), dict(), list()
+    for mode in modes:
+        html_extract.set_mode(mode)
+        for index, (page_type, parse, pages) in enumerate(cases):
+            output = run_case(parse, pages)
+            if mode == 'html.parser':
+                expected[index] = output
+            elif output != expected[index]:
+                mismatches.append((mode, page_type, expected[index], output))
+            seconds[(mode, page_type)] = seconds.get((mode, page_type), 0) + timeit.timeit(lambda: run_case(parse, pages), number=args.repeat)
+
+    print('{} pages, parsed {} times each'.format(len(cases), args.repeat))
+    print('===================================================================')
+    print("{:<20s}{:<15s}{:<18s}{:<15s}".format('Page type', 'Mode', 'ms per page', 'Speedup'))
+    print('-------------------------------------------------------------------')
+    for page_type in page_types:
+        num_pages = sum(1 for case_type, _, _ in cases if case_type == page_type) * args.repeat
+        for mode in modes:
+            print('{:<20s}{:<15s}{:<18.2f}{:<15s}'.format(page_type, mode, seconds[(mode, page_type)] / num_pages * 1000,
+                  '{:.1f}x'.format(seconds[('html.parser', page_type)] / seconds[(mode, page_type)])))
+    print('===================================================================')
+    for mode, page_type, expected_output, output in mismatches:
+        print('{} differs from html.parser on a {} page:\n  {!r}\n  {!r}'.format(mode, page_type, expected_output, output), file=sys.stderr)
+    if mismatches:
+        sys.exit(1)
+    print('All modes give the same output')
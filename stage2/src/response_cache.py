@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+import argparse
+
+from fixture_server import save_fixture
+
+CACHE_DIR = '../cache/'
+CACHE_TTL = 7 * 24 * 3600 # seconds a cached page is served before it is fetched again
+
+# ========================================================================
+# Every page fetched is kept on disk, so a crawl can be re-run, e.g. to  ||
+# fix a parser, without fetching it all again:                           ||
+#   entries/<sha1 of the url>.json   url, status, content type, body     ||
+#                                    hash and size, fetch time           ||
+#   bodies/<sha1 of the body>.z      zlib-compressed body                ||
+# Bodies are stored under the hash of their content, so identical pages ||
+# are stored once. An entry older than the ttl of the cache is a miss,   ||
+# unless the cache is offline: then every page is served from the cache  ||
+# whatever its age, and a page that is not cached fails instead of being ||
+# fetched (see fetch_engine.fetch).                                      ||
+# ========================================================================
+
+def open_cache(cache_dir=CACHE_DIR, ttl=CACHE_TTL, offline=False):
+    """Returns a cache for fetch_engine.open_engine(), ttl None never expires"""
+    os.makedirs(os.path.join(cache_dir, 'entries'), exist_ok=True)
+    os.makedirs(os.path.join(cache_dir, 'bodies'), exist_ok=True)
+    return {'dir': cache_dir, 'ttl': ttl, 'offline': offline}
+
+def get_entry_path(cache, url):
+    return os.path.join(cache['dir'], 'entries', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+def get_body_path(cache, body_hash):
+    return os.path.join(cache['dir'], 'bodies', body_hash + '.z')
+
+def write_atomic(path, data):
+    tmp_path = path + '.{}.tmp'.format(os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def load_entry(cache, url):
+    try:
+        with open(get_entry_path(cache, url), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def get_cached(cache, url):
+    """Returns the cached body of a page, or None if it is not cached or expired"""
+    entry = load_entry(cache, url)
+    if entry is None:
+        return None
+    if not cache['offline'] and cache['ttl'] is not None and time.time() - entry['fetched_at'] > cache['ttl']:
+        return None
+    try:
+        with open(get_body_path(cache, entry['body_hash']), 'rb') as f:
+            return zlib.decompress(f.read())
+    except (OSError, zlib.error):
+        return None
+
+def put_cached(cache, url, status, content_type, body):
+    body_hash = hashlib.sha1(body).hexdigest()
+    body_path = get_body_path(cache, body_hash)
+    if not os.path.exists(body_path):
+        write_atomic(body_path, zlib.compress(body))
+    # the entry is written last, so it never points to a missing body
+    entry = {'url': url, 'status': status, 'content_type': content_type, 'body_hash': body_hash,
+             'size': len(body), 'fetched_at': time.time()}
+    write_atomic(get_entry_path(cache, url), json.dumps(entry).encode('utf-8'))
+
+def iter_entries(cache):
+    entries_dir = os.path.join(cache['dir'], 'entries')
+    for entry_name in sorted(os.listdir(entries_dir)):
+        if entry_name.endswith('.json'):
+            with open(os.path.join(entries_dir, entry_name), 'r') as f:
+                yield json.load(f)
+
+def print_stats(cache):
+    num_entries, num_bytes, body_hashes = 0, 0, set()
+    for entry in iter_entries(cache):
+        num_entries += 1
+        num_bytes += entry['size']
+        body_hashes.add(entry['body_hash'])
+    stored_bytes = sum(os.path.getsize(get_body_path(cache, body_hash)) for body_hash in body_hashes)
+    print('{} pages, {} distinct bodies, {:.1f}MB of pages stored in {:.1f}MB'.format(
+        num_entries, len(body_hashes), num_bytes / 1e6, stored_bytes / 1e6))
+
+def export_fixtures(cache, url_prefix, fixture_dir):
+    """Save every cached page whose url starts with url_prefix as a page of fixture_server.py"""
+    num_pages = 0
+    for entry in iter_entries(cache):
+        if entry['url'].startswith(url_prefix):
+            save_fixture(fixture_dir, entry['url'], get_cached(cache, entry['url']))
+            num_pages += 1
+    print('Exported {} pages to {}'.format(num_pages, fixture_dir), file=sys.stderr)
+
+parser = argparse.ArgumentParser(description='Inspect the response cache of the crawlers.')
+parser.add_argument('--cache-dir', default=CACHE_DIR, help='Cache directory (default: {}).'.format(CACHE_DIR))
+subparsers = parser.add_subparsers(dest='mode', metavar='mode', help='Execution mode.')
+subparsers.required = True
+subparsers.add_parser('stats', help='Print the number and size of cached pages.')
+export_parser = subparsers.add_parser('export', help='Save cached pages as fixture_server.py pages.')
+export_parser.add_argument('url_prefix', help='Export the pages whose url starts with this, e.g. https://www.themoviedb.org')
+export_parser.add_argument('fixture_dir', help='Directory to save the pages to.')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    cache = open_cache(args.cache_dir, offline=True)
+    if args.mode == 'stats':
+        print_stats(cache)
+    else:
+        export_fixtures(cache, args.url_prefix, args.fixture_dir)
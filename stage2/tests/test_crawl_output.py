@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import re
+import csv
+import asyncio
+
+import pytest
+from aiohttp import web
+
+import crawler_tmdb
+from crawl_output import open_output, close_output
+from crawl_pipeline import TABLE_HEADER, crawl
+from fixture_server import create_app, get_fixture_path, save_fixture
+
+FIXTURE_DIR = '../fixtures/tmdb/'
+MOVIE_IDS = [299537, 299538, 299539] # the movies of the one list page of the fixtures
+NUM_PAGES = 4
+RATE = 1000.0
+
+# ========================================================================
+# Crawls of NUM_PAGES list pages made from the TMDb fixtures, each page  ||
+# listing copies of its movies under ids and titles of their own, served ||
+# by fixture_server.py: the id of every title must be its position in    ||
+# the list crawled, whatever the concurrency, and a resumed crawl must   ||
+# end with the same table as a crawl that never failed.                  ||
+# ========================================================================
+
+def get_movie_id(page, position):
+    return page * 1000 + position
+
+def make_fixtures(fixture_dir):
+    def read(url):
+        with open(get_fixture_path(FIXTURE_DIR, url), 'rb') as f:
+            return f.read().decode('utf-8')
+    list_page = read(crawler_tmdb.TMDB_MOVIE_LIST_URL + '1')
+    for page in range(1, NUM_PAGES+1):
+        content = list_page
+        for position, movie_id in enumerate(MOVIE_IDS):
+            content = content.replace(str(movie_id), str(get_movie_id(page, position)))
+            home = re.sub(r'<h2>(.*?)</h2>', r'<h2>\1 (page {})</h2>'.format(page), read('/movie/{}'.format(movie_id)), count=1)
+            save_fixture(fixture_dir, '/movie/{}'.format(get_movie_id(page, position)), home.encode('utf-8'))
+            save_fixture(fixture_dir, '/movie/{}/cast'.format(get_movie_id(page, position)),
+                         read('/movie/{}/cast'.format(movie_id)).encode('utf-8'))
+        save_fixture(fixture_dir, crawler_tmdb.TMDB_MOVIE_LIST_URL + str(page), content.encode('utf-8'))
+
+def run_crawl(fixture_dir, output_path, concurrency, resume=False):
+    """Crawl the list pages of fixture_dir, served on a port of its own, returns the number of list pages that failed"""
+    async def serve_and_crawl():
+        runner = web.AppRunner(create_app(fixture_dir))
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        crawler_tmdb.base_url = 'http://127.0.0.1:{}'.format(runner.addresses[0][1])
+        try:
+            return await crawl(crawler_tmdb.SITE, list(range(1, NUM_PAGES+1)), concurrency, RATE, None, output)
+        finally:
+            await runner.cleanup()
+
+    output = open_output(output_path, TABLE_HEADER, resume)
+    try:
+        return asyncio.run(serve_and_crawl())
+    finally:
+        close_output(output)
+
+def read_titles(output_path):
+    """Returns the title of every id of a table, checking no id is written twice"""
+    with open(output_path, 'r', newline='') as f:
+        rows = list(csv.DictReader(f))
+    titles = dict((int(row['id']), row['title']) for row in rows)
+    assert len(titles) == len(rows)
+    return titles
+
+@pytest.fixture
+def fixture_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawler_tmdb, 'base_url', crawler_tmdb.base_url)
+    make_fixtures(str(tmp_path / 'fixtures'))
+    return str(tmp_path / 'fixtures')
+
+def test_ids_are_list_positions(fixture_dir, tmp_path):
+    tables = list()
+    for concurrency in [1, 8]:
+        output_path = str(tmp_path / 'tmdb_{}.csv'.format(concurrency))
+        assert run_crawl(fixture_dir, output_path, concurrency) == 0
+        tables.append(read_titles(output_path))
+    assert tables[0] == tables[1]
+    for page in range(1, NUM_PAGES+1):
+        for position in range(len(MOVIE_IDS)):
+            title = tables[0][(page - 1) * crawler_tmdb.MOVIES_PER_PAGE + position + 1]
+            assert title.endswith('(page {})'.format(page))
+    assert len(tables[0]) == NUM_PAGES * len(MOVIE_IDS)
+
+def test_resume_retries_failed_titles(fixture_dir, tmp_path):
+    clean_path, output_path = str(tmp_path / 'clean.csv'), str(tmp_path / 'tmdb.csv')
+    assert run_crawl(fixture_dir, clean_path, 4) == 0
+
+    # the credits page of the second title of page 2 is missing, its row is left out
+    cast_path = get_fixture_path(fixture_dir, '/movie/{}/cast'.format(get_movie_id(2, 1)))
+    os.rename(cast_path, cast_path + '.gone')
+    run_crawl(fixture_dir, output_path, 4)
+    failed_id = crawler_tmdb.MOVIES_PER_PAGE + 2
+    assert failed_id not in read_titles(output_path)
+    assert len(read_titles(output_path)) == NUM_PAGES * len(MOVIE_IDS) - 1
+
+    os.rename(cast_path + '.gone', cast_path)
+    assert run_crawl(fixture_dir, output_path, 4, resume=True) == 0
+    assert read_titles(output_path) == read_titles(clean_path)
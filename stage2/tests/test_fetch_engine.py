@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+
+import fetch_engine
+from fetch_engine import FetchError, open_engine, fetch, get_host, release_slot
+
+RATE = 50.0
+NUM_REQUESTS = 30
+
+# ========================================================================
+# The scheduling of the fetch engine, against a server on a port of its  ||
+# own that records when every request arrives: the token bucket lets     ||
+# BURST requests through at once then rate_per_host a second, no more    ||
+# than the limit of a host are in flight, the limit grows by one a round ||
+# and is halved once for the requests that see the host overloaded, and  ||
+# 429 and 5xx are retried while other errors go to the dead letters.     ||
+# ========================================================================
+
+def serve(handler, coroutine):
+    """Runs coroutine(base_url) with handler serving every path of base_url"""
+    async def serve_and_run():
+        app = web.Application()
+        app.router.add_get('/{path:.*}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        try:
+            return await coroutine('http://127.0.0.1:{}'.format(runner.addresses[0][1]))
+        finally:
+            await runner.cleanup()
+    return asyncio.run(serve_and_run())
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(fetch_engine, 'BACKOFF', 0.01)
+
+def test_token_bucket_spaces_requests_after_a_burst():
+    arrivals = list()
+    async def handler(request):
+        arrivals.append(time.monotonic())
+        return web.Response(text='ok')
+    async def fetch_all(base_url):
+        async with open_engine(rate_per_host=RATE) as engine:
+            started_at = time.monotonic()
+            await asyncio.gather(*[fetch(engine, '{}/{}'.format(base_url, index)) for index in range(NUM_REQUESTS)])
+            return started_at
+
+    started_at = serve(handler, fetch_all)
+    arrivals.sort()
+    assert len(arrivals) == NUM_REQUESTS
+    for index, arrived_at in enumerate(arrivals):
+        # the BURST tokens of the bucket are spent at once, every request after them waits for a token
+        assert arrived_at - started_at >= (index + 1 - fetch_engine.BURST) / RATE - 0.01
+    assert arrivals[-1] - started_at < 2 * (NUM_REQUESTS - fetch_engine.BURST) / RATE + 0.5
+
+def test_requests_in_flight_stay_within_limit():
+    in_flight = {'now': 0, 'most': 0}
+    async def handler(request):
+        in_flight['now'] += 1
+        in_flight['most'] = max(in_flight['most'], in_flight['now'])
+        await asyncio.sleep(0.02)
+        in_flight['now'] -= 1
+        return web.Response(text='ok')
+    async def fetch_all(base_url):
+        async with open_engine(concurrency_per_host=2, rate_per_host=1000.0) as engine:
+            await asyncio.gather(*[fetch(engine, '{}/{}'.format(base_url, index)) for index in range(NUM_REQUESTS)])
+
+    serve(handler, fetch_all)
+    assert in_flight['most'] == 2
+
+def test_limit_grows_by_one_a_round_and_halves_once():
+    async def run():
+        engine = {'host_limits': dict(), 'concurrency_per_host': 16, 'hosts': dict()}
+        host_state = get_host(engine, 'example.com')
+        limits, successes = [host_state['limit']], 0
+        while host_state['limit'] < fetch_engine.INITIAL_CONCURRENCY + 1:
+            host_state['in_flight'] += 1
+            await release_slot(host_state, False, 0.1)
+            successes += 1
+        limits.append(host_state['limit'])
+        # the requests in flight when the host got overloaded halve the limit once, not once each
+        for _ in range(3):
+            host_state['in_flight'] += 1
+            await release_slot(host_state, True, 0.1)
+        limits.append(host_state['limit'])
+        await asyncio.sleep(0.15)
+        host_state['in_flight'] += 1
+        await release_slot(host_state, True, 0.1)
+        limits.append(host_state['limit'])
+        return limits, successes
+
+    limits, successes = asyncio.run(run())
+    assert limits[0] == fetch_engine.INITIAL_CONCURRENCY
+    # a round of about limit requests that succeed grows the limit by one
+    assert successes in [fetch_engine.INITIAL_CONCURRENCY, fetch_engine.INITIAL_CONCURRENCY + 1]
+    assert limits[2] == pytest.approx(limits[1] / 2)
+    assert limits[3] == pytest.approx(limits[1] / 4)
+
+def test_overloaded_host_is_retried(no_backoff):
+    statuses = {'/busy': [503, 503, 200], '/limited': [429, 200]}
+    async def handler(request):
+        status = statuses[request.path].pop(0)
+        return web.Response(status=status, text='ok', headers={'Retry-After': '0.1'} if status == 429 else None)
+    async def fetch_both(base_url):
+        async with open_engine() as engine:
+            started_at = time.monotonic()
+            limited = await fetch(engine, base_url + '/limited')
+            seconds = time.monotonic() - started_at
+            return await fetch(engine, base_url + '/busy'), limited, seconds, engine
+
+    busy, limited, seconds, engine = serve(handler, fetch_both)
+    assert busy == limited == b'ok'
+    assert statuses == {'/busy': [], '/limited': []}
+    assert seconds >= 0.1 # the Retry-After of the 429 is waited out
+    assert engine['dead_letters'] == []
+
+def test_error_status_is_a_dead_letter(no_backoff):
+    requests = list()
+    async def handler(request):
+        requests.append(request.path)
+        return web.Response(status=404 if request.path == '/missing' else 503)
+    async def fetch_failing(base_url):
+        async with open_engine(retries=2) as engine:
+            for path, status in [('/missing', 404), ('/down', 503)]:
+                with pytest.raises(FetchError) as error:
+                    await fetch(engine, base_url + path)
+                assert error.value.status == status
+            return engine['dead_letters']
+
+    dead_letters = serve(handler, fetch_failing)
+    # a 404 is not retried, a 503 is retried until the retries run out
+    assert requests == ['/missing', '/down', '/down', '/down']
+    assert [(letter['status'], letter['attempts']) for letter in dead_letters] == [(404, 1), (503, 3)]
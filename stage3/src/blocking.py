@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import re
+import csv
+import json
+import time
+import argparse
+import numpy as np
+
+from movie_store import MISSING, STORE_DIR, convert_table, open_store, load_table, get_column, get_row_ids, get_value
+
+TABLE_B_PATH = '../estimating/tmdb'
+OUTPUT_PATH = '../blocking/candidates.csv'
+# a rule pairs the rows sharing at least min_overlap tokens of key, whose years are at most year_window apart
+RULES = {'title': {'key': 'title', 'min_overlap': 2, 'year_window': 1},
+         'directors': {'key': 'directors', 'min_overlap': 1, 'year_window': 1},
+         'writers': {'key': 'writers', 'min_overlap': 1, 'year_window': 1},
+         'actors': {'key': 'actors', 'min_overlap': 2, 'year_window': 1},
+         'year': {'key': 'year', 'min_overlap': 1, 'year_window': 0}}
+DEFAULT_RULES = ['title', 'directors', 'actors']
+STOP_TOKEN_SHARE = 0.01 # a token in more than this share of the rows of B is a stop token, left out of the index
+MIN_STOP_ROWS = 50 # but a token in fewer rows never is
+CHUNK_PAIRS = 1 << 22 # (A row, B row) pairs of shared tokens counted at a time
+
+# ========================================================================
+# Blocking of table A (IMDb) against table B (TMDb) without a service,   ||
+# and without ever going through A x B: every rule indexes the tokens of ||
+# B (the words of the title, the name ids of the directors, writers or   ||
+# actors, or the year), then looks up the tokens of every row of A in    ||
+# that inverted index, and pairs the rows sharing at least min_overlap   ||
+# tokens (for titles, at most as many as the shorter title has, so that  ||
+# one-word titles can pair), whose years are at most year_window apart   ||
+# (a pair missing a year is kept). Tokens found in more than             ||
+# STOP_TOKEN_SHARE of B ("the", a genre-hopping actor) are pruned from   ||
+# the index, so no rule pairs every row with every other.                ||
+# The year rule indexes the years themselves, none pruned, pairing rows  ||
+# of the same year, or of near years with a larger year_window: blocks   ||
+# far larger than those of the other rules, yet never A x B.             ||
+# The candidates are the pairs of any rule, written as A_id,B_id like    ||
+# stage3/estimating/falcon_apply_rules_ds, with the _id of the tables,   ||
+# else their id, as the tables of the crawlers have, else their row      ||
+# number (see movie_store.get_row_ids). The tables are read from the     ||
+# columnar store of movie_store.py, converted first if they changed.     ||
+# ========================================================================
+
+def tokenize_title(title):
+    return set(re.findall(r'\w+', title.lower()))
+
+def gen_tokens(table, key, vocabulary, year_window=0):
+    """Returns the (row, token) pairs of a table for a rule key, one per distinct token of a row.
+    Title words are numbered by vocabulary, names by the ids of the store, years by themselves,
+    each year of a row standing for the years year_window around it."""
+    if key == 'title':
+        rows, tokens = list(), list()
+        for row in range(table['num_rows']):
+            for word in tokenize_title(get_value(table, 'title', row)):
+                rows.append(row)
+                tokens.append(vocabulary.setdefault(word, len(vocabulary)))
+        return np.array(rows, dtype=np.int64), np.array(tokens, dtype=np.int64)
+    if key == 'year':
+        years = np.asarray(get_column(table, 'year'))
+        rows = np.flatnonzero(years != MISSING)
+        offsets = np.arange(-year_window, year_window + 1)
+        return np.repeat(rows, len(offsets)), (years[rows][:, None] + offsets).ravel()
+    offsets, name_ids = get_column(table, key)
+    rows = np.repeat(np.arange(table['num_rows'], dtype=np.int64), np.diff(offsets))
+    # a name listed twice for a row (an actor credited twice) counts once
+    name_ids = np.asarray(name_ids, dtype=np.int64)
+    num_names = int(name_ids.max()) + 1 if len(name_ids) else 1
+    keys = np.unique(rows * num_names + name_ids)
+    return keys // num_names, keys % num_names
+
+def build_index(rows, tokens, max_rows):
+    """Returns the inverted index of (row, token) pairs, (tokens, start of their postings, rows of the postings),
+    leaving out the stop tokens, in more than max_rows rows"""
+    order = np.argsort(tokens, kind='stable')
+    tokens, rows = tokens[order], rows[order]
+    index_tokens, starts, counts = np.unique(tokens, return_index=True, return_counts=True)
+    kept = counts <= max_rows
+    keep_pairs = np.repeat(kept, counts)
+    new_starts = np.concatenate([[0], np.cumsum(counts[kept])])
+    return index_tokens[kept], new_starts, rows[keep_pairs]
+
+def probe(index, rows, tokens, num_rows_b):
+    """Yields the (A row, B row) pairs sharing tokens, as keys a*num_rows_b+b, with the number of tokens they share.
+    rows and tokens of A are sorted by row, so that every pair is counted whole in one chunk."""
+    index_tokens, starts, posting_rows = index
+    positions = np.searchsorted(index_tokens, tokens)
+    found = positions < len(index_tokens)
+    found[found] = index_tokens[positions[found]] == tokens[found]
+    rows, positions = rows[found], positions[found]
+    lengths = starts[positions + 1] - starts[positions]
+    ends = np.cumsum(lengths)
+    begin = 0
+    while begin < len(rows):
+        # the chunk ends at a row boundary once it holds CHUNK_PAIRS pairs
+        end = int(np.searchsorted(ends, ends[begin] - lengths[begin] + CHUNK_PAIRS, side='right'))
+        end = max(end, begin + 1)
+        end = int(np.searchsorted(rows, rows[end - 1], side='right'))
+        chunk_lengths = lengths[begin:end]
+        total = int(chunk_lengths.sum())
+        if total:
+            # the posting of every token of the chunk, laid end to end
+            shifts = np.repeat(starts[positions[begin:end]] - (np.cumsum(chunk_lengths) - chunk_lengths), chunk_lengths)
+            pair_b = posting_rows[shifts + np.arange(total)]
+            pair_a = np.repeat(rows[begin:end], chunk_lengths)
+            keys, overlaps = np.unique(pair_a * num_rows_b + pair_b, return_counts=True)
+            yield keys, overlaps
+        begin = end
+
+def apply_rule(rule, table_a, table_b):
+    """Returns the sorted keys a*num_rows_b+b of the pairs a rule keeps"""
+    vocabulary = dict()
+    num_rows_b = table_b['num_rows']
+    rows_b, tokens_b = gen_tokens(table_b, rule['key'], vocabulary)
+    # every year is in more rows than a stop token, the year rule indexes them all
+    max_rows = num_rows_b if rule['key'] == 'year' else max(MIN_STOP_ROWS, STOP_TOKEN_SHARE * num_rows_b)
+    index = build_index(rows_b, tokens_b, max_rows)
+    rows_a, tokens_a = gen_tokens(table_a, rule['key'], vocabulary, rule['year_window'] if rule['key'] == 'year' else 0)
+    order = np.argsort(rows_a, kind='stable')
+    rows_a, tokens_a = rows_a[order], tokens_a[order]
+
+    min_overlap_a = min_overlap_b = None
+    if rule['key'] == 'title':
+        # how many indexed words every title has, a pair needs to share at most as many as its shorter title
+        kept_a = np.isin(tokens_a, index[0])
+        min_overlap_a = np.minimum(rule['min_overlap'], np.bincount(rows_a[kept_a], minlength=table_a['num_rows']))
+        min_overlap_b = np.minimum(rule['min_overlap'], np.bincount(index[2], minlength=num_rows_b))
+    years_a, years_b = np.asarray(get_column(table_a, 'year')), np.asarray(get_column(table_b, 'year'))
+
+    kept_keys = list()
+    for keys, overlaps in probe(index, rows_a, tokens_a, num_rows_b):
+        pair_a, pair_b = keys // num_rows_b, keys % num_rows_b
+        if min_overlap_a is None:
+            kept = overlaps >= rule['min_overlap']
+        else:
+            kept = overlaps >= np.minimum(min_overlap_a[pair_a], min_overlap_b[pair_b])
+        if rule['year_window'] is not None and rule['key'] != 'year':
+            year_a, year_b = years_a[pair_a], years_b[pair_b]
+            kept &= (np.abs(year_a - year_b) <= rule['year_window']) | (year_a == MISSING) | (year_b == MISSING)
+        kept_keys.append(keys[kept])
+    return np.concatenate(kept_keys) if kept_keys else np.zeros(0, dtype=np.int64)
+
+def run_blocking(rules, table_a, table_b):
+    """Given the rules to apply, {name: rule} as in RULES, returns the sorted keys of the candidates of all rules,
+    and per rule its name, candidates, new candidates and seconds"""
+    candidates = np.zeros(0, dtype=np.int64)
+    rule_stats = list()
+    for rule_name, rule in rules.items():
+        started_at = time.perf_counter()
+        keys = apply_rule(rule, table_a, table_b)
+        num_new = len(np.setdiff1d(keys, candidates, assume_unique=True))
+        candidates = np.union1d(candidates, keys)
+        rule_stats.append({'rule': rule_name, 'candidates': len(keys), 'new': num_new, 'seconds': time.perf_counter() - started_at})
+    return candidates, rule_stats
+
+def save_candidates(output_path, ids_a, ids_b, candidates, num_rows_b):
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['A_id', 'B_id'])
+        writer.writerows(zip(ids_a[candidates // num_rows_b].tolist(), ids_b[candidates % num_rows_b].tolist()))
+
+def read_pairs(pairs_path, label=None):
+    """Returns the set of (A id, B id) of a candidate or labeled pairs file, only those with label if given"""
+    with open(pairs_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return set((int(values[0]), int(values[1])) for values in reader if label is None or values[2] == label)
+
+parser = argparse.ArgumentParser(description='Block table A against table B into candidate pairs, with inverted indexes.')
+parser.add_argument('--table-a', required=True, help='Table A, a csv, e.g. ../../stage2/data/imdb.csv as crawled by crawler_imdb.py.')
+parser.add_argument('--table-b', default=TABLE_B_PATH, help='Table B, a csv (default: {}).'.format(TABLE_B_PATH))
+parser.add_argument('--rules', default=','.join(DEFAULT_RULES),
+                    help='Rules whose candidates are kept, comma-separated, of {} (default: {}).'.format(', '.join(RULES), ','.join(DEFAULT_RULES)))
+parser.add_argument('--year-window', type=int, help='Years apart the rows of a pair can be, for every rule (default: as set by the rule).')
+parser.add_argument('--store-dir', default=STORE_DIR, help='Columnar store the tables are read from (default: {}).'.format(STORE_DIR))
+parser.add_argument('--output', default=OUTPUT_PATH, help='Where to write the candidates (default: {}).'.format(OUTPUT_PATH))
+parser.add_argument('--compare', help='Candidates to compare with, e.g. ../estimating/falcon_apply_rules_ds.')
+parser.add_argument('--labeled', help='Labeled pairs to measure the recall of the matches on, e.g. ../estimating/labeled_pairs.csv.')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    rule_names = args.rules.split(',')
+    for rule_name in rule_names:
+        if rule_name not in RULES:
+            parser.error('Unknown rule {}, expected one of {}'.format(rule_name, ', '.join(RULES)))
+    # copies of the rules, so that RULES stays as set
+    rules = dict((rule_name, dict(RULES[rule_name])) for rule_name in rule_names)
+    if args.year_window is not None:
+        for rule in rules.values():
+            rule['year_window'] = args.year_window
+
+    table_names = [convert_table(table_path, store_dir=args.store_dir)[0] for table_path in [args.table_a, args.table_b]]
+    store = open_store(args.store_dir)
+    table_a, table_b = [load_table(table_name, store) for table_name in table_names]
+
+    started_at = time.perf_counter()
+    candidates, rule_stats = run_blocking(rules, table_a, table_b)
+    ids_a, ids_b = get_row_ids(table_a), get_row_ids(table_b)
+    save_candidates(args.output, ids_a, ids_b, candidates, table_b['num_rows'])
+    seconds = time.perf_counter() - started_at
+
+    print('{} x {} rows, {} candidates in {:.2f}s'.format(table_a['num_rows'], table_b['num_rows'], len(candidates), seconds))
+    print('===================================================')
+    print("{:<12s}{:>14s}{:>12s}{:>12s}".format('Rule', 'Candidates', 'New', 'Seconds'))
+    print('---------------------------------------------------')
+    for stats in rule_stats:
+        print('{:<12s}{:>14d}{:>12d}{:>12.3f}'.format(stats['rule'], stats['candidates'], stats['new'], stats['seconds']))
+    print('===================================================')
+    with open(args.output + '.stats.json', 'w') as f:
+        json.dump({'rows_a': table_a['num_rows'], 'rows_b': table_b['num_rows'], 'candidates': len(candidates),
+                   'seconds': seconds, 'rules': rule_stats}, f, indent=1)
+
+    pairs = set(zip(ids_a[candidates // table_b['num_rows']].tolist(), ids_b[candidates % table_b['num_rows']].tolist()))
+    if args.compare:
+        compared = read_pairs(args.compare)
+        print('{} of the {} candidates of {} found'.format(len(compared & pairs), len(compared), args.compare))
+    if args.labeled:
+        matches = read_pairs(args.labeled, 'True')
+        print('{} of the {} labeled matches of {} found'.format(len(matches & pairs), len(matches), args.labeled))
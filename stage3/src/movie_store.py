@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import csv
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import numpy as np
+
+from array import array
+
+STORE_DIR = '../store/'
+MISSING = -1 # the value of a missing number, all numbers of the tables are non-negative
+LIST_SEPARATOR = ';'
+# how the columns of the movie tables are stored, any other column is a string
+COLUMN_KINDS = {'_id': 'int', 'id': 'int', 'year': 'int', 'runtime': 'int', 'budget': 'int', 'revenue': 'int',
+                'genres': 'list', 'directors': 'list', 'writers': 'list', 'actors': 'list'}
+
+# ========================================================================
+# A columnar store of the movie tables (stage2/data/*.csv, the tables of ||
+# stage3/estimating), so that they are parsed and split once, when they  ||
+# are converted, and loaded memory-mapped, column by column, when used:  ||
+#   names.bin, names.offsets.npy   the name dictionary, every genre and  ||
+#                                  person of every table, utf-8, id i    ||
+#                                  spanning offsets[i]:offsets[i+1]      ||
+#   <table>/meta.json              the columns, their kinds, the number  ||
+#                                  of rows, the csv converted and the    ||
+#                                  number of values of every int column  ||
+#                                  that were not numbers, kept MISSING   ||
+#   <table>/<column>.npy           an int column, int64, MISSING if none ||
+#   <table>/<column>.offsets.npy   a string or list column, row r        ||
+#                                  spanning offsets[r]:offsets[r+1] of   ||
+#   <table>/<column>.bin           the utf-8 of a string column, or      ||
+#   <table>/<column>.ids.npy       the int32 name ids of a list column,  ||
+#                                  in the order of the csv               ||
+# The name dictionary is shared by all tables of a store, and only ever  ||
+# grows, so the ids of a person are the same in every table and lists    ||
+# of two tables are compared id to id. A table is converted again only   ||
+# when its csv changed (size or mtime), or with --force. A table is      ||
+# named after its csv file, unless a table of that name was converted    ||
+# from another csv (../../stage2/data/tmdb.csv and ../estimating/tmdb),  ||
+# then after its file and a hash of its path, so that one never replaces ||
+# the other.                                                             ||
+# ========================================================================
+
+def get_names_paths(store_dir):
+    return os.path.join(store_dir, 'names.bin'), os.path.join(store_dir, 'names.offsets.npy')
+
+def get_table_dir(store_dir, table_name):
+    return os.path.join(store_dir, table_name)
+
+def get_kind(column):
+    return COLUMN_KINDS.get(column, 'str')
+
+def parse_number(value):
+    """Returns a number of a table, "80000000" or "80000000.0", as an int, MISSING if empty.
+    Raises ValueError if it is not a non-negative number, e.g. "N/A" or "$1,000"."""
+    if value == '':
+        return MISSING
+    number = float(value)
+    if not 0 <= number < 2**63:
+        raise ValueError('{!r} is not a non-negative number'.format(value))
+    return int(number)
+
+def parse_number_or_missing(value):
+    """Returns a number of a table as parse_number(), and MISSING if it is not a number"""
+    try:
+        return parse_number(value)
+    except ValueError:
+        return MISSING
+
+def load_name_list(store_dir):
+    """Returns every name of the dictionary of a store, in id order"""
+    names_path, offsets_path = get_names_paths(store_dir)
+    if not os.path.exists(offsets_path):
+        return list()
+    offsets = np.load(offsets_path)
+    with open(names_path, 'rb') as f:
+        data = f.read(int(offsets[-1]))
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+def save_names(store_dir, names, num_saved):
+    """Append the names after the first num_saved to the dictionary of a store"""
+    names_path, offsets_path = get_names_paths(store_dir)
+    offsets = np.load(offsets_path) if num_saved else np.zeros(1, dtype=np.int64)
+    new_data = [name.encode('utf-8') for name in names[num_saved:]]
+    # the names are appended before the offsets covering them are swapped in, the dictionary is never seen partial
+    with open(names_path, 'r+b' if num_saved else 'wb') as f:
+        f.seek(int(offsets[-1]))
+        f.truncate()
+        f.write(b''.join(new_data))
+    offsets = np.concatenate([offsets, offsets[-1] + np.cumsum([len(data) for data in new_data], dtype=np.int64)])
+    tmp_path = offsets_path + '.{}.tmp.npy'.format(os.getpid())
+    np.save(tmp_path, offsets)
+    os.replace(tmp_path, offsets_path)
+
+def read_columns(csv_path, names, name_ids):
+    """Read a csv table into columns, adding the names of its lists to names and name_ids.
+    Returns its header, {column: its values, or (offsets, values) of a string or list column}, and
+    {column: the number of its values that were not numbers, stored as MISSING} of the int columns."""
+    with open(csv_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns, not_numbers = dict(), dict()
+        for column in header:
+            kind = get_kind(column)
+            columns[column] = array('q') if kind == 'int' else (array('q', [0]), bytearray() if kind == 'str' else array('i'))
+        for row in reader:
+            for column, value in zip(header, row + [''] * (len(header) - len(row))):
+                kind = get_kind(column)
+                if kind == 'int':
+                    try:
+                        columns[column].append(parse_number(value))
+                    except ValueError:
+                        columns[column].append(MISSING)
+                        not_numbers[column] = not_numbers.get(column, 0) + 1
+                    continue
+                offsets, values = columns[column]
+                if kind == 'str':
+                    values.extend(value.encode('utf-8'))
+                else:
+                    for name in value.split(LIST_SEPARATOR) if value else []:
+                        if name not in name_ids:
+                            name_ids[name] = len(names)
+                            names.append(name)
+                        values.append(name_ids[name])
+                offsets.append(len(values))
+    return header, columns, not_numbers
+
+def save_columns(table_dir, header, columns):
+    for column in header:
+        kind = get_kind(column)
+        if kind == 'int':
+            np.save(os.path.join(table_dir, column + '.npy'), np.frombuffer(columns[column], dtype=np.int64))
+            continue
+        offsets, values = columns[column]
+        np.save(os.path.join(table_dir, column + '.offsets.npy'), np.frombuffer(offsets, dtype=np.int64))
+        if kind == 'str':
+            with open(os.path.join(table_dir, column + '.bin'), 'wb') as f:
+                f.write(values)
+        else:
+            np.save(os.path.join(table_dir, column + '.ids.npy'), np.frombuffer(values, dtype=np.int32))
+
+def load_meta(table_dir):
+    """Returns the meta.json of a table, None if there is no such table"""
+    meta_path = os.path.join(table_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r') as f:
+        return json.load(f)
+
+def get_table_name(csv_path, store_dir=STORE_DIR):
+    """Returns the name of the table of a csv in a store: its file name, or if a table of that name was
+    converted from another csv, its file name and a hash of its path"""
+    source_path = os.path.abspath(csv_path)
+    table_name = os.path.splitext(os.path.basename(csv_path))[0]
+    meta = load_meta(get_table_dir(store_dir, table_name))
+    if meta is None or meta['source']['path'] == source_path:
+        return table_name
+    return '{}_{}'.format(table_name, hashlib.sha1(source_path.encode('utf-8')).hexdigest()[:8])
+
+def convert_table(csv_path, table_name=None, store_dir=STORE_DIR, force=False):
+    """Convert a csv table into the store, unless it has not changed since it was. The table is named
+    table_name, which it replaces whatever csv it was converted from, or else see get_table_name().
+    Returns the name of the table, and whether it was converted."""
+    table_name = table_name or get_table_name(csv_path, store_dir)
+    table_dir = get_table_dir(store_dir, table_name)
+    stat = os.stat(csv_path)
+    source = {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    meta = load_meta(table_dir)
+    if not force and meta is not None and meta['source'] == source:
+        return table_name, False
+
+    os.makedirs(store_dir, exist_ok=True)
+    names = load_name_list(store_dir)
+    num_saved = len(names)
+    header, columns, not_numbers = read_columns(csv_path, names, dict((name, name_id) for name_id, name in enumerate(names)))
+    save_names(store_dir, names, num_saved)
+
+    # written next to the table and swapped in, so readers never see a partial table
+    tmp_dir = table_dir.rstrip('/') + '.{}.tmp'.format(os.getpid())
+    os.makedirs(tmp_dir)
+    save_columns(tmp_dir, header, columns)
+    num_rows = len(columns[header[0]]) if get_kind(header[0]) == 'int' else len(columns[header[0]][0]) - 1
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'columns': [[column, get_kind(column)] for column in header], 'num_rows': num_rows, 'source': source,
+                   'not_numbers': not_numbers}, f, indent=1)
+    if os.path.exists(table_dir):
+        shutil.rmtree(table_dir)
+    os.replace(tmp_dir, table_dir)
+    return table_name, True
+
+def open_store(store_dir=STORE_DIR):
+    """Returns a store, its name dictionary loaded memory-mapped"""
+    names_path, offsets_path = get_names_paths(store_dir)
+    store = {'dir': store_dir, 'name_offsets': np.zeros(1, dtype=np.int64), 'name_data': np.zeros(0, dtype=np.uint8), 'name_ids': None}
+    if os.path.exists(offsets_path):
+        store['name_offsets'] = np.load(offsets_path, mmap_mode='r')
+        if store['name_offsets'][-1]:
+            store['name_data'] = np.memmap(names_path, dtype=np.uint8, mode='r', shape=(int(store['name_offsets'][-1]),))
+    return store
+
+def get_name(store, name_id):
+    offsets = store['name_offsets']
+    return store['name_data'][offsets[name_id]:offsets[name_id+1]].tobytes().decode('utf-8')
+
+def get_name_id(store, name):
+    """Returns the id of a name in the dictionary of a store, None if no table has it"""
+    if store['name_ids'] is None:
+        store['name_ids'] = dict((get_name(store, name_id), name_id) for name_id in range(len(store['name_offsets']) - 1))
+    return store['name_ids'].get(name)
+
+def load_table(table_name, store=None):
+    """Returns a table of a store, whose columns are loaded memory-mapped when first used, see get_column()"""
+    store = store if store is not None else open_store()
+    table_dir = get_table_dir(store['dir'], table_name)
+    meta = load_meta(table_dir)
+    if meta is None:
+        raise ValueError('The store {} has no table {}'.format(store['dir'], table_name))
+    return {'name': table_name, 'dir': table_dir, 'store': store, 'num_rows': meta['num_rows'],
+            'kinds': dict((column, kind) for column, kind in meta['columns']), 'header': [column for column, _ in meta['columns']],
+            'not_numbers': meta.get('not_numbers', dict()), 'columns': dict()}
+
+def get_column(table, column):
+    """Returns the array of an int column, or the (offsets, data) arrays of a string or list column"""
+    if column not in table['columns']:
+        kind = table['kinds'][column]
+        path = os.path.join(table['dir'], column)
+        if kind == 'int':
+            table['columns'][column] = np.load(path + '.npy', mmap_mode='r')
+        else:
+            offsets = np.load(path + '.offsets.npy', mmap_mode='r')
+            if kind == 'list':
+                data = np.load(path + '.ids.npy', mmap_mode='r')
+            else:
+                data = np.memmap(path + '.bin', dtype=np.uint8, mode='r') if offsets[-1] else np.zeros(0, dtype=np.uint8)
+            table['columns'][column] = (offsets, data)
+    return table['columns'][column]
+
+def get_row_ids(table):
+    """Returns the ids of the rows of a table: its _id column, else its id column (the tables of the
+    crawlers have one), else its row numbers"""
+    for column in ['_id', 'id']:
+        if column in table['kinds']:
+            return np.asarray(get_column(table, column))
+    return np.arange(table['num_rows'], dtype=np.int64)
+
+def get_ids(table, column, row):
+    """Returns the name ids of a list column in a row"""
+    offsets, ids = get_column(table, column)
+    return ids[offsets[row]:offsets[row+1]]
+
+def get_value(table, column, row):
+    """Returns the value of a column in a row: an int or None, a string, or a list of names"""
+    kind = table['kinds'][column]
+    if kind == 'int':
+        value = int(get_column(table, column)[row])
+        return None if value == MISSING else value
+    if kind == 'list':
+        return [get_name(table['store'], name_id) for name_id in get_ids(table, column, row).tolist()]
+    offsets, data = get_column(table, column)
+    return data[offsets[row]:offsets[row+1]].tobytes().decode('utf-8')
+
+def get_row(table, row):
+    return dict((column, get_value(table, column, row)) for column in table['header'])
+
+def format_value(value):
+    """Returns a value as written in the csv tables"""
+    if value is None:
+        return ''
+    return LIST_SEPARATOR.join(value) if isinstance(value, list) else str(value)
+
+def check_table(table, csv_path):
+    """Returns the number of rows of a table that differ from its csv, numbers compared as numbers"""
+    num_diffs, num_rows = 0, 0
+    with open(csv_path, 'r', newline='') as f:
+        for row, values in enumerate(csv.DictReader(f)):
+            num_rows += 1
+            if row >= table['num_rows']:
+                continue
+            for column, value in values.items():
+                stored = get_value(table, column, row)
+                if get_kind(column) == 'int':
+                    differs = (MISSING if stored is None else stored) != parse_number_or_missing(value)
+                else:
+                    differs = format_value(stored) != value
+                if differs:
+                    num_diffs += 1
+                    break
+    return num_diffs + abs(num_rows - table['num_rows'])
+
+parser = argparse.ArgumentParser(description='Convert movie tables into a columnar store.')
+parser.add_argument('csv_paths', nargs='+', help='Tables to convert, e.g. ../../stage2/data/tmdb.csv ../estimating/tmdb')
+parser.add_argument('--name', action='append', help='Name of a table in the store, one per table (default: its file name, and a hash of its path if another table has it).')
+parser.add_argument('--store-dir', default=STORE_DIR, help='Directory of the store (default: {}).'.format(STORE_DIR))
+parser.add_argument('--force', action='store_true', help='Convert tables that have not changed since they were.')
+parser.add_argument('--check', action='store_true', help='Check that every table reads back the same as its csv.')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.name is not None and len(args.name) != len(args.csv_paths):
+        parser.error('--name must be given once per table')
+    if args.name is not None and len(set(args.name)) != len(args.name):
+        parser.error('every table needs a --name of its own')
+    num_failed = 0
+    for index, csv_path in enumerate(args.csv_paths):
+        table_name, converted = convert_table(csv_path, args.name[index] if args.name else None, args.store_dir, args.force)
+        table = load_table(table_name, open_store(args.store_dir))
+        print('{} {} as {}: {} rows, {} columns, {} names in the store'.format(
+            'Converted' if converted else 'Unchanged', csv_path, table_name, table['num_rows'], len(table['header']),
+            len(table['store']['name_offsets']) - 1))
+        for column, num_values in sorted(table['not_numbers'].items()):
+            print('  {} values of {} are not numbers, stored as missing'.format(num_values, column))
+        if args.check:
+            num_diffs = check_table(table, csv_path)
+            print('  {} rows differ from the csv'.format(num_diffs))
+            num_failed += num_diffs > 0
+    if num_failed:
+        sys.exit(1)
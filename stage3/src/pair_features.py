@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import os
+import re
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+
+from movie_store import MISSING, STORE_DIR, convert_table, open_store, load_table, get_column, get_row_ids, get_value
+
+CANDIDATES_PATH = '../estimating/falcon_apply_rules_ds'
+TABLE_B_PATH = '../estimating/tmdb'
+OUTPUT_PATH = '../matching/pair_features.npy'
+CHUNK_PAIRS = 1 << 16 # pairs whose features are computed at a time
+MAX_TITLE_CHARS = 64 # titles are compared on their first MAX_TITLE_CHARS characters by edit distance
+EDIT_BATCH_PAIRS = 2048 # pairs of titles of similar lengths whose edit distances are computed together
+NUMBER_COLUMNS = ['runtime', 'budget', 'revenue']
+LIST_COLUMNS = ['directors', 'writers', 'actors']
+FEATURES = (['title_edit_distance', 'title_edit_sim', 'title_jaccard', 'year_diff'] +
+            ['{}_ratio'.format(column) for column in NUMBER_COLUMNS] +
+            [feature.format(column) for column in LIST_COLUMNS for feature in ['{}_overlap', '{}_jaccard']])
+NUM_CHECKED = 1000 # pairs checked against the row by row features with --check
+
+# ========================================================================
+# The similarity features of candidate pairs (A_id,B_id, as written by   ||
+# blocking.py or falcon_apply_rules_ds), as a float32 matrix, one row    ||
+# per pair in the order of the candidates, one column per FEATURES:      ||
+#   title_edit_distance, title_edit_sim    Levenshtein distance of the   ||
+#                   normalized titles, and 1 - distance / longer title   ||
+#   title_jaccard   Jaccard of the sets of words of the titles           ||
+#   year_diff       absolute difference of the years                     ||
+#   <number>_ratio  smaller / larger runtime, budget or revenue          ||
+#   <list>_overlap, <list>_jaccard   names in both lists of directors,   ||
+#                   writers or actors, and Jaccard of the lists          ||
+# NaN where a value is missing (or both lists are empty).                ||
+# Every record is normalized once, and cached in the table directory of  ||
+# the columnar store (movie_store.py), dropped with the table when it is ||
+# converted again: its title as a row of character codes, its title      ||
+# words as sorted 64-bit hashes and its name lists as sorted, distinct   ||
+# name ids. The pairs are then computed CHUNK_PAIRS at a time with NumPy ||
+# only: the edit distance one row of the dynamic program at a time for   ||
+# the whole chunk, the overlaps by sorting the ids of both sides of all  ||
+# pairs together, where a name in both lists shows up twice in a row.    ||
+# ========================================================================
+
+def normalize_title(title):
+    return ' '.join(re.findall(r'\w+', title.lower()))
+
+def hash_word(word):
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+def get_cache_path(table, name):
+    return os.path.join(table['dir'], 'features.{}.npy'.format(name))
+
+def save_cached(table, name, array):
+    tmp_path = get_cache_path(table, name) + '.{}.tmp.npy'.format(os.getpid())
+    np.save(tmp_path, array)
+    os.replace(tmp_path, get_cache_path(table, name))
+
+def sort_lists(offsets, ids):
+    """Returns the lists of a list column (offsets, ids) with the ids of every list sorted and distinct"""
+    rows = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+    order = np.lexsort((ids, rows))
+    rows, ids = rows[order], np.asarray(ids)[order]
+    distinct = np.ones(len(ids), dtype=bool)
+    distinct[1:] = (rows[1:] != rows[:-1]) | (ids[1:] != ids[:-1])
+    new_offsets = np.concatenate([[0], np.cumsum(np.bincount(rows[distinct], minlength=len(offsets) - 1))])
+    return new_offsets.astype(np.int64), ids[distinct]
+
+def build_records(table):
+    """Normalize every record of a table into the arrays its pairs are computed from, and cache them"""
+    num_rows = table['num_rows']
+    title_chars = np.zeros((num_rows, MAX_TITLE_CHARS), dtype=np.uint32)
+    title_lengths = np.zeros(num_rows, dtype=np.int32)
+    word_offsets, words = [0], list()
+    for row in range(num_rows):
+        title = normalize_title(get_value(table, 'title', row))
+        codes = np.frombuffer(title[:MAX_TITLE_CHARS].encode('utf-32-le'), dtype=np.uint32)
+        title_chars[row, :len(codes)] = codes
+        title_lengths[row] = len(codes)
+        words.extend(sorted(set(hash_word(word) for word in title.split())))
+        word_offsets.append(len(words))
+    save_cached(table, 'title_chars', title_chars)
+    save_cached(table, 'title_lengths', title_lengths)
+    save_cached(table, 'title_words.offsets', np.array(word_offsets, dtype=np.int64))
+    save_cached(table, 'title_words.ids', np.array(words, dtype=np.int64))
+    for column in LIST_COLUMNS:
+        offsets, ids = sort_lists(*get_column(table, column))
+        save_cached(table, column + '.offsets', offsets)
+        save_cached(table, column + '.ids', ids)
+
+def load_records(table):
+    """Returns the normalized records of a table, built first if they are not cached"""
+    if not os.path.exists(get_cache_path(table, LIST_COLUMNS[-1] + '.ids')):
+        build_records(table)
+    load = lambda name: np.load(get_cache_path(table, name), mmap_mode='r')
+    records = {'title_chars': load('title_chars'), 'title_lengths': load('title_lengths'),
+               'title_words': (load('title_words.offsets'), load('title_words.ids')),
+               'year': np.asarray(get_column(table, 'year'))}
+    for column in NUMBER_COLUMNS:
+        records[column] = np.asarray(get_column(table, column))
+    for column in LIST_COLUMNS:
+        records[column] = (load(column + '.offsets'), load(column + '.ids'))
+    return records
+
+def get_rows(table, ids, side):
+    """Returns the rows of a table with the given ids"""
+    row_ids = get_row_ids(table)
+    order = np.argsort(row_ids, kind='stable')
+    positions = np.minimum(np.searchsorted(row_ids[order], ids), len(order) - 1)
+    missing = row_ids[order][positions] != ids
+    if missing.any():
+        raise ValueError('{}_id {} is not in the table {}'.format(side, ids[missing][0], table['name']))
+    return order[positions]
+
+def gather_lists(lists, rows):
+    """Returns the index of the pair and the id of every item of the lists of rows, laid end to end"""
+    offsets, ids = lists
+    starts = np.asarray(offsets[rows])
+    lengths = np.asarray(offsets[rows + 1]) - starts
+    total = int(lengths.sum())
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.repeat(np.arange(len(rows)), lengths), np.asarray(ids)[shifts + np.arange(total)], lengths
+
+def compute_overlaps(lists_a, rows_a, lists_b, rows_b):
+    """Returns the number of ids in both lists, and the Jaccard of the lists, of every pair"""
+    pairs_a, ids_a, lengths_a = gather_lists(lists_a, rows_a)
+    pairs_b, ids_b, lengths_b = gather_lists(lists_b, rows_b)
+    pairs, ids = np.concatenate([pairs_a, pairs_b]), np.concatenate([ids_a, ids_b])
+    # the ids of a list are distinct, an id found twice in a pair is in both its lists
+    order = np.lexsort((ids, pairs))
+    pairs, ids = pairs[order], ids[order]
+    shared = (pairs[1:] == pairs[:-1]) & (ids[1:] == ids[:-1])
+    overlaps = np.bincount(pairs[1:][shared], minlength=len(rows_a)).astype(np.float32)
+    unions = (lengths_a + lengths_b).astype(np.float32) - overlaps
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return overlaps, np.where(unions > 0, overlaps / unions, np.nan)
+
+def compute_edit_distances(chars_a, lengths_a, chars_b, lengths_b):
+    """Returns the Levenshtein distance of every pair of titles, given as rows of character codes"""
+    num_pairs = len(lengths_a)
+    positions = np.arange(int(lengths_b.max(initial=0)) + 1, dtype=np.int32)
+    previous = np.broadcast_to(positions, (num_pairs, len(positions))).copy()
+    chars_b = chars_b[:, :len(positions) - 1]
+    for i in range(1, int(lengths_a.max(initial=0)) + 1):
+        costs = (chars_a[:, i-1:i] != chars_b).astype(np.int32)
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        current[:, 1:] = np.minimum(previous[:, :-1] + costs, previous[:, 1:] + 1)
+        # insertions, current[j] = min(current[j], current[j-1]+1), as a running minimum
+        current = np.minimum.accumulate(current - positions, axis=1) + positions
+        previous = np.where((i <= lengths_a)[:, None], current, previous)
+    return previous[np.arange(num_pairs), lengths_b]
+
+def compute_title_distances(chars_a, lengths_a, chars_b, lengths_b):
+    """Returns the edit distance of every pair of titles, computed EDIT_BATCH_PAIRS pairs of similar lengths at a time,
+    so that the dynamic program of a batch is as small as its longest titles"""
+    distances = np.empty(len(lengths_a), dtype=np.int32)
+    order = np.argsort(np.maximum(lengths_a, lengths_b), kind='stable')
+    for start in range(0, len(order), EDIT_BATCH_PAIRS):
+        batch = order[start:start + EDIT_BATCH_PAIRS]
+        distances[batch] = compute_edit_distances(chars_a[batch], lengths_a[batch], chars_b[batch], lengths_b[batch])
+    return distances
+
+def get_ratios(values_a, values_b):
+    """Returns smaller / larger of every pair of numbers, NaN if one is missing or both are 0"""
+    values_a, values_b = values_a.astype(np.float64), values_b.astype(np.float64)
+    larger = np.maximum(values_a, values_b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = np.minimum(values_a, values_b) / larger
+    ratios[(values_a == MISSING) | (values_b == MISSING) | (larger == 0)] = np.nan
+    return ratios
+
+def compute_features(records_a, rows_a, records_b, rows_b):
+    """Returns the float32 features of a chunk of pairs"""
+    features = np.empty((len(rows_a), len(FEATURES)), dtype=np.float32)
+    lengths_a, lengths_b = np.asarray(records_a['title_lengths'][rows_a]), np.asarray(records_b['title_lengths'][rows_b])
+    distances = compute_title_distances(np.asarray(records_a['title_chars'][rows_a]), lengths_a,
+                                        np.asarray(records_b['title_chars'][rows_b]), lengths_b)
+    longer = np.maximum(lengths_a, lengths_b)
+    features[:, 0] = distances
+    features[:, 1] = np.where(longer > 0, 1 - distances / np.maximum(longer, 1), np.nan)
+    features[:, 2] = compute_overlaps(records_a['title_words'], rows_a, records_b['title_words'], rows_b)[1]
+    years_a, years_b = records_a['year'][rows_a], records_b['year'][rows_b]
+    features[:, 3] = np.where((years_a == MISSING) | (years_b == MISSING), np.nan, np.abs(years_a - years_b))
+    for index, column in enumerate(NUMBER_COLUMNS):
+        features[:, 4 + index] = get_ratios(records_a[column][rows_a], records_b[column][rows_b])
+    for index, column in enumerate(LIST_COLUMNS):
+        features[:, 7 + 2*index], features[:, 8 + 2*index] = compute_overlaps(records_a[column], rows_a, records_b[column], rows_b)
+    return features
+
+def read_candidates(candidates_path):
+    """Returns the A ids and B ids of a candidate set"""
+    with open(candidates_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        pairs = np.array([[int(values[0]), int(values[1])] for values in reader], dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+def gen_pair_features(candidates_path, table_a, table_b, output_path):
+    """Write the features of every candidate pair to output_path, a .npy float32 matrix, chunk by chunk.
+    Returns the number of pairs."""
+    ids_a, ids_b = read_candidates(candidates_path)
+    rows_a, rows_b = get_rows(table_a, ids_a, 'A'), get_rows(table_b, ids_b, 'B')
+    records_a, records_b = load_records(table_a), load_records(table_b)
+    features = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float32, shape=(len(rows_a), len(FEATURES)))
+    for start in range(0, len(rows_a), CHUNK_PAIRS):
+        end = start + CHUNK_PAIRS
+        features[start:end] = compute_features(records_a, rows_a[start:end], records_b, rows_b[start:end])
+    features.flush()
+    with open(output_path + '.json', 'w') as f:
+        json.dump({'features': FEATURES, 'candidates': os.path.abspath(candidates_path), 'tables': [table_a['name'], table_b['name']]}, f, indent=1)
+    return len(rows_a)
+
+def compute_pair_by_rows(table_a, row_a, table_b, row_b):
+    """Returns the features of one pair, computed row by row in plain Python, the way --check compares them"""
+    def edit_distance(s, t):
+        previous = list(range(len(t) + 1))
+        for i, c in enumerate(s, 1):
+            current = [i]
+            for j, d in enumerate(t, 1):
+                current.append(min(previous[j-1] + (c != d), previous[j] + 1, current[j-1] + 1))
+            previous = current
+        return previous[-1]
+    def jaccard(s, t):
+        return len(s & t) / len(s | t) if s | t else float('nan')
+    def ratio(x, y):
+        return float('nan') if x is None or y is None or max(x, y) == 0 else min(x, y) / max(x, y)
+    a, b = [dict((column, get_value(table, column, row)) for column in table['header']) for table, row in [(table_a, row_a), (table_b, row_b)]]
+    title_a, title_b = normalize_title(a['title']), normalize_title(b['title'])
+    distance = edit_distance(title_a[:MAX_TITLE_CHARS], title_b[:MAX_TITLE_CHARS])
+    longer = max(len(title_a[:MAX_TITLE_CHARS]), len(title_b[:MAX_TITLE_CHARS]))
+    features = [distance, 1 - distance / longer if longer else float('nan'), jaccard(set(title_a.split()), set(title_b.split())),
+                float('nan') if a['year'] is None or b['year'] is None else abs(a['year'] - b['year'])]
+    features += [ratio(a[column], b[column]) for column in NUMBER_COLUMNS]
+    for column in LIST_COLUMNS:
+        features += [len(set(a[column]) & set(b[column])), jaccard(set(a[column]), set(b[column]))]
+    return features
+
+parser = argparse.ArgumentParser(description='Compute the similarity features of candidate pairs.')
+parser.add_argument('--candidates', default=CANDIDATES_PATH, help='Candidate pairs, A_id,B_id (default: {}).'.format(CANDIDATES_PATH))
+parser.add_argument('--table-a', required=True, help='Table A, a csv, e.g. ../../stage2/data/imdb.csv as crawled by crawler_imdb.py.')
+parser.add_argument('--table-b', default=TABLE_B_PATH, help='Table B, a csv (default: {}).'.format(TABLE_B_PATH))
+parser.add_argument('--store-dir', default=STORE_DIR, help='Columnar store the tables are read from (default: {}).'.format(STORE_DIR))
+parser.add_argument('--output', default=OUTPUT_PATH, help='Where to write the feature matrix, .npy (default: {}).'.format(OUTPUT_PATH))
+parser.add_argument('--check', action='store_true', help='Check the first {} pairs against features computed row by row, and time both.'.format(NUM_CHECKED))
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    table_names = [convert_table(table_path, store_dir=args.store_dir)[0] for table_path in [args.table_a, args.table_b]]
+    store = open_store(args.store_dir)
+    table_a, table_b = [load_table(table_name, store) for table_name in table_names]
+
+    started_at = time.perf_counter()
+    num_pairs = gen_pair_features(args.candidates, table_a, table_b, args.output)
+    seconds = time.perf_counter() - started_at
+    print('{} pairs x {} features in {:.2f}s ({:.0f} pairs/s), written to {}'.format(
+        num_pairs, len(FEATURES), seconds, num_pairs / seconds if seconds else 0, args.output))
+
+    if args.check:
+        features = np.load(args.output, mmap_mode='r')
+        ids_a, ids_b = read_candidates(args.candidates)
+        num_checked = min(NUM_CHECKED, num_pairs)
+        rows_a, rows_b = get_rows(table_a, ids_a[:num_checked], 'A'), get_rows(table_b, ids_b[:num_checked], 'B')
+        started_at = time.perf_counter()
+        expected = np.array([compute_pair_by_rows(table_a, row_a, table_b, row_b) for row_a, row_b in zip(rows_a.tolist(), rows_b.tolist())],
+                            dtype=np.float32).reshape(-1, len(FEATURES))
+        row_seconds = time.perf_counter() - started_at
+        differs = ~np.isclose(features[:num_checked], expected, rtol=1e-5, equal_nan=True)
+        print('Row by row: {:.0f} pairs/s, {} of {} pairs differ'.format(num_checked / row_seconds if row_seconds else 0,
+                                                                         int(differs.any(axis=1).sum()), num_checked))
+        for feature in np.array(FEATURES)[differs.any(axis=0)]:
+            print('  {} differs'.format(feature), file=sys.stderr)
+        if differs.any():
+            sys.exit(1)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import numpy as np
+
+from blocking import RULES, DEFAULT_RULES, run_blocking
+from movie_store import convert_table, open_store, load_table, get_row_ids, get_column
+
+CRAWLED_PATH = '../../stage2/data/tmdb.csv' # the table of the TMDb crawler, identified by id
+TABLE_PATH = '../estimating/tmdb'           # the same movies, identified by _id
+
+def convert(csv_path, store_dir):
+    table_name, _ = convert_table(csv_path, store_dir=store_dir)
+    return load_table(table_name, open_store(store_dir))
+
+def test_rows_are_identified_by_id_column_else_position(tmp_path):
+    tables = {'both.csv': '_id,id,title\n10,7,Up\n11,8,Heat\n',
+              'id.csv': 'id,title\n7,Up\n8,Heat\n',
+              'none.csv': 'title\nUp\nHeat\n'}
+    row_ids = dict()
+    for file_name, content in tables.items():
+        (tmp_path / file_name).write_text(content)
+        row_ids[file_name] = get_row_ids(convert(str(tmp_path / file_name), str(tmp_path / 'store'))).tolist()
+    assert row_ids == {'both.csv': [10, 11], 'id.csv': [7, 8], 'none.csv': [0, 1]}
+
+def test_crawled_table_pairs_keep_its_ids(tmp_path):
+    table_a, table_b = convert(CRAWLED_PATH, str(tmp_path)), convert(TABLE_PATH, str(tmp_path))
+    rules = dict((name, dict(RULES[name])) for name in DEFAULT_RULES)
+    candidates, _ = run_blocking(rules, table_a, table_b)
+    ids_a, ids_b = get_row_ids(table_a), get_row_ids(table_b)
+    assert ids_a.tolist() == np.asarray(get_column(table_a, 'id')).tolist()
+
+    # every movie is paired with its own row of the other table, under the ids of both
+    pairs = set(zip(ids_a[candidates // table_b['num_rows']].tolist(), ids_b[candidates % table_b['num_rows']].tolist()))
+    id_b = dict(zip(np.asarray(get_column(table_b, 'id')).tolist(), ids_b.tolist()))
+    assert all((movie_id, id_b[movie_id]) in pairs for movie_id in ids_a.tolist())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import pytest
+
+from movie_store import convert_table, open_store, load_table, check_table, get_value, get_ids, get_name_id
+
+# the tables shipped with the repository
+TABLE_PATHS = ['../estimating/tmdb', '../../stage2/data/tmdb.csv', '../trial/fodors.csv', '../trial/zagats.csv']
+
+def convert(csv_path, store_dir, **kwargs):
+    table_name, converted = convert_table(csv_path, store_dir=store_dir, **kwargs)
+    return load_table(table_name, open_store(store_dir)), converted
+
+@pytest.mark.parametrize('csv_path', TABLE_PATHS)
+def test_table_reads_back_as_its_csv(csv_path, tmp_path):
+    table, converted = convert(csv_path, str(tmp_path))
+    assert converted
+    assert check_table(table, csv_path) == 0
+
+def test_names_have_the_same_id_in_every_table(tmp_path):
+    table_a, _ = convert(TABLE_PATHS[0], str(tmp_path))
+    table_b, _ = convert(TABLE_PATHS[1], str(tmp_path))
+    store = open_store(str(tmp_path))
+    for table in [table_a, table_b]:
+        for row in range(0, table['num_rows'], 97):
+            assert get_ids(table, 'actors', row).tolist() == [get_name_id(store, name) for name in get_value(table, 'actors', row)]
+
+def test_tables_of_the_same_file_name_keep_their_own(tmp_path):
+    table_a, _ = convert(TABLE_PATHS[0], str(tmp_path))
+    table_b, _ = convert(TABLE_PATHS[1], str(tmp_path))
+    assert table_a['name'] == 'tmdb' and table_b['name'].startswith('tmdb_')
+    # converting them again finds each under its own name, unchanged
+    for csv_path, table in [(TABLE_PATHS[0], table_a), (TABLE_PATHS[1], table_b)]:
+        again, converted = convert(csv_path, str(tmp_path))
+        assert again['name'] == table['name'] and not converted
+        assert check_table(again, csv_path) == 0
+
+def test_changed_csv_is_converted_again(tmp_path):
+    csv_path = tmp_path / 'movies.csv'
+    csv_path.write_text('id,title,year\n1,Up,2009\n')
+    convert(str(csv_path), str(tmp_path / 'store'))
+    csv_path.write_text('id,title,year\n1,Up,2009\n2,Heat,1995\n')
+    table, converted = convert(str(csv_path), str(tmp_path / 'store'))
+    assert converted and table['num_rows'] == 2
+    assert get_value(table, 'title', 1) == 'Heat'
+
+def test_int_values_that_are_not_numbers_are_missing_and_counted(tmp_path):
+    csv_path = tmp_path / 'movies.csv'
+    csv_path.write_text('id,title,year,budget\n1,Up,2009,175000000\n2,Heat,unknown,\n3,Alien,1979,11 million\n')
+    table, _ = convert(str(csv_path), str(tmp_path / 'store'))
+    assert [get_value(table, 'year', row) for row in range(3)] == [2009, None, 1979]
+    assert [get_value(table, 'budget', row) for row in range(3)] == [175000000, None, None]
+    # an empty value is missing, not a value that is not a number
+    assert table['not_numbers'] == {'year': 1, 'budget': 1}
+    assert check_table(table, str(csv_path)) == 0
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# @Date    : 2026-10-18
+
+import numpy as np
+import pytest
+
+import pair_features
+from pair_features import FEATURES, MAX_TITLE_CHARS, compute_title_distances, gen_pair_features, compute_pair_by_rows, get_rows
+from movie_store import convert_table, open_store, load_table, get_row_ids, get_column
+
+TABLE_A_PATH = '../../stage2/data/tmdb.csv' # identified by id
+TABLE_B_PATH = '../estimating/tmdb'         # the same movies, identified by _id
+NUM_PAIRS = 600 # half of them a movie and its own row of the other table, half random pairs
+
+# ========================================================================
+# The NumPy features against compute_pair_by_rows, the plain Python row  ||
+# by row code --check compares them with, on pairs of the shipped tables ||
+# computed in small chunks and batches, and the edit distance of the     ||
+# batches against the textbook dynamic program, on titles of every       ||
+# length up to MAX_TITLE_CHARS.                                          ||
+# ========================================================================
+
+def edit_distance(s, t):
+    distances = [[i + j if i == 0 or j == 0 else 0 for j in range(len(t) + 1)] for i in range(len(s) + 1)]
+    for i in range(1, len(s) + 1):
+        for j in range(1, len(t) + 1):
+            distances[i][j] = min(distances[i-1][j-1] + (s[i-1] != t[j-1]), distances[i-1][j] + 1, distances[i][j-1] + 1)
+    return distances[-1][-1]
+
+def to_chars(titles):
+    chars = np.zeros((len(titles), MAX_TITLE_CHARS), dtype=np.uint32)
+    for row, title in enumerate(titles):
+        chars[row, :len(title)] = [ord(c) for c in title]
+    return chars, np.array([len(title) for title in titles], dtype=np.int32)
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(pair_features, 'EDIT_BATCH_PAIRS', 7)
+    monkeypatch.setattr(pair_features, 'CHUNK_PAIRS', 64)
+
+def test_edit_distances_match_dynamic_program(small_batches):
+    rng = np.random.RandomState(0)
+    lengths = [0, 1, MAX_TITLE_CHARS] + rng.randint(0, MAX_TITLE_CHARS + 1, size=200).tolist()
+    titles = [''.join(rng.choice(list('abcé '), size=length)) for length in lengths]
+    titles_a, titles_b = titles, titles[1:] + titles[:1]
+    # pairs of the same title, and of a title and a copy with a few edits
+    titles_a += titles[:20]
+    titles_b += titles[:10] + [title[:5] + 'x' + title[7:] for title in titles[10:20]]
+    distances = compute_title_distances(*to_chars(titles_a), *to_chars(titles_b))
+    assert distances.tolist() == [edit_distance(s, t) for s, t in zip(titles_a, titles_b)]
+
+def test_features_match_row_by_row_code(small_batches, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    table_a, table_b = [load_table(convert_table(csv_path, store_dir=store_dir)[0], open_store(store_dir))
+                        for csv_path in [TABLE_A_PATH, TABLE_B_PATH]]
+    ids_a, ids_b = get_row_ids(table_a), get_row_ids(table_b)
+    id_b = dict(zip(np.asarray(get_column(table_b, 'id')).tolist(), ids_b.tolist()))
+    rng = np.random.RandomState(0)
+    matching = rng.choice(ids_a, size=NUM_PAIRS // 2, replace=False)
+    pairs = ([(movie_id, id_b[movie_id]) for movie_id in matching.tolist()] +
+             list(zip(rng.choice(ids_a, size=NUM_PAIRS // 2).tolist(), rng.choice(ids_b, size=NUM_PAIRS // 2).tolist())))
+    candidates_path, output_path = tmp_path / 'candidates.csv', str(tmp_path / 'pair_features.npy')
+    candidates_path.write_text('A_id,B_id\n' + ''.join('{},{}\n'.format(id_a, id_b) for id_a, id_b in pairs))
+
+    assert gen_pair_features(str(candidates_path), table_a, table_b, output_path) == NUM_PAIRS
+    features = np.load(output_path)
+    rows_a = get_rows(table_a, np.array([id_a for id_a, _ in pairs]), 'A')
+    rows_b = get_rows(table_b, np.array([id_b for _, id_b in pairs]), 'B')
+    expected = np.array([compute_pair_by_rows(table_a, row_a, table_b, row_b) for row_a, row_b in zip(rows_a.tolist(), rows_b.tolist())],
+                        dtype=np.float32)
+    assert features.shape == (NUM_PAIRS, len(FEATURES))
+    for col, name in enumerate(FEATURES):
+        assert np.isclose(features[:, col], expected[:, col], rtol=1e-5, equal_nan=True).all(), name
+    # a movie and its own row have the same title
+    assert (features[:NUM_PAIRS // 2, 0] == 0).all()